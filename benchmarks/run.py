@@ -0,0 +1,163 @@
+"""Benchmark padc operations against a local slapd standing in for Active Directory.
+
+    python -m benchmarks.run --scale 1000 --output results.json
+    python -m benchmarks.run --scale 100000 --baseline results.json --tolerance 0.2
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from typing import Any, Callable, Dict, List
+
+from padc.msad import MsAD, AccountControlCode, ADErrorResult
+from padc.cli.users_utils import account_filter
+from .server import Slapd, BASE_DN, BIND_DN, AUTH_PASS, GROUP_DN, user_name
+
+
+def _timed(fn: Callable[[int], Any], count: int) -> Dict[str, Any]:
+    """Run fn(i) count times, collect latency of every call and how many returned an error."""
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        result = fn(i)
+        latencies.append(time.perf_counter() - t)
+        if isinstance(result, ADErrorResult):
+            errors += 1
+    elapsed = time.perf_counter() - start
+    return _summary(latencies, elapsed, errors)
+
+def _summary(latencies: List[float], elapsed: float, errors: int = 0, items: int = 0) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 6),
+        "ops_per_sec": round((items or len(latencies)) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+    }
+
+def _bound(uri: str) -> MsAD:
+    # slapd is started without TLS, bind goes over plain ldap on loopback
+    ad = MsAD(uri, BASE_DN, BIND_DN, AUTH_PASS)
+    result = ad.connect()
+    if isinstance(result, ADErrorResult):
+        raise result
+    return ad
+
+def _consume(result) -> int:
+    if isinstance(result, ADErrorResult):
+        return 0
+    return sum(1 for _ in result.unwrap())
+
+def run(uri: str, users: int, count: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    count = min(count, users // 2)
+
+    def connect_bind(i: int):
+        ad = MsAD(uri, BASE_DN, BIND_DN, AUTH_PASS)
+        result = ad.connect()
+        ad.close()
+        return result
+    results["connect_bind"] = _timed(connect_bind, count)
+
+    ad = _bound(uri)
+    results["create_user"] = _timed(
+        lambda i: ad.create_user(f"newbench{i:06d}", "Secret123!", AccountControlCode.NormalAccount), count)
+    results["delete_user"] = _timed(lambda i: ad.delete_user(f"newbench{i:06d}"), count)
+
+    results["modify_account_control.disable"] = _timed(
+        lambda i: ad.modify_account_control(account_filter(user_name(i)), AccountControlCode.DisableAccount), count)
+    results["modify_account_control.enable"] = _timed(
+        lambda i: ad.modify_account_control(account_filter(user_name(i)), AccountControlCode.NormalAccount), count)
+
+    # seeded group holds even users, odd ones are free to add and remove
+    odd = [user_name(i) for i in range(1, users, 2)][:count]
+    results["add_account_to_group"] = _timed(lambda i: ad.add_account_to_group(account_filter(odd[i]), GROUP_DN), len(odd))
+    results["remove_account_from_group"] = _timed(
+        lambda i: ad.remove_account_from_group(account_filter(odd[i]), GROUP_DN), len(odd))
+
+    start = time.perf_counter()
+    update = ad.update_group_members(GROUP_DN, add=odd)
+    elapsed = time.perf_counter() - start
+    results["update_group_members"] = _summary([elapsed], elapsed, int(isinstance(update, ADErrorResult)), len(odd))
+    ad.update_group_members(GROUP_DN, remove=odd)
+
+    start = time.perf_counter()
+    members = _consume(ad.group_members(GROUP_DN))
+    elapsed = time.perf_counter() - start
+    results["group_members"] = _summary([elapsed], elapsed, 0, members)
+
+    def search_single(i: int):
+        result = ad.search(account_filter(user_name(i)), ['distinguishedName'])
+        if isinstance(result, ADErrorResult) or _consume(result) == 1:
+            return result
+        return ADErrorResult(f'{user_name(i)} not found', 'search_single')
+    results["search_single"] = _timed(search_single, count)
+
+    start = time.perf_counter()
+    found = _consume(ad.search("(objectClass=User)", ['distinguishedName', 'userAccountControl']))
+    elapsed = time.perf_counter() - start
+    results["search_full"] = _summary([elapsed], elapsed, int(found != users), found)
+
+    ad.close()
+    return results
+
+def regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Benchmarks whose ops/sec dropped more than tolerance below baseline."""
+    slower = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            slower.append(f'{name}: {current["ops_per_sec"]} ops/s, baseline {previous["ops_per_sec"]} ops/s')
+    return slower
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000, help="users seeded in the directory")
+    parser.add_argument("--count", type=int, default=500, help="operations timed per benchmark")
+    parser.add_argument("--output", default="-", help="json results file, - for stdout")
+    parser.add_argument("--baseline", help="previous json results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ops/sec drop against baseline")
+    args = parser.parse_args(argv)
+
+    if not Slapd.available():
+        print("slapd not found, install OpenLDAP server to run benchmarks", file=sys.stderr)
+        return 2
+
+    with Slapd(args.scale) as server:
+        results = run(server.uri, args.scale, args.count)
+
+    report = {
+        "meta": {
+            "scale": args.scale,
+            "count": args.count,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f)["results"], args.tolerance)
+        for line in slower:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import time
+import shutil
+import socket
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Iterator, Optional
+
+BASE_DN = "DC=RTS,DC=LOCAL"
+BIND_DN = f"CN=administrator,{BASE_DN}"
+AUTH_PASS = "benchmark"
+GROUP_DN = f"CN=benchgroup,CN=Users,{BASE_DN}"
+
+SCHEMA_DIRS = ("/etc/ldap/schema", "/etc/openldap/schema", "/usr/local/etc/openldap/schema")
+MODULE_DIRS = ("/usr/lib/ldap", "/usr/lib64/openldap", "/usr/lib/openldap", "/usr/libexec/openldap")
+SBIN_DIRS = ("/usr/sbin", "/usr/local/sbin", "/usr/local/libexec")
+
+
+def _find(name: str, dirs) -> Optional[str]:
+    found = shutil.which(name)
+    if found:
+        return found
+    return next((str(Path(d, name)) for d in dirs if Path(d, name).exists()), None)
+
+def user_name(i: int) -> str:
+    return f"bench{i:06d}"
+
+def user_dn(i: int) -> str:
+    return f"CN={user_name(i)},CN=Users,{BASE_DN}"
+
+def seed_ldif(users: int) -> Iterator[str]:
+    """Entries of a directory with users accounts, half of them members of GROUP_DN."""
+    yield (f"dn: {BASE_DN}\nobjectClass: top\nobjectClass: dcObject\nobjectClass: organization\n"
+           f"dc: RTS\no: RTS\n\n")
+    yield f"dn: CN=Users,{BASE_DN}\nobjectClass: top\nobjectClass: container\ncn: Users\n\n"
+    for i in range(users):
+        name = user_name(i)
+        yield (f"dn: {user_dn(i)}\nobjectClass: top\nobjectClass: person\nobjectClass: organizationalPerson\n"
+               f"objectClass: user\ncn: {name}\nsn: user\ngivenName: {name}\ndisplayName: {name}\n"
+               f"sAMAccountName: {name}\nsAMAccountType: 805306368\nuserAccountControl: 512\n"
+               f"userPrincipalName: {name}@rts.local\ndistinguishedName: {user_dn(i)}\n\n")
+    members = "".join(f"member: {user_dn(i)}\n" for i in range(0, users, 2))
+    yield (f"dn: {GROUP_DN}\nobjectClass: top\nobjectClass: group\ncn: benchgroup\n"
+           f"sAMAccountName: benchgroup\ndistinguishedName: {GROUP_DN}\n{members}\n")
+
+class Slapd:
+    """Throwaway slapd loaded with an Active Directory like schema and users seeded with slapadd."""
+
+    def __init__(self, users: int = 1000, port: Optional[int] = None) -> None:
+        self.users = users
+        self.port = port or self.__free_port()
+        self.uri = f"ldap://127.0.0.1:{self.port}"
+        self.workdir = Path(tempfile.mkdtemp(prefix="padc-bench-"))
+        self.process: Optional[subprocess.Popen] = None
+
+    @staticmethod
+    def __free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @staticmethod
+    def available() -> bool:
+        return _find("slapd", SBIN_DIRS) is not None
+
+    def __config(self) -> Path:
+        schema_dir = next((d for d in SCHEMA_DIRS if Path(d, "core.schema").exists()), None)
+        if schema_dir is None:
+            raise RuntimeError("slapd schema directory with core.schema not found")
+        module_dir = next((d for d in MODULE_DIRS if list(Path(d).glob("back_mdb*"))), None) if any(
+            Path(d).exists() for d in MODULE_DIRS) else None
+
+        (self.workdir / "db").mkdir()
+        lines = [f"include {schema_dir}/{s}.schema" for s in ("core", "cosine", "inetorgperson")]
+        lines.append(f"include {Path(__file__).parent / 'ad.schema'}")
+        lines.append(f"pidfile {self.workdir / 'slapd.pid'}")
+        if module_dir:
+            lines += [f"modulepath {module_dir}", "moduleload back_mdb"]
+        lines += [
+            "sizelimit unlimited",
+            "database mdb",
+            "maxsize 4294967296",
+            f'suffix "{BASE_DN}"',
+            f'rootdn "{BIND_DN}"',
+            f"rootpw {AUTH_PASS}",
+            f"directory {self.workdir / 'db'}",
+            "index objectClass eq",
+            "index sAMAccountName eq",
+            "index sAMAccountType eq",
+            "index member eq",
+        ]
+        conf = self.workdir / "slapd.conf"
+        conf.write_text("\n".join(lines) + "\n")
+        return conf
+
+    def start(self, timeout: float = 30.0) -> 'Slapd':
+        slapd = _find("slapd", SBIN_DIRS)
+        if slapd is None:
+            raise RuntimeError("slapd not found, install OpenLDAP server to run benchmarks")
+        conf = self.__config()
+
+        seed = self.workdir / "seed.ldif"
+        with open(seed, "w") as f:
+            f.writelines(seed_ldif(self.users))
+        slapadd = _find("slapadd", SBIN_DIRS)
+        tool = [slapadd] if slapadd else [slapd, "-T", "add"]
+        subprocess.run(tool + ["-q", "-f", str(conf), "-l", str(seed)], check=True)
+
+        self.process = subprocess.Popen(
+            [slapd, "-f", str(conf), "-h", self.uri, "-d", "0"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"slapd exited with code {self.process.returncode}")
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError("slapd did not start listening in time")
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self) -> 'Slapd':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,181 @@
+import csv
+import sys
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from ..client import ConnectionPool, RateLimit
+from ..msad import MsAD, MsADCluster, AccountLoader, match_code, AccountControlCode as Acc
+from ..msad.ad_error_handler import ADSuccessResult
+from ..logger import match_level
+from .users_utils import account_lookup, config_max_rate, session_pool
+
+OPERATIONS = ('create', 'delete', 'enable', 'disable', 'add-to-group', 'remove-from-group', 'is-member')
+# operations looking their account up by sAMAccountName
+LOOKUPS = ('enable', 'disable', 'add-to-group', 'remove-from-group', 'is-member')
+# operations safe to run again on another domain controller, they write nothing
+READS = ('is-member',)
+
+T = TypeVar('T')
+
+
+def read_operations(stream: IO[str], fmt: str = "jsonl") -> Iterator[Dict[str, Any]]:
+    """Read operations from a jsonl stream, or a csv stream with header op,name,password,group,acc."""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield {k.strip(): v.strip() for k, v in row.items() if k and v}
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'error': f'invalid json: {e}'}
+
+def run_operation(ldap: MsAD, op: Dict[str, Any], config: Dict[str, str]) -> Dict[str, Any]:
+    """Run a single operation over a bound session, accounts are looked up like single commands do, return its result record."""
+    kind, name = op.get('op'), op.get('name')
+    record = {'op': kind, 'name': name}
+
+    if 'error' in op:
+        return {**record, 'ok': False, 'message': op['error']}
+    if kind not in OPERATIONS or not name:
+        return {**record, 'ok': False, 'message': f'invalid operation, op must be one of {", ".join(OPERATIONS)} and name is required'}
+    if kind in ('add-to-group', 'remove-from-group', 'is-member') and not op.get('group'):
+        return {**record, 'ok': False, 'message': f'{kind} requires group'}
+    if kind == 'create' and not op.get('password'):
+        return {**record, 'ok': False, 'message': 'create requires password'}
+    if not str(op.get('acc') or Acc.NormalAccount.value).isdigit():
+        return {**record, 'ok': False, 'message': 'acc must be an integer'}
+
+    match kind:
+        case 'create':
+            result = ldap.create_user(name, op['password'], match_code(int(op.get('acc') or Acc.NormalAccount.value)))
+        case 'delete':
+            result = ldap.delete_user(name)
+        case 'enable':
+            result = ldap.modify_account_control(account_lookup(name, config), Acc.NormalAccount)
+        case 'disable':
+            result = ldap.modify_account_control(account_lookup(name, config), Acc.DisableAccount)
+        case 'add-to-group':
+            result = ldap.add_account_to_group(account_lookup(name, config), op['group'])
+        case 'remove-from-group':
+            result = ldap.remove_account_from_group(account_lookup(name, config), op['group'])
+        case 'is-member':
+            # sessions keep their group graph, so repeated checks are answered in memory
+            result = ldap.is_member(account_lookup(name, config), op['group'], op.get('strategy', 'auto'))
+            if isinstance(result, ADSuccessResult):
+                return {**record, 'ok': True, 'member': result.payload, 'message': 'member' if result.payload else 'not member'}
+
+    if isinstance(result, ADSuccessResult):
+        return {**record, 'ok': True, 'message': str(result.payload)}
+    return {**record, 'ok': False, 'message': str(getattr(result, 'message', result))}
+
+def _chunks(operations: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    operations = iter(operations)
+    while chunk := list(islice(operations, size)):
+        yield chunk
+
+def run_batch(
+        operations: Iterable[Dict[str, Any]],
+        pool: Union[ConnectionPool, MsADCluster],
+        output: IO[str],
+        config: Dict[str, str],
+        workers: int = 1,
+        loader: Optional[AccountLoader] = None,
+        rate: Optional[RateLimit] = None) -> Dict[str, int]:
+    """Run operations over pooled sessions writing one jsonl result line per operation, in input order.
+
+    At most workers * 4 operations are read ahead, so input of any size is streamed. With a loader
+    operations are read by chunks of loader.chunk_size and the account names of a chunk are resolved
+    with a single search before it runs, instead of one search per operation. With a rate workers
+    together start at most rate operations per second.
+    """
+    def session(fn: Callable[[MsAD], T]) -> Callable[[MsAD], T]:
+        """fn over a pooled session using the batch loader, the session goes back to the pool without it."""
+        def run(ldap: MsAD) -> T:
+            previous, ldap.loader = ldap.loader, loader
+            try:
+                return fn(ldap)
+            finally:
+                ldap.loader = previous
+        return run
+
+    def work(index: int, op: Dict[str, Any]) -> Dict[str, Any]:
+        if rate is not None:
+            rate.wait()
+        try:
+            return {'index': index, **pool.run(session(lambda ldap: run_operation(ldap, op, config)), idempotent=op.get('op') in READS)}
+        except Exception as e:
+            # no session could run it, e.g. checkout timed out or every DC is down, the batch goes on
+            return {'index': index, 'op': op.get('op'), 'name': op.get('name'), 'ok': False, 'error': str(getattr(e, 'message', e))}
+
+    def preload(chunk: List[Dict[str, Any]]) -> None:
+        # DNs are read with a base search, there is nothing to resolve
+        names = [op['name'] for op in chunk if op.get('op') in LOOKUPS and isinstance(op.get('name'), str) and '=' not in op['name']]
+        if not names:
+            return
+        try:
+            pool.run(session(lambda ldap: ldap.preload_accounts(names, config.get('USERS_OU') or None)), idempotent=True)
+        except Exception as e:
+            # operations then search their account themselves
+            match_level('batch::preload failed: %s', logging.WARNING, e)
+
+    def indexed() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if loader is None:
+            yield from enumerate(operations)
+            return
+        index = 0
+        for chunk in _chunks(operations, loader.chunk_size):
+            preload(chunk)
+            for op in chunk:
+                yield index, op
+                index += 1
+
+    counts = {'total': 0, 'failed': 0}
+    def write(result: Dict[str, Any]) -> None:
+        counts['total'] += 1
+        counts['failed'] += not result['ok']
+        output.write(json.dumps(result) + '\n')
+
+    if workers <= 1:
+        for index, op in indexed():
+            write(work(index, op))
+        return counts
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for index, op in indexed():
+            pending.append(executor.submit(work, index, op))
+            if len(pending) >= workers * 4:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return counts
+
+def batch(input_path: str, fmt: Optional[str], output_path: str, workers: int, config: Dict[str, str], debug = False) -> Dict[str, int]:
+    """Run every operation of input_path ("-" is stdin) over a pool of workers sessions, results go to output_path ("-" is stdout)."""
+    if fmt is None:
+        fmt = "csv" if input_path.endswith(".csv") else "jsonl"
+
+    # one more session than workers, so preloading the next chunk does not wait for a worker
+    pool = session_pool(config, workers + 1, debug)
+    max_rate = config_max_rate(config)
+    source = sys.stdin if input_path == "-" else open(input_path, "r", newline="")
+    target = sys.stdout if output_path == "-" else open(output_path, "w")
+    try:
+        return run_batch(
+            read_operations(source, fmt), pool, target, config, workers, AccountLoader(), RateLimit(max_rate) if max_rate else None
+        )
+    finally:
+        pool.close()
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
@@ -1,9 +1,117 @@
 import typer
+from pathlib import Path
+from typing import Optional
 from .users import users
+from .users_utils import load_env_variables_from_file, load_env_variables, ensure_loaded_variables, reconcile_users
+from .daemon_client import socket_path
 
 # Create cli and Registry subcommands
 app = typer.Typer(help="Python active directory user management cli!", pretty_exceptions_show_locals=False)
 app.add_typer(users, name="users")
 
+@app.command("serve")
+def cli_serve(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        path: Optional[str] = typer.Option(
+            None,
+            "--socket",
+            "-s",
+            help="Unix socket path, defaults to PADC_SOCKET or a per user socket in XDG_RUNTIME_DIR or /tmp",
+        ),
+        sessions: int = typer.Option(
+            4,
+            "--sessions",
+            help="Bound sessions kept warm by the daemon",
+            min=1,
+            show_default=True
+        ),
+        metrics_port: Optional[int] = typer.Option(
+            None,
+            "--metrics-port",
+            help="Serve prometheus metrics on http://127.0.0.1:PORT/metrics",
+            min=1,
+            max=65535
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+    """Keep bound sessions warm and run users commands sent to a unix socket."""
+    from .daemon import serve
+
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    if metrics_port:
+        from ..client import serve_metrics
+        serve_metrics(metrics_port)
+
+    serve(path or socket_path(), config, sessions, debug)
+
+@app.command("reconcile")
+def cli_reconcile(
+        desired: str = typer.Argument(
+            ...,
+            help="A jsonl (or json array) file of desired users, - reads stdin",
+        ),
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        dry_run: bool = typer.Option(
+            False,
+            "--dry-run",
+            help="Only compute and print the plan, nothing is written",
+        ),
+        plan_path: Optional[str] = typer.Option(
+            None,
+            "--plan",
+            "-p",
+            help="Where jsonl planned writes are written, - writes stdout, defaults to stdout with --dry-run",
+        ),
+        window: int = typer.Option(
+            32,
+            "--window",
+            "-w",
+            help="Writes in flight at start, widened while the server keeps up",
+            min=1,
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+    """Bring users, attributes and group memberships to a desired state, writing only what differs."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    if not reconcile_users(desired, dry_run, window, plan_path or ("-" if dry_run else None), config, debug):
+        raise typer.Exit(code=1)
+
 def run():
     app()
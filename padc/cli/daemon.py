@@ -0,0 +1,82 @@
+import os
+import json
+import socket
+import socketserver
+from typing import Any, Dict, Union
+
+from ..client import ConnectionPool
+from ..msad import MsADCluster
+from .batch import READS, run_operation
+from .users_utils import session_pool
+from .daemon_client import config_fingerprint
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer one jsonl response line per jsonl request line."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {'ok': False, 'message': f'invalid json: {e}'}
+            else:
+                response = self.server.dispatch(request)
+            self.wfile.write((json.dumps(response) + '\n').encode())
+            self.wfile.flush()
+
+class PadcServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server running users operations over warm, bound sessions."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, pool: Union[ConnectionPool, MsADCluster], fingerprint: str, config: Dict[str, str]) -> None:
+        self.pool = pool
+        self.fingerprint = fingerprint
+        self.config = config
+        socketserver.UnixStreamServer.__init__(self, path, _RequestHandler)
+
+    def server_bind(self) -> None:
+        """Bind the socket already readable and writable by its owner only, no other user can connect meanwhile."""
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get('op') == 'ping':
+            return {'ok': True, 'message': 'pong'}
+        if request.pop('fingerprint', None) != self.fingerprint:
+            return {'ok': False, 'mismatch': True, 'message': 'daemon serves another directory or credentials'}
+        try:
+            return self.pool.run(lambda ldap: run_operation(ldap, request, self.config), idempotent=request.get('op') in READS)
+        except Exception as e:
+            return {'op': request.get('op'), 'name': request.get('name'), 'ok': False, 'message': str(e)}
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove socket file left by a dead daemon, refuse to start when one is still answering."""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise RuntimeError(f'serve: a padc daemon is already listening on {path}')
+
+def serve(path: str, config: Dict[str, str], sessions: int = 4, debug = False) -> None:
+    """Serve users operations on a unix socket until interrupted."""
+    _remove_stale_socket(path)
+    pool = session_pool(config, sessions, debug)
+    server = PadcServer(path, pool, config_fingerprint(config), config)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+        if os.path.exists(path):
+            os.unlink(path)
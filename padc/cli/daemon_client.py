@@ -0,0 +1,75 @@
+import os
+import json
+import stat
+import socket
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def socket_path() -> str:
+    """Unix socket of the padc daemon, PADC_SOCKET overrides the per user default."""
+    if os.environ.get("PADC_SOCKET"):
+        return os.environ["PADC_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"padc-{os.getuid()}.sock")
+
+def config_fingerprint(config: Dict[str, str]) -> str:
+    """Identify the directory and credentials of a config, the daemon only serves matching clients."""
+    keys = ("URI", "BASE_DN", "BIND_DN", "AUTH_PASS")
+    return hashlib.sha256("\0".join(config.get(k, "") for k in keys).encode()).hexdigest()
+
+def trusted_socket(path: str) -> bool:
+    """Tell whether path is a socket of the current user in a directory other users cannot replace it in.
+
+    A world writable directory such as /tmp must be sticky, otherwise anyone could bind the path first
+    and receive passwords sent to the daemon.
+    """
+    try:
+        sock = os.stat(path)
+        directory = os.stat(os.path.dirname(os.path.abspath(path)))
+    except OSError:
+        return False
+    if not stat.S_ISSOCK(sock.st_mode) or sock.st_uid != os.getuid() or sock.st_mode & 0o077:
+        return False
+    if directory.st_uid not in (os.getuid(), 0):
+        return False
+    return not directory.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or bool(directory.st_mode & stat.S_ISVTX)
+
+def forward(op: Dict[str, Any], config: Dict[str, str], timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+    """Run operation on a running padc daemon.
+
+    Return None when no trusted daemon is listening, PADC_NO_DAEMON is set, or the daemon
+    serves another directory, so the caller runs the operation itself. Once the request was
+    sent the daemon may have applied it, so a missing answer is a failed response, never None.
+    """
+    if os.environ.get("PADC_NO_DAEMON"):
+        return None
+
+    path = socket_path()
+    if not trusted_socket(path):
+        return None
+
+    request = {**op, "fingerprint": config_fingerprint(config)}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        try:
+            conn.connect(path)
+            conn.sendall((json.dumps(request) + "\n").encode())
+        except OSError:
+            return None
+        try:
+            with conn.makefile("r") as reader:
+                line = reader.readline()
+            response = json.loads(line) if line else None
+            error = None if line else "connection closed"
+        except (OSError, ValueError) as e:
+            response, error = None, str(e) or type(e).__name__
+    if response is None:
+        return {
+            "op": op.get("op"), "name": op.get("name"), "ok": False,
+            "message": f"padc daemon did not answer, {op.get('op')} may have been applied: {error}",
+        }
+
+    if response.get("mismatch"):
+        return None
+    return response
@@ -1,7 +1,7 @@
 import typer
 from .users_utils import *
-from ..msad import match_code, AccountControlCode as Acc
 from pathlib import Path
+from typing import List
 
 users = typer.Typer(help="Users subcommand")
 
@@ -31,6 +31,19 @@ def cli_create_from_ldif(
             readable=True,
             resolve_path=True,
         ),
+        bulk: bool = typer.Option(
+            False,
+            "--bulk",
+            help="Apply every record of the ldif, honouring changetype add/modify/delete",
+        ),
+        window: int = typer.Option(
+            32,
+            "--window",
+            "-w",
+            help="Operations in flight at start when --bulk is used, widened while the server keeps up",
+            min=1,
+            show_default=True
+        ),
         debug: bool = typer.Option(False, help="Enable debug mode")
         ):
     """Create a new user account from ldif in Microsoft Active Directory Server."""
@@ -42,7 +55,11 @@ def cli_create_from_ldif(
 
     config = ensure_loaded_variables(config)
 
-    create_user_from_ldif(str(from_ldif), config, debug)
+    if bulk:
+        if not import_ldif(str(from_ldif), config, window, debug):
+            raise typer.Exit(code=1)
+    else:
+        create_user_from_ldif(str(from_ldif), config, debug)
 
 @users.command("create")
 def cli_create_user(
@@ -79,6 +96,7 @@ def cli_create_user(
 
     config = ensure_loaded_variables(config)
 
+    from ..msad import match_code
     create_user(name, password, config, match_code(account_control_code), debug)
 
 @users.command("delete")
@@ -137,6 +155,7 @@ def cli_disable_user(
 
     config = ensure_loaded_variables(config)
 
+    from ..msad import AccountControlCode as Acc
     modify_acc(name, Acc.DisableAccount, config, debug)
 
 @users.command("enable")
@@ -166,8 +185,73 @@ def cli_enable_user(
 
     config = ensure_loaded_variables(config)
 
+    from ..msad import AccountControlCode as Acc
     modify_acc(name, Acc.NormalAccount, config, debug) 
 
+@users.command("account-control")
+def cli_account_control(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        s_filter: str = typer.Option(
+            "(sAMAccountType=805306368)",
+            "--filter",
+            help="Search filter of the accounts to update",
+            show_default=True
+        ),
+        base: Optional[str] = typer.Option(
+            None,
+            "--base",
+            help="DN searched for accounts, e.g. an OU of leavers, BASE_DN when missing",
+        ),
+        set_flags: Optional[List[str]] = typer.Option(
+            None,
+            "--set",
+            help="userAccountControl flag to set, by name (ACCOUNTDISABLE, DONT_EXPIRE_PASSWORD, ...) or value, repeat it for many",
+        ),
+        clear_flags: Optional[List[str]] = typer.Option(
+            None,
+            "--clear",
+            help="userAccountControl flag to clear, by name or value, repeat it for many",
+        ),
+        window: int = typer.Option(
+            32,
+            "--window",
+            "-w",
+            help="Modifies in flight at start, widened while the server keeps up",
+            min=1,
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Set or clear userAccountControl flags of every matching account in Microsoft Active Directory Server, keeping the other flags."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    from ..msad import UacFlag
+    try:
+        flags = UacFlag.parse(set_flags or []), UacFlag.parse(clear_flags or [])
+    except (KeyError, ValueError) as e:
+        raise typer.BadParameter(f"unknown userAccountControl flag {e}")
+
+    if not update_account_control(s_filter, base, *flags, window, config, debug):
+        raise typer.Exit(code=1)
+
 @users.command("add-to-group")
 def cli_add_to_group(
         from_file: Optional[Path] = typer.Option(
@@ -226,4 +310,417 @@ def cli_remove_from_group(
 
     config = ensure_loaded_variables(config)
 
-    remove_account_from_group(name, groupdn, config, debug) 
+    remove_account_from_group(name, groupdn, config, debug)
+
+@users.command("update-group")
+def cli_update_group(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        groupdn: str = typer.Argument(..., help="A group DN attribute value"),
+        add: List[str] = typer.Option([], "--add", "-a", help="A sAMAccountName to add, can be repeated"),
+        remove: List[str] = typer.Option([], "--remove", "-r", help="A sAMAccountName to remove, can be repeated"),
+        names_file: Optional[Path] = typer.Option(
+            None,
+            "--names",
+            "-n",
+            help="A file with one sAMAccountName per line to add",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        exact: bool = typer.Option(False, "--exact", help="Remove every member that is not in the added names"),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Add/remove many user accounts of a group in Microsoft Active Directory Server."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    names = list(add) + (load_names_from_file(str(names_file)) if names_file else [])
+    update_group_members(groupdn, names, list(remove), exact, config, debug)
+
+@users.command("group-members")
+def cli_group_members(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        groupdn: str = typer.Argument(..., help="A group DN attribute value"),
+        nested: bool = typer.Option(
+            False,
+            "--nested",
+            help="Also list members of nested groups, nested groups themselves are left out",
+        ),
+        strategy: str = typer.Option(
+            "auto",
+            "--strategy",
+            help="With --nested: chain asks the server (LDAP_MATCHING_RULE_IN_CHAIN), graph walks groups client side, auto picks",
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """List every member DN of a group in Microsoft Active Directory Server."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    members = list_effective_members(groupdn, strategy, config, debug) if nested else list_group_members(groupdn, config, debug)
+    for member in members:
+        typer.echo(member)
+
+@users.command("is-member")
+def cli_is_member(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        name: str = typer.Argument(..., help="A user account sAMAccountName"),
+        groupdn: str = typer.Argument(..., help="A group DN attribute value"),
+        strategy: str = typer.Option(
+            "auto",
+            "--strategy",
+            help="chain asks the server (LDAP_MATCHING_RULE_IN_CHAIN), graph walks groups client side, auto picks",
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Tell whether a user account is in a group directly or through nested groups, exit code 1 when not."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    member = is_member(name, groupdn, strategy, config, debug)
+    if member is None:
+        raise typer.Exit(code=2)
+    typer.echo("member" if member else "not member")
+    if not member:
+        raise typer.Exit(code=1)
+
+@users.command("explain")
+def cli_explain(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        name: Optional[str] = typer.Argument(None, help="A user account sAMAccountName or DN"),
+        s_filter: str = typer.Option(
+            "(sAMAccountType=805306368)",
+            "--filter",
+            help="Search filter to optimize when no name is given",
+            show_default=True
+        ),
+        ):
+
+    """Print the base, scope and filter searched for a user account or a filter, for tuning."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    typer.echo(str(explain(name, s_filter, config)))
+
+@users.command("batch")
+def cli_batch(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        input_path: str = typer.Option(
+            "-",
+            "--input",
+            "-i",
+            help="A jsonl or csv file of operations, - reads stdin",
+            show_default=True
+        ),
+        fmt: Optional[str] = typer.Option(
+            None,
+            "--format",
+            help="jsonl or csv, guessed from input extension when missing",
+        ),
+        output_path: str = typer.Option(
+            "-",
+            "--output",
+            "-o",
+            help="Where jsonl results are written, - writes stdout",
+            show_default=True
+        ),
+        workers: int = typer.Option(
+            1,
+            "--workers",
+            "-w",
+            help="Sessions running operations at the same time",
+            min=1,
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Run many create/delete/enable/disable/add-to-group/remove-from-group operations over a few sessions."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    from .batch import batch
+    counts = batch(input_path, fmt, output_path, workers, config, debug)
+    typer.echo(f"batch: {counts['total']} operations, {counts['failed']} failed", err=True)
+    if counts['failed']:
+        raise typer.Exit(code=1)
+
+@users.command("list")
+def cli_list(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        offset: int = typer.Option(
+            1,
+            "--offset",
+            help="Position (from 1) of the first user listed in the sorted result",
+            min=1,
+            show_default=True
+        ),
+        count: int = typer.Option(
+            50,
+            "--count",
+            "-n",
+            help="Users listed",
+            min=1,
+            show_default=True
+        ),
+        sort: str = typer.Option(
+            "displayName",
+            "--sort",
+            help="Attribute sorting users server side, -attr sorts descending",
+            show_default=True
+        ),
+        prefix: Optional[str] = typer.Option(
+            None,
+            "--prefix",
+            help="Start at the first user whose sort attribute is at or after prefix instead of --offset",
+        ),
+        s_filter: str = typer.Option(
+            "(sAMAccountType=805306368)",
+            "--filter",
+            help="Search filter of listed entries",
+            show_default=True
+        ),
+        attrs: Optional[List[str]] = typer.Option(
+            None,
+            "--attr",
+            "-a",
+            help="Attribute to list, repeat it for many, every attribute when missing",
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """List a window of users sorted by Microsoft Active Directory Server as jsonl, without reading the users before it."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    page = list_users(offset, count, sort, prefix, attrs or None, s_filter, config, debug)
+    if page is None:
+        raise typer.Exit(code=1)
+    typer.echo(f"list: rows {page.offset}-{page.last} of {page.total}", err=True)
+
+@users.command("export")
+def cli_export(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        output_path: str = typer.Option(
+            "-",
+            "--output",
+            "-o",
+            help="Where entries are written, - writes stdout",
+            show_default=True
+        ),
+        fmt: Optional[str] = typer.Option(
+            None,
+            "--format",
+            help="ldif or jsonl, guessed from output extension when missing",
+        ),
+        s_filter: str = typer.Option(
+            "(|(objectClass=User)(objectClass=Group))",
+            "--filter",
+            help="Search filter of exported entries",
+            show_default=True
+        ),
+        attrs: Optional[List[str]] = typer.Option(
+            None,
+            "--attr",
+            "-a",
+            help="Attribute to export, repeat it for many, every attribute when missing",
+        ),
+        compress: bool = typer.Option(
+            False,
+            "--gzip",
+            help="Compress output with gzip, on by default for .gz outputs",
+        ),
+        page_size: int = typer.Option(
+            500,
+            "--page-size",
+            help="Entries requested per page",
+            min=1,
+            show_default=True
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Export users and groups of Microsoft Active Directory Server to ldif or jsonl."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    count = export_entries(output_path, fmt, s_filter, attrs or None, compress, page_size, config, debug)
+    if count is None:
+        raise typer.Exit(code=1)
+    typer.echo(f"export: {count} entries", err=True)
+
+@users.command("changes")
+def cli_changes(
+        from_file: Optional[Path] = typer.Option(
+            None, 
+            "--file",
+            "-f",
+            help="A .env file or load from host envvars by ignoring this argument",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            writable=False,
+            readable=True,
+            resolve_path=True,
+        ),
+        state_path: Path = typer.Option(
+            ...,
+            "--state",
+            "-s",
+            help="Where the DirSync cookie or uSNChanged watermark is kept between runs, missing means a full sync",
+            dir_okay=False,
+            resolve_path=True,
+        ),
+        output_path: str = typer.Option(
+            "-",
+            "--output",
+            "-o",
+            help="Where jsonl changes are written, - writes stdout",
+            show_default=True
+        ),
+        s_filter: str = typer.Option(
+            "(|(objectClass=User)(objectClass=Group))",
+            "--filter",
+            help="Search filter of tracked entries",
+            show_default=True
+        ),
+        attrs: Optional[List[str]] = typer.Option(
+            None,
+            "--attr",
+            "-a",
+            help="Attribute to track, repeat it for many, every attribute when missing",
+        ),
+        debug: bool = typer.Option(False, help="Enable debug mode")
+        ):
+
+    """Write users and groups added, modified or deleted since the last run of Microsoft Active Directory Server."""
+    config = {}
+    if from_file:
+        config = load_env_variables_from_file(str(from_file))
+    else:
+        config = load_env_variables()
+
+    config = ensure_loaded_variables(config)
+
+    counts = sync_changes(str(state_path), output_path, s_filter, attrs or None, config, debug)
+    typer.echo(f"changes: {counts['changed']} changed, {counts['deleted']} deleted", err=True)
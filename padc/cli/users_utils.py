@@ -1,13 +1,23 @@
+from __future__ import annotations
+
 import os
-from ..msad import MsAD, AccountControlCode as Acc
-from typing import Dict
-from dotenv import dotenv_values
-from typing import Dict, Optional
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+from ..logger import match_level
+from .daemon_client import forward
+
+# python-ldap and dotenv are imported by the functions that need them,
+# so commands answered by the padc daemon and --help never load them
+if TYPE_CHECKING:
+    from ..msad import MsAD, MsADCluster, DNCache, SearchPlan, AccountControlCode as Acc
+    from ..client import ConnectionPool, VLVPage
 
 # Local Active Directory Settings
 
 def load_env_variables_from_file(file_name: str) -> Dict[str, Optional[str]]:
     """Load envinroment variables from file using dotenv module."""
+    from dotenv import dotenv_values
     return dotenv_values(file_name)
 
 def load_env_variables() -> Dict[str, Optional[str]]:
@@ -17,7 +27,11 @@ def load_env_variables() -> Dict[str, Optional[str]]:
         "BASE_DN": os.environ.get("BASE_DN"),
         "BIND_DN": os.environ.get("BIND_DN"),
         "AUTH_PASS": os.environ.get("AUTH_PASS"),
-        "CA_PATH": os.environ.get("CA_PATH")
+        "CA_PATH": os.environ.get("CA_PATH"),
+        "DN_CACHE": os.environ.get("DN_CACHE"),
+        "USERS_OU": os.environ.get("USERS_OU"),
+        "MAX_RATE": os.environ.get("MAX_RATE"),
+        "METRICS_FILE": os.environ.get("METRICS_FILE")
     }
 
 def ensure_loaded_variables(config: Dict[str, Optional[str]]) -> Dict[str, str]:
@@ -30,9 +44,105 @@ def ensure_loaded_variables(config: Dict[str, Optional[str]]) -> Dict[str, str]:
             d[f"{k}"] = ""
     return d 
 
+@lru_cache(maxsize=None)
+def _dn_cache(path: str) -> DNCache:
+    """One DN cache per store file for the whole process."""
+    from ..msad import DNCache
+    return DNCache(path=path)
+
+def config_dn_cache(config: Dict[str, str]) -> Optional[DNCache]:
+    """DN_CACHE names a sqlite file that caches resolved DNs between runs."""
+    return _dn_cache(config["DN_CACHE"]) if config.get("DN_CACHE") else None
+
+def config_uris(config: Dict[str, str]) -> List[str]:
+    """URI may list several domain controllers separated by commas or spaces."""
+    return config["URI"].replace(",", " ").split()
+
+@lru_cache(maxsize=None)
+def _metrics_textfile(path: str) -> None:
+    """Enable metrics once per textfile and write them when the process exits."""
+    import atexit
+    from ..client import METRICS
+    METRICS.enable()
+    atexit.register(METRICS.write_textfile, path)
+
+def config_metrics(config: Dict[str, str]) -> None:
+    """METRICS_FILE names a prometheus textfile with operation counters and latencies."""
+    if config.get("METRICS_FILE"):
+        _metrics_textfile(config["METRICS_FILE"])
+
+def config_max_rate(config: Dict[str, str]) -> Optional[float]:
+    """MAX_RATE is a hard ceiling of write operations per second sent by bulk commands."""
+    return float(config["MAX_RATE"]) if config.get("MAX_RATE") else None
+
+def new_msad(config: Dict[str, str], debug = False) -> MsAD:
+    """Create a ms ad client from config."""
+    from ..msad import MsAD
+    config_metrics(config)
+    # the client connects to the fastest URI answering and fails over to the others
+    ad = MsAD(" ".join(config_uris(config)), config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug, config_dn_cache(config))
+    ad.max_rate = config_max_rate(config)
+    return ad
+
+def session_pool(config: Dict[str, str], size: int = 4, debug = False) -> Union[ConnectionPool, MsADCluster]:
+    """Create a pool of bound ms ad sessions, so tls and bind are reused between operations.
+
+    When URI lists several domain controllers each one gets size sessions and operations go to the best one.
+    """
+    from ..msad import MsAD, MsADCluster
+    from ..client import ConnectionPool
+    config_metrics(config)
+    uris = config_uris(config)
+    if len(uris) > 1:
+        return MsADCluster(
+            uris, config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"],
+            config["CA_PATH"], size, debug, config_dn_cache(config)
+        )
+    return ConnectionPool(
+        lambda: MsAD.bound(
+            config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"],
+            config["CA_PATH"], debug, config_dn_cache(config)
+        ),
+        size
+    )
+
+def account_filter(name: str) -> str:
+    """Search filter of a user account by sAMAccountName."""
+    from ..msad import account_filter as escaped_account_filter
+    return escaped_account_filter(name)
+
+def account_lookup(name: str, config: Dict[str, str]) -> SearchPlan:
+    """Search of a user account, USERS_OU narrows it to the OU holding the accounts and a DN is read with a base search."""
+    from ..msad import account_plan
+    return account_plan(name, config["BASE_DN"], config.get("USERS_OU") or None)
+
+def explain(name: Optional[str], s_filter: str, config: Dict[str, str]) -> SearchPlan:
+    """Search run for a user account lookup, or for s_filter when name is missing, without connecting."""
+    from ..msad import SearchPlan, optimize_filter
+    if name:
+        return account_lookup(name, config)
+    return SearchPlan(config["BASE_DN"], optimize_filter(s_filter))
+
+def load_names_from_file(file_name: str) -> List[str]:
+    """Load one sAMAccountName per line, empty lines and lines starting with # are ignored."""
+    with open(file_name, "r") as names:
+        return [n.strip() for n in names if n.strip() and not n.lstrip().startswith('#')]
+
+def _forwarded(op: Dict[str, object], config: Dict[str, str], debug = False) -> bool:
+    """Run operation on a padc daemon serving config and log its result, False when it must run locally."""
+    if debug:
+        return False
+    response = forward(op, config)
+    if response is None:
+        return False
+    match_level(response["message"], logging.INFO if response["ok"] else logging.ERROR)
+    return True
+
 def create_user(name: str, passwd: str, config: Dict[str, str], acc: Acc, debug = False):
     """Create user in ms ad server."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    if _forwarded({'op': 'create', 'name': name, 'password': passwd, 'acc': acc.value}, config, debug):
+        return
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
     ldap.create_user(name, passwd, acc).unwrap()
@@ -40,44 +150,247 @@ def create_user(name: str, passwd: str, config: Dict[str, str], acc: Acc, debug
 
 def create_user_from_ldif(from_ldif: str, config: Dict[str, str], debug = False):
     """Create user in ms ad server from ldif file."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
     ldap.create_user_from_ldif(from_ldif).unwrap()
     ldap.close().unwrap()
 
+def import_ldif(from_ldif: str, config: Dict[str, str], window: int = 32, debug = False) -> bool:
+    """Apply every record of a ldif file in ms ad server, pipelining window operations, True when every record was applied."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    report = ldap.import_ldif(from_ldif, window).unwrap()
+    ldap.close().unwrap()
+    if isinstance(report, str):
+        return False
+    for failed in report.failed:
+        match_level('import_ldif::%s', logging.ERROR, failed)
+    match_level('import_ldif::%s', logging.INFO if report.error is None else logging.ERROR, report)
+    return not report.failed and report.error is None
+
 def add_account_to_group(name: str, group_dn: str, config: Dict[str, str], debug = False):
     """Add a user account to a group of Active directory server."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    if _forwarded({'op': 'add-to-group', 'name': name, 'group': group_dn}, config, debug):
+        return
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
-    s_filter = f"(&(objectClass=User)(sAMAccountName={name}))"
+    s_filter = account_lookup(name, config)
     ldap.add_account_to_group(s_filter, group_dn).unwrap()
     ldap.close().unwrap()
 
 def remove_account_from_group(name: str, group_dn: str, config: Dict[str, str], debug = False):
     """Remove user account from a group of Active directory server."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    if _forwarded({'op': 'remove-from-group', 'name': name, 'group': group_dn}, config, debug):
+        return
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
-    s_filter = f"(&(objectClass=User)(sAMAccountName={name}))"
+    s_filter = account_lookup(name, config)
     ldap.remove_account_from_group(s_filter, group_dn).unwrap()
     ldap.close().unwrap()
 
 def modify_acc(name: str, acc: Acc, config: Dict[str, str], debug = False):
     """Enable/Disable user account in ms ad server."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    from ..msad import AccountControlCode as Acc
+    if _forwarded({'op': 'enable' if acc == Acc.NormalAccount else 'disable', 'name': name}, config, debug):
+        return
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
-    s_filter = f"(&(objectClass=User)(sAMAccountName={name}))"
+    s_filter = account_lookup(name, config)
     ldap.modify_account_control(s_filter, acc).unwrap()
     ldap.close().unwrap()
 
+def update_account_control(
+        s_filter: str, base: Optional[str], set_flags: int, clear_flags: int,
+        window: int, config: Dict[str, str], debug = False) -> bool:
+    """Set and clear userAccountControl flags of every account matching filter, True when every modify succeeded."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    report = ldap.update_account_control(s_filter, set_flags, clear_flags, base, window).unwrap()
+    ldap.close().unwrap()
+    if isinstance(report, str):
+        return False
+    for failed in report.failed:
+        match_level('update_account_control::%s', logging.ERROR, failed)
+    match_level('update_account_control::%s', logging.INFO, report)
+    return not report.failed
+
 def delete_account(name: str, config: Dict[str, str], debug = False):
     """Delete user account in ms ad server."""
-    ldap = MsAD(config["URI"], config["BASE_DN"], config["BIND_DN"], config["AUTH_PASS"], debug)
+    if _forwarded({'op': 'delete', 'name': name}, config, debug):
+        return
+    ldap = new_msad(config, debug)
     ldap.start_tls(config["CA_PATH"]).unwrap()
     ldap.connect().unwrap()
     ldap.delete_user(name).unwrap()
     ldap.close().unwrap()
 
+def update_group_members(group_dn: str, add: List[str], remove: List[str], exact: bool, config: Dict[str, str], debug = False):
+    """Add/remove many user accounts of a group of Active directory server."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    ldap.update_group_members(group_dn, add, remove, exact).unwrap()
+    ldap.close().unwrap()
+
+def list_group_members(group_dn: str, config: Dict[str, str], debug = False) -> List[str]:
+    """List every member DN of a group of Active directory server."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    members = ldap.group_members(group_dn).unwrap()
+    ldap.close().unwrap()
+    return members if isinstance(members, list) else []
+
+def is_member(name: str, group_dn: str, strategy: str, config: Dict[str, str], debug = False) -> Optional[bool]:
+    """Tell whether user account is in a group directly or through nested groups, None when the check failed."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    member = ldap.is_member(account_lookup(name, config), group_dn, strategy).unwrap()
+    ldap.close().unwrap()
+    return member if isinstance(member, bool) else None
+
+def list_effective_members(group_dn: str, strategy: str, config: Dict[str, str], debug = False) -> List[str]:
+    """List every member DN of a group including members of nested groups."""
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    members = ldap.effective_members(group_dn, strategy).unwrap()
+    ldap.close().unwrap()
+    return members if isinstance(members, list) else []
+
+def list_users(
+        offset: int, count: int, sort: str, prefix: Optional[str], attrs: Optional[List[str]],
+        s_filter: str, config: Dict[str, str], debug = False) -> Optional[VLVPage]:
+    """Write one window of users sorted server side as jsonl to stdout, None when the server refused the listing."""
+    import sys
+    import json
+    from ..msad import json_attributes
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    page = ldap.list_users(offset, count, sort, prefix, attrs, s_filter).unwrap()
+    ldap.close().unwrap()
+    if isinstance(page, str):
+        return None
+    for entry in page.entries:
+        sys.stdout.write(json.dumps({'dn': entry.dn, 'attributes': json_attributes(entry)}, ensure_ascii=False) + "\n")
+    return page
+
+def export_entries(
+        output_path: str, fmt: Optional[str], s_filter: str, attrs: Optional[List[str]],
+        compress: bool, page_size: int, config: Dict[str, str], debug = False) -> Optional[int]:
+    """Stream entries matching filter to output_path ("-" is stdout) as ldif or jsonl, optionally gzipped.
+
+    Format is guessed from output_path extension when missing, a .gz suffix turns compression on.
+    Returns the count of entries written, None when the export failed.
+    """
+    import sys
+    import gzip
+    compress = compress or output_path.endswith(".gz")
+    if fmt is None:
+        fmt = "jsonl" if output_path.removesuffix(".gz").endswith(".jsonl") else "ldif"
+
+    # writes are flushed every 64KiB
+    if output_path == "-":
+        target = gzip.open(sys.stdout.buffer, "wt", encoding="utf-8") if compress else sys.stdout
+    elif compress:
+        target = gzip.open(output_path, "wt", encoding="utf-8")
+    else:
+        target = open(output_path, "w", encoding="utf-8", buffering=1 << 16)
+
+    ldap = new_msad(config, debug)
+    try:
+        ldap.start_tls(config["CA_PATH"]).unwrap()
+        ldap.connect().unwrap()
+        count = ldap.export(target, s_filter, attrs, fmt, page_size).unwrap()
+        ldap.close().unwrap()
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    return count if isinstance(count, int) else None
+
+def sync_changes(
+        state_path: str, output_path: str, s_filter: str, attrs: Optional[List[str]],
+        config: Dict[str, str], debug = False) -> Dict[str, int]:
+    """Write entries changed since the state saved at state_path as jsonl to output_path ("-" is stdout).
+
+    State is saved only after every change was written, an interrupted run is replayed by the next one.
+    """
+    import sys
+    import json
+    from ..msad import SyncState, ChangeKind, json_attributes
+    state = SyncState.load(state_path)
+    counts = {kind.value: 0 for kind in ChangeKind}
+
+    target = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8", buffering=1 << 16)
+    ldap = new_msad(config, debug)
+    try:
+        ldap.start_tls(config["CA_PATH"]).unwrap()
+        ldap.connect().unwrap()
+        changes = ldap.changes(state, s_filter, attrs).unwrap()
+        # an error result unwraps to its logged message, state is then left untouched
+        if not isinstance(changes, str):
+            for change in changes:
+                target.write(json.dumps(
+                    {'change': change.kind.value, 'dn': change.dn, 'attributes': json_attributes(change.entry)},
+                    ensure_ascii=False
+                ))
+                target.write("\n")
+                counts[change.kind.value] += 1
+            target.flush()
+            state.save(state_path)
+            match_level('sync_changes::%s', logging.INFO, state)
+        ldap.close().unwrap()
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    return counts
+
+def reconcile_users(
+        desired_path: str, dry_run: bool, window: int, plan_path: Optional[str],
+        config: Dict[str, str], debug = False) -> bool:
+    """Bring users to the desired state of desired_path ("-" is stdin), True when every write succeeded.
+
+    Planned writes are written as jsonl to plan_path ("-" is stdout) when given.
+    """
+    import sys
+    import json
+    from ..msad import read_desired_state
+    source = sys.stdin if desired_path == "-" else open(desired_path, "r")
+    try:
+        desired = list(read_desired_state(source))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    ldap = new_msad(config, debug)
+    ldap.start_tls(config["CA_PATH"]).unwrap()
+    ldap.connect().unwrap()
+    plan = ldap.reconcile(desired, dry_run, window).unwrap()
+    ldap.close().unwrap()
+    if isinstance(plan, str):
+        return False
+
+    if plan_path:
+        target = sys.stdout if plan_path == "-" else open(plan_path, "w")
+        try:
+            for record in plan.describe():
+                target.write(json.dumps(record) + "\n")
+        finally:
+            if target is not sys.stdout:
+                target.close()
+
+    for error in plan.errors:
+        match_level('reconcile::%s', logging.ERROR, error)
+    for report in plan.reports:
+        for failed in report.failed:
+            match_level('reconcile::%s', logging.ERROR, failed)
+    match_level('reconcile::%s%s', logging.INFO, "plan " if dry_run else "", plan)
+    return not plan.errors and not any(report.failed for report in plan.reports)
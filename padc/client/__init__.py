@@ -1 +1,9 @@
 from .client import *
+from .operations import *
+from .pool import *
+from .metrics import *
+from .dirsync import *
+from .vlv import *
+from .endpoints import *
+from .concurrency import *
+from .async_client import *
@@ -0,0 +1,175 @@
+import time
+import asyncio
+import ldap
+from typing import List, Dict, Tuple, Optional, Any
+
+from ldap.modlist import modifyModlist, addModlist
+from .client import Client, Scope
+from .endpoints import Endpoints
+from .state import State
+from .error_handler import catch_exception, LdapSuccessResult
+
+
+class AsyncClient(Client):
+    """Client whose operations are awaited on an asyncio event loop.
+
+    Requests are sent with the non-blocking message id calls of python-ldap and
+    their results are read from the connection socket by the event loop, so many
+    coroutines can share one connection at the same time.
+
+    Tls and bind are recorded like Client does, ranking servers of shared endpoints, but
+    a lost connection is not reopened: every waiting request fails, the server is marked
+    failed and the client stays Disconnected, open a new one to go on.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, uri: str, log_level: int = 0, debug: bool = False, endpoints: Optional[Endpoints] = None) -> None:
+        Client.__init__(self, uri, log_level, debug, endpoints)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd: Optional[int] = None
+        self._poll: Optional[asyncio.TimerHandle] = None
+
+    def __watch(self) -> None:
+        """Register connection socket on the running loop, done on first request."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._fd is None:
+            self._fd = self.connection.get_option(ldap.OPT_DESC)
+            self._loop.add_reader(self._fd, self.__drain)
+        if self._poll is None:
+            self._poll = self._loop.call_later(self.poll_interval, self.__poll_pending)
+
+    def __unwatch(self) -> None:
+        if self._fd is not None and self._loop is not None:
+            self._loop.remove_reader(self._fd)
+        self._fd = None
+
+    def __poll_pending(self) -> None:
+        """Drain periodically while requests wait, tls may hold decrypted data the socket never signals."""
+        self._poll = None
+        if self._fd is None or not self._pending:
+            return
+        self.__drain()
+        self._poll = self._loop.call_later(self.poll_interval, self.__poll_pending)
+
+    def __drain(self) -> None:
+        """Hand every complete result available without blocking to its waiting future."""
+        while self._pending:
+            try:
+                rtype, data, msgid, ctrls = self.connection.result3(ldap.RES_ANY, 1, 0)
+            except ldap.LDAPError as e:
+                info = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+                future = self._pending.pop(info.get('msgid'), None)
+                if future is None:
+                    # connection level failure, nobody can expect an answer anymore
+                    self.endpoints.fail(self.uri)
+                    pending, self._pending = self._pending, {}
+                    for f in pending.values():
+                        if not f.done():
+                            f.set_exception(e)
+                    self.__unwatch()
+                    return
+                if not future.done():
+                    future.set_exception(e)
+                continue
+
+            if rtype is None:
+                return
+            future = self._pending.pop(msgid, None)
+            if future is not None and not future.done():
+                future.set_result((rtype, data, msgid, ctrls))
+
+    async def _result(self, msgid: int) -> Tuple[int, Any, int, List[Any]]:
+        """Wait for the complete result of message id."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msgid] = future
+        self.__watch()
+        self.__drain()
+        try:
+            return await future
+        finally:
+            self._pending.pop(msgid, None)
+
+    @catch_exception
+    async def _start_tls_async(self, ca_path: Optional[str] = None) -> LdapSuccessResult:
+        """Start tls connection, python-ldap has no asynchronous StartTLS so the handshake runs in the default executor."""
+
+        assert self.state == State.Connected, "Cannot start tls without initialized connection"
+        await asyncio.get_running_loop().run_in_executor(None, self._handshake, ca_path)
+        return LdapSuccessResult("_start_tls: Started tls ldap server connection")
+
+    @catch_exception
+    async def _bind_async(self, new_bind: str, new_pass: str) -> LdapSuccessResult:
+        """Bind to connected server."""
+
+        assert self.state == State.Connected, "Cannot perform bind without connection"
+
+        started = time.monotonic()
+        await self._result(self.connection.simple_bind(new_bind, new_pass))
+        self._signed(new_bind, new_pass, time.monotonic() - started)
+
+        return LdapSuccessResult(f"_bind: {new_bind}")
+
+    @catch_exception
+    async def _search_async(self, base: str, s_filter: str, attr: Optional[List[str]], scope: Scope = Scope.SubTree) -> LdapSuccessResult:
+        """Perform LDAP search on target DN, if attributes are None all objects will return."""
+
+        assert self.state == State.Signed, "Cannot perform search without a signed connection"
+        _, entry, _, _ = await self._result(self.connection.search_ext(base, scope.value, s_filter, attr, 0))
+        return LdapSuccessResult(entry)
+
+    @catch_exception
+    async def _modify_add_async(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
+        """Modify entry by modlist add operation on it at target_dn."""
+        assert self.state == State.Signed, "Cannot perform modify without a signed connection"
+        modlist = [ (ldap.MOD_ADD, k, v) for k,v in entry.items() ]
+        await self._result(self.connection.modify_ext(target_dn, modlist))
+        return LdapSuccessResult(f"_modify_add: {target_dn}")
+
+    @catch_exception
+    async def _modify_delete_async(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
+        """Modify entry by modlist delete operation on it at target_dn."""
+        assert self.state == State.Signed, "Cannot perform modify without a signed connection"
+        modlist = [ (ldap.MOD_DELETE, k, v) for k,v in entry.items() ]
+        await self._result(self.connection.modify_ext(target_dn, modlist))
+        return LdapSuccessResult(f"_modify_delete: {target_dn}")
+
+    @catch_exception
+    async def _modify_replace_async(self, target_dn: str, entry: Tuple[Dict[str, Any], Dict[str, Any]]) -> LdapSuccessResult:
+        """Modify entries by modlist replace (delete and add) operation on it based on argument entry."""
+
+        assert self.state == State.Signed, "Cannot perform modify without a signed connection"
+        old,new = entry
+        await self._result(self.connection.modify_ext(target_dn, modifyModlist(old, new)))
+        return LdapSuccessResult(f"_modify_replace: {target_dn}")
+
+    @catch_exception
+    async def _add_async(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
+        """Create a new entry at target DN."""
+
+        assert self.state == State.Signed, "Cannot perform add without a signed connection"
+        await self._result(self.connection.add_ext(target_dn, addModlist(entry)))
+        return LdapSuccessResult(f"_add: {target_dn}")
+
+    @catch_exception
+    async def _delete_async(self, target_dn: str) -> LdapSuccessResult:
+        """Delete entry based on target DN."""
+        assert self.state == State.Signed, "Cannot perform delete without signed connection"
+
+        await self._result(self.connection.delete_ext(target_dn))
+        return LdapSuccessResult(f"_delete: {target_dn}")
+
+    @catch_exception
+    async def _close_async(self) -> LdapSuccessResult:
+        """Close connection with LDAP server once no request is waiting anymore."""
+
+        assert self.state == State.Signed, "Cannot close connection without a connection"
+        if self._pending:
+            await asyncio.gather(*self._pending.values(), return_exceptions=True)
+        self.__unwatch()
+        self.connection.unbind_s()
+        self.state = State.Disconnected
+
+        return LdapSuccessResult("_close: Unbinded connection in ldap server")
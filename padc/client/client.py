@@ -1,12 +1,22 @@
-import sys, ldap
-from typing import List, Dict, Tuple, Optional, Any
+import sys, ldap, time, random
+from collections import deque
+from typing import List, Dict, Deque, Tuple, Optional, Any, Iterable, Iterator, IO
 from enum import Enum
 
 from ldap.modlist import modifyModlist, addModlist
 from ldap.dn import str2dn
+from ldap.controls import SimplePagedResultsControl
+from ldap.controls.sss import SSSRequestControl
+from ldap.controls.vlv import VLVRequestControl, VLVResponseControl
 from ldif import LDIFRecordList
 from .state import State
-from .error_handler import catch_exception, LdapSuccessResult
+from .operations import OpKind, Operation, OperationResult, PipelineReport
+from .ldif_records import LDIFChangeRecordList
+from .dirsync import DirSyncControl
+from .vlv import VLVPage
+from .endpoints import Endpoints
+from .concurrency import ConcurrencyLimit, is_busy
+from .error_handler import catch_exception, reconnect, LdapSuccessResult, LdapErrorResult, UNAVAILABLE
 
 class Scope(Enum):
     """Search Scope interface."""
@@ -17,14 +27,39 @@ class Scope(Enum):
         return f'Scope: {self.name}'
 
 class Client:
-    """Base class to manipulate LDAP connections!"""
+    """Base class to manipulate LDAP connections!
+
+    uri may list several servers separated by spaces or commas, the connection goes to the
+    fastest one answering. When the server is lost the client reconnects to the best server
+    left, replaying start tls and bind, idempotent operations are retried up to retries times
+    with jittered exponential backoff. Servers failing to connect are skipped for a cooldown.
+
+    Pipelined writes adapt their window up to max_window and never send more than max_rate
+    operations per second when it is set.
+    """
+
+    retries = 2
+    retry_backoff = 0.1
+    retry_backoff_max = 2.0
+    max_window = 256
+    max_rate: Optional[float] = None
    
     @catch_exception
-    def __init__(self, uri: str, log_level: int = 0, debug: bool = False) -> None:
-        """Initialize a new LDAP object."""
+    def __init__(self, uri: str, log_level: int = 0, debug: bool = False, endpoints: Optional[Endpoints] = None) -> None:
+        """Initialize a new LDAP object, endpoints may be shared by clients to share server health."""
 
         self.debug = debug
-        self.connection = ldap.initialize(uri, log_level, sys.stderr)
+        self.log_level = log_level
+        self.endpoints = endpoints or Endpoints(uri.replace(',', ' ').split())
+        self.__tls: Optional[Tuple[Optional[str]]] = None
+        self.__credentials: Optional[Tuple[str, str]] = None
+        self.__connect_time = 0.0
+        self.__open(self.endpoints.ranked()[0])
+
+    def __open(self, uri: str) -> None:
+        """Initialize connection object to uri, nothing is sent before the first operation."""
+        self.uri = uri
+        self.connection = ldap.initialize(uri, self.log_level, sys.stderr)
         self.connection.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
         self.connection.set_option(ldap.OPT_REFERRALS, 0)
 
@@ -32,22 +67,80 @@ class Client:
             self.connection.set_option(ldap.OPT_DEBUG_LEVEL, 255)
 
         self.state = State.Connected
+        self.__connect_time = 0.0
 
-    @catch_exception
-    def _start_tls(self, ca_path: Optional[str] = None) -> LdapSuccessResult:
-        """Start tls connection by passing a ca-certificate path."""
-
-        assert self.state == State.Connected, "Cannot start tls without initialized connection"
-
+    def _handshake(self, ca_path: Optional[str]) -> None:
+        """Start tls over the connection, blocking, and remember it so a reconnect starts tls again."""
+        started = time.monotonic()
         if ca_path:
             self.connection.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_DEMAND)
             self.connection.set_option(ldap.OPT_X_TLS_CACERTFILE, ca_path)
 
         self.connection.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
         self.connection.start_tls_s()
+        self.__connect_time += time.monotonic() - started
+        self.__tls = (ca_path,)
+
+    def _signed(self, new_bind: str, new_pass: str, seconds: float) -> None:
+        """Record a bind that took seconds, credentials are kept so a reconnect binds again."""
+        self.__connect_time += seconds
+        self.__credentials = (new_bind, new_pass)
+        self.state = State.Signed
+        # a bound connection closes the circuit of its server and ranks it by connect latency
+        self.endpoints.observe(self.uri, self.__connect_time)
+
+    def __simple_bind(self, new_bind: str, new_pass: str) -> None:
+        started = time.monotonic()
+        self.connection.simple_bind_s(new_bind, new_pass)
+        self._signed(new_bind, new_pass, time.monotonic() - started)
+
+    @property
+    def lost(self) -> bool:
+        """True when the server connection was lost, the next operation reconnects."""
+        return self.state == State.Disconnected and self.__credentials is not None
+
+    def _reconnect(self, attempt: int = 0) -> None:
+        """Drop the lost connection and open one on the best server left, replaying tls and bind done before.
+
+        Waits a random time up to retry_backoff * 2 ** attempt first, so clients do not reconnect in lockstep
+        when a server restarts. Raise the error of the last server tried when none answers.
+        """
+        self.endpoints.fail(self.uri)
+        try:
+            self.connection.unbind_ext()
+        except ldap.LDAPError:
+            pass
+        time.sleep(random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * 2 ** attempt)))
+
+        ranked = self.endpoints.ranked()
+        error: Optional[ldap.LDAPError] = None
+        # servers in cooldown are only tried when no server is up
+        for uri in [u for u in ranked if self.endpoints.up(u)] or ranked[:1]:
+            try:
+                self.__open(uri)
+                if self.__tls is not None:
+                    self._handshake(*self.__tls)
+                if self.__credentials is not None:
+                    self.__simple_bind(*self.__credentials)
+                return
+            except UNAVAILABLE as e:
+                self.endpoints.fail(uri)
+                error = e
+        self.state = State.Disconnected
+        raise error
+
+    @catch_exception
+    @reconnect(idempotent=True)
+    def _start_tls(self, ca_path: Optional[str] = None) -> LdapSuccessResult:
+        """Start tls connection by passing a ca-certificate path."""
+
+        assert self.state == State.Connected, "Cannot start tls without initialized connection"
+
+        self._handshake(ca_path)
         return LdapSuccessResult("_start_tls: Started tls ldap server connection")
 
     @catch_exception
+    @reconnect(idempotent=True)
     def _search(self, base: str, s_filter: str,  attr: Optional[List[str]], scope: Scope = Scope.SubTree) -> LdapSuccessResult:
         """Perform LDAP search on target DN, if attributes are None all objects will return."""
 
@@ -55,7 +148,136 @@ class Client:
         entry = self.connection.search_s(base, scope.value, s_filter, attr, 0)
         return LdapSuccessResult(entry)
    
+    def __pages(
+            self, base: str,
+            s_filter: str,
+            attr: Optional[List[str]],
+            scope: Scope,
+            page_size: int,
+            controls: List[Any]) -> Iterator[Tuple[str, Any]]:
+        """Request one page at a time, next page is only requested when the previous one was consumed."""
+        control = SimplePagedResultsControl(True, size=page_size, cookie='')
+        done = False
+        try:
+            while not done:
+                msgid = self.connection.search_ext(base, scope.value, s_filter, attr, 0, serverctrls=[control, *controls])
+                _, data, _, resp_ctrls = self.connection.result3(msgid)
+                control.cookie = next(
+                    (c.cookie for c in resp_ctrls if c.controlType == SimplePagedResultsControl.controlType), b''
+                )
+                done = not control.cookie
+                yield from data
+        except ldap.LDAPError as e:
+            if self.debug:
+                raise e
+            raise LdapErrorResult(e)
+        finally:
+            if not done and control.cookie:
+                # caller stopped early, a zero sized page releases the server side cursor
+                control.size = 0
+                try:
+                    self.connection.result3(
+                        self.connection.search_ext(base, scope.value, s_filter, attr, 0, serverctrls=[control, *controls])
+                    )
+                except ldap.LDAPError:
+                    pass
+
+    @catch_exception
+    @reconnect()
+    def _paged_search(
+            self, base: str,
+            s_filter: str,
+            attr: Optional[List[str]],
+            scope: Scope = Scope.SubTree,
+            page_size: int = 500,
+            controls: Optional[List[Any]] = None) -> LdapSuccessResult:
+        """Perform LDAP search with Simple Paged Results control, payload is a generator of (dn, entry) tuples read page by page."""
+
+        assert self.state == State.Signed, "Cannot perform search without a signed connection"
+        assert page_size >= 1, "Page size must be at least 1"
+        return LdapSuccessResult(self.__pages(base, s_filter, attr, scope, page_size, controls or []))
+
+    def __dirsync_pages(
+            self, base: str,
+            s_filter: str,
+            attr: Optional[List[str]],
+            control: DirSyncControl) -> Iterator[Tuple[str, Any]]:
+        """Request DirSync batches until the server has no more results, control.cookie follows every batch."""
+        more = True
+        try:
+            while more:
+                msgid = self.connection.search_ext(base, Scope.SubTree.value, s_filter, attr, 0, serverctrls=[control])
+                _, data, _, controls = self.connection.result3(
+                    msgid, resp_ctrl_classes={DirSyncControl.controlType: DirSyncControl}
+                )
+                response = next((c for c in controls if c.controlType == DirSyncControl.controlType), None)
+                if response is None:
+                    raise ldap.UNAVAILABLE_CRITICAL_EXTENSION({'desc': 'DirSync response control missing'})
+                yield from data
+                control.cookie = response.cookie
+                more = response.more_results
+        except ldap.LDAPError as e:
+            if self.debug:
+                raise e
+            raise LdapErrorResult(e)
+
     @catch_exception
+    @reconnect()
+    def _dirsync_search(
+            self, base: str,
+            s_filter: str,
+            attr: Optional[List[str]],
+            control: DirSyncControl) -> LdapSuccessResult:
+        """Perform LDAP search with DirSync control, payload is a generator of (dn, entry) changed since control.cookie.
+
+        base must be a naming context root. control.cookie is updated once each batch was consumed,
+        save it after the generator is exhausted to resume from there.
+        """
+
+        assert self.state == State.Signed, "Cannot perform search without a signed connection"
+        return LdapSuccessResult(self.__dirsync_pages(base, s_filter, attr, control))
+
+    @catch_exception
+    @reconnect(idempotent=True)
+    def _vlv_search(
+            self, base: str,
+            s_filter: str,
+            attr: Optional[List[str]],
+            sort: List[str],
+            after: int,
+            before: int = 0,
+            offset: Optional[int] = None,
+            value: Optional[str] = None,
+            context_id: Optional[str] = None) -> LdapSuccessResult:
+        """Perform LDAP search with Server Side Sort and Virtual List View controls, payload is a VLVPage.
+
+        Entries are sorted by sort (attributes, '-attr' for descending) and the target is the
+        offset-th (from 1) entry or the first one sorting at or after value, only before entries
+        ahead of it and after entries behind it are returned.
+        """
+
+        assert self.state == State.Signed, "Cannot perform search without a signed connection"
+        assert (offset is None) != (value is None), "Either offset or value selects the target entry"
+
+        vlv = VLVRequestControl(
+            True, before, after, offset, None if offset is None else 0, value, context_id
+        )
+        msgid = self.connection.search_ext(
+            base, Scope.SubTree.value, s_filter, attr, 0, serverctrls=[SSSRequestControl(True, sort), vlv]
+        )
+        _, data, _, controls = self.connection.result3(
+            msgid, resp_ctrl_classes={VLVResponseControl.controlType: VLVResponseControl}
+        )
+        response = next((c for c in controls if c.controlType == VLVResponseControl.controlType), None)
+        if response is None:
+            raise ldap.UNAVAILABLE_CRITICAL_EXTENSION({'desc': 'Virtual List View response control missing'})
+
+        entries = [(dn, entry) for dn, entry in data if dn is not None]
+        first = response.target_position - min(before, response.target_position - 1)
+        return LdapSuccessResult(VLVPage(entries, first, response.content_count, response.context_id))
+
+    @catch_exception
+    @reconnect()
     def _modify_add(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
         """Modify entry by modlist add operation on it at target_dn."""
         assert self.state == State.Signed, "Cannot perform modify without a signed connection"
@@ -64,6 +286,7 @@ class Client:
         return LdapSuccessResult(f"_modify_add: {target_dn}")
 
     @catch_exception
+    @reconnect()
     def _modify_delete(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
         """Modify entry by modlist delete operation on it at target_dn."""
         assert self.state == State.Signed, "Cannot perform modify without a signed connection"
@@ -72,6 +295,7 @@ class Client:
         return LdapSuccessResult(f"_modify_delete: {target_dn}")
 
     @catch_exception
+    @reconnect()
     def _modify_replace(self, target_dn: str, entry: Tuple[Dict[str, Any], Dict[str, Any]]) -> LdapSuccessResult:
         """Modify entries by modlist replace (delete and add) operation on it based on argument entry."""
 
@@ -83,6 +307,7 @@ class Client:
         return LdapSuccessResult(f"_modify_replace: {target_dn}")
 
     @catch_exception
+    @reconnect()
     def _add(self, target_dn: str, entry: Dict[str, Any]) -> LdapSuccessResult:
         """Create a new entry at target DN."""
         
@@ -93,6 +318,7 @@ class Client:
         return LdapSuccessResult(f"_add: {target_dn}")
 
     @catch_exception
+    @reconnect()
     def _delete(self, target_dn: str) -> LdapSuccessResult:
         """Delete entry based on target DN."""
         assert self.state == State.Signed, "Cannot perform delete without signed connection"
@@ -108,28 +334,152 @@ class Client:
     @catch_exception
     def _parse_ldif(self, ldif_path: str) -> LdapSuccessResult:
         """Parse a ldif file, return all records inside payload."""
-        parser = LDIFRecordList(open(ldif_path, "r"))
-        parser.parse()
+        with open(ldif_path, "r") as ldif_file:
+            parser = LDIFRecordList(ldif_file)
+            parser.parse()
+        return LdapSuccessResult(parser.all_records)
+
+    @catch_exception
+    def _parse_ldif_changes(self, ldif_path: str) -> LdapSuccessResult:
+        """Parse a ldif file honouring changetype, return a list of operations inside payload."""
+        with open(ldif_path, "r") as ldif_file:
+            parser = LDIFChangeRecordList(ldif_file)
+            parser.parse()
         return LdapSuccessResult(parser.all_records)
 
+    @staticmethod
+    def __ldif_records(ldif_file: IO[str]) -> Iterator[Operation]:
+        with ldif_file:
+            yield from LDIFChangeRecordList(ldif_file).records()
+
+    @catch_exception
+    def _stream_ldif_changes(self, ldif_path: str) -> LdapSuccessResult:
+        """Parse a ldif file honouring changetype, payload is a generator of operations parsed as it is consumed."""
+        return LdapSuccessResult(self.__ldif_records(open(ldif_path, "r")))
+
+    def _send(self, operation: Operation) -> int:
+        """Send operation without waiting for its response, return the message id."""
+        match operation.kind:
+            case OpKind.Add:
+                return self.connection.add_ext(operation.dn, addModlist(operation.payload))
+            case OpKind.Modify:
+                return self.connection.modify_ext(operation.dn, operation.payload)
+            case OpKind.Delete:
+                return self.connection.delete_ext(operation.dn)
+
     @catch_exception
+    @reconnect()
+    def _pipeline(
+            self, operations: Iterable[Operation],
+            window: int = 32,
+            keep_succeeded: bool = True,
+            limit: Optional[ConcurrencyLimit] = None) -> LdapSuccessResult:
+        """Send operations asynchronously keeping at most limit.window of them in flight.
+
+        A failed operation is recorded in the report and does not stop the others,
+        only losing the server connection aborts the pipeline. operations are pulled
+        from the iterable as the window frees up, so a generator is consumed lazily.
+
+        The window starts at window and adapts (see ConcurrencyLimit) up to max_window,
+        operations refused by a busy server are sent again up to retries times. When reading
+        operations raises, nothing more is sent and the error is kept in report.error.
+        """
+
+        assert self.state == State.Signed, "Cannot perform pipeline without a signed connection"
+        assert window >= 1, "Pipeline window must be at least 1"
+
+        if limit is None:
+            limit = ConcurrencyLimit(window, maximum=max(window, self.max_window), max_rate=self.max_rate)
+        report = PipelineReport(keep_succeeded)
+        pending = iter(operations)
+        refused: Deque[Tuple[Operation, int]] = deque()
+        # msgid: (operation, attempt, sent at)
+        in_flight: Dict[int, Tuple[Operation, int, float]] = {}
+        exhausted = False
+
+        while in_flight or refused or not exhausted:
+            while (refused or not exhausted) and len(in_flight) < limit.window:
+                delay = limit.delay()
+                if delay > 0 and in_flight:
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+                if refused:
+                    operation, attempt = refused.popleft()
+                else:
+                    try:
+                        operation, attempt = next(pending, None), 0
+                    except Exception as e:
+                        # stop sending, operations in flight are still answered and reported
+                        report.error = e
+                        operation = None
+                    if operation is None:
+                        exhausted = True
+                        break
+                limit.sent()
+                try:
+                    in_flight[self._send(operation)] = (operation, attempt, time.monotonic())
+                except ldap.SERVER_DOWN:
+                    raise
+                except ldap.LDAPError as e:
+                    report.add(OperationResult(operation, e))
+
+            if not in_flight:
+                continue
+
+            # with sends paced by max_rate wait for results only until the next send
+            delay = limit.delay() if (refused or not exhausted) and len(in_flight) < limit.window else -1
+            try:
+                _, _, msgid, _ = self.connection.result3(ldap.RES_ANY, 1, delay if delay > 0 else -1)
+                operation, _, sent = in_flight.pop(msgid)
+                limit.observe(time.monotonic() - sent)
+                report.add(OperationResult(operation))
+            except ldap.TIMEOUT:
+                continue
+            except ldap.SERVER_DOWN:
+                raise
+            except ldap.LDAPError as e:
+                info = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+                if info.get('msgid') not in in_flight:
+                    raise
+                operation, attempt, sent = in_flight.pop(info['msgid'])
+                if is_busy(e):
+                    limit.busy()
+                    if attempt < self.retries:
+                        refused.append((operation, attempt + 1))
+                        continue
+                else:
+                    limit.observe(time.monotonic() - sent)
+                report.add(OperationResult(operation, e))
+
+        return LdapSuccessResult(report)
+
+    @catch_exception
+    @reconnect(idempotent=True)
     def _bind(self, new_bind: str, new_pass: str) -> LdapSuccessResult:
         """Bind to connected server."""
 
         assert self.state == State.Connected, "Cannot perform bind without connection"
 
-        self.connection.simple_bind_s(new_bind, new_pass)
-        self.state = State.Signed
+        self.__simple_bind(new_bind, new_pass)
 
         return LdapSuccessResult(f"_bind: {new_bind}")
 
+    @catch_exception
+    @reconnect(idempotent=True)
+    def _ping(self) -> LdapSuccessResult:
+        """Check that a signed connection still answers, payload is the bound identity."""
+
+        assert self.state == State.Signed, "Cannot ping without a signed connection"
+        return LdapSuccessResult(self.connection.whoami_s())
+
     @catch_exception
     def _close(self) -> LdapSuccessResult:
         """Close connection with LDAP server, turn connection object invalid."""
 
         assert self.state == State.Signed, "Cannot close connection without a connection"
+        self.__tls = self.__credentials = None
         self.connection.unbind_s()
         self.state = State.Disconnected
 
         return LdapSuccessResult("_close: Unbinded connection in ldap server")
-
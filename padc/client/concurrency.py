@@ -0,0 +1,136 @@
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+import ldap
+
+__all__ = ['BUSY_ERRORS', 'is_busy', 'RateLimit', 'ConcurrencyLimit']
+
+# answers of a server refusing work it could do later, the operation was not performed
+BUSY_ERRORS = (ldap.BUSY, ldap.UNAVAILABLE)
+
+
+def is_busy(error: ldap.LDAPError) -> bool:
+    """True when error says the server is busy and the operation may be sent again.
+
+    AD also answers UNWILLING_TO_PERFORM to writes it will never accept (password policy,
+    constraints on unicodePwd), so it only counts when its diagnostic says the server is busy.
+    """
+    if isinstance(error, BUSY_ERRORS):
+        return True
+    if isinstance(error, ldap.UNWILLING_TO_PERFORM):
+        info = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+        return 'busy' in str(info.get('info', '')).lower()
+    return False
+
+
+class RateLimit:
+    """Hard ceiling of operations per second, shared by threads.
+
+    Every operation reserves the next free slot 1 / max_rate seconds after the previous one.
+    """
+
+    def __init__(self, max_rate: float) -> None:
+        assert max_rate > 0, "Rate must be positive"
+        self.interval = 1.0 / max_rate
+        self.__next = 0.0
+        self.__lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds before the next operation may start."""
+        with self.__lock:
+            return max(0.0, self.__next - time.monotonic())
+
+    def reserve(self) -> float:
+        """Reserve the next slot, return the seconds to wait before starting the operation."""
+        with self.__lock:
+            now = time.monotonic()
+            start = max(now, self.__next)
+            self.__next = start + self.interval
+            return start - now
+
+    def wait(self) -> None:
+        """Block until the next operation may start."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConcurrencyLimit:
+    """AIMD window of operations in flight for pipelined writes.
+
+    Every healthy completion widens the window by 1 / window, so about one operation per round
+    trip, up to maximum. A busy answer, or a p99 latency over the last sample completions above
+    tolerance times the best p99 seen, multiplies the window by backoff down to minimum, at most
+    once per window of completions. max_rate is a hard ceiling of operations per second.
+    """
+
+    def __init__(
+            self, initial: int = 8,
+            minimum: int = 1,
+            maximum: int = 256,
+            max_rate: Optional[float] = None,
+            backoff: float = 0.5,
+            tolerance: float = 2.0,
+            sample: int = 64) -> None:
+        assert 1 <= minimum <= initial <= maximum, "Window bounds must satisfy 1 <= minimum <= initial <= maximum"
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.rate = RateLimit(max_rate) if max_rate else None
+        self.decreases = 0
+        self.__window = float(initial)
+        self.__latencies: 'deque[float]' = deque(maxlen=sample)
+        self.__best_p99: Optional[float] = None
+        self.__hold = 0
+
+    @property
+    def window(self) -> int:
+        return int(self.__window)
+
+    def delay(self) -> float:
+        """Seconds before the next operation may be sent."""
+        return self.rate.delay() if self.rate is not None else 0.0
+
+    def sent(self) -> None:
+        if self.rate is not None:
+            self.rate.reserve()
+
+    def p99(self) -> Optional[float]:
+        """p99 latency of the last sample completions, None until sample completions were seen."""
+        if len(self.__latencies) < self.__latencies.maxlen:
+            return None
+        ordered = sorted(self.__latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def __decrease(self) -> None:
+        if self.__hold > 0:
+            return
+        self.__window = max(float(self.minimum), self.__window * self.backoff)
+        self.__hold = self.window
+        self.decreases += 1
+        # latencies seen before backing off say nothing about the new window
+        self.__latencies.clear()
+
+    def observe(self, seconds: float) -> None:
+        """Record an operation answered in seconds."""
+        self.__hold = max(0, self.__hold - 1)
+        self.__latencies.append(seconds)
+        p99 = self.p99()
+        if p99 is not None:
+            if self.__best_p99 is None or p99 < self.__best_p99:
+                self.__best_p99 = p99
+            elif p99 > self.__best_p99 * self.tolerance:
+                self.__decrease()
+                return
+        self.__window = min(float(self.maximum), self.__window + 1.0 / self.__window)
+
+    def busy(self) -> None:
+        """Record an operation refused by a busy server."""
+        self.__hold = max(0, self.__hold - 1)
+        self.__decrease()
+
+    def __repr__(self) -> str:
+        return f'ConcurrencyLimit(window {self.window}, {self.minimum}-{self.maximum}, decreases {self.decreases})'
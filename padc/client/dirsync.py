@@ -0,0 +1,62 @@
+import ldap
+from ldap.controls import RequestControl, ResponseControl
+from pyasn1.type import univ, namedtype
+from pyasn1.codec.ber import encoder, decoder
+
+__all__ = ['DirSyncControl', 'ShowDeletedControl', 'DIRSYNC_REFUSED']
+
+# ref <https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-adts/2213a7f2-0a36-483c-b2a4-8574d53aa1e3>
+LDAP_DIRSYNC_OBJECT_SECURITY = 0x1
+LDAP_DIRSYNC_ANCESTORS_FIRST_ORDER = 0x800
+
+# errors of a server without DirSync or of an account it refuses to sync
+DIRSYNC_REFUSED = (ldap.UNAVAILABLE_CRITICAL_EXTENSION, ldap.INSUFFICIENT_ACCESS, ldap.UNWILLING_TO_PERFORM)
+
+
+class _DirSyncValue(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('flags', univ.Integer()),
+        namedtype.NamedType('maxBytes', univ.Integer()),
+        namedtype.NamedType('cookie', univ.OctetString()),
+    )
+
+class DirSyncControl(RequestControl, ResponseControl):
+    """Active Directory DirSync control, the server answers with a cookie of what was already returned.
+
+    With OBJECT_SECURITY only entries and attributes readable by the bound account are returned,
+    so no replication rights are required.
+    """
+
+    controlType = '1.2.840.113556.1.4.841'
+
+    def __init__(
+            self, criticality: bool = True,
+            cookie: bytes = b'',
+            flags: int = LDAP_DIRSYNC_OBJECT_SECURITY | LDAP_DIRSYNC_ANCESTORS_FIRST_ORDER,
+            max_bytes: int = 1 << 20) -> None:
+        self.criticality = criticality
+        self.cookie = cookie
+        self.flags = flags
+        self.max_bytes = max_bytes
+        self.more_results = False
+
+    def encodeControlValue(self) -> bytes:
+        value = _DirSyncValue()
+        value.setComponentByName('flags', self.flags)
+        value.setComponentByName('maxBytes', self.max_bytes)
+        value.setComponentByName('cookie', self.cookie)
+        return encoder.encode(value)
+
+    def decodeControlValue(self, encodedControlValue: bytes) -> None:
+        value, _ = decoder.decode(encodedControlValue, asn1Spec=_DirSyncValue())
+        # in responses flags tells whether more results are waiting for the returned cookie
+        self.more_results = bool(int(value.getComponentByName('flags')))
+        self.cookie = bytes(value.getComponentByName('cookie'))
+
+class ShowDeletedControl(RequestControl):
+    """Active Directory Show Deleted control, searches also return tombstones of deleted entries."""
+
+    controlType = '1.2.840.113556.1.4.417'
+
+    def __init__(self, criticality: bool = True) -> None:
+        RequestControl.__init__(self, self.controlType, criticality)
@@ -0,0 +1,70 @@
+import time
+import threading
+from typing import Dict, Iterable, List
+
+__all__ = ['Endpoints']
+
+
+class _Endpoint:
+    """Health of one server, latency is an exponentially weighted moving average in seconds."""
+
+    __slots__ = ('uri', 'latency', 'failures', 'down_until')
+
+    def __init__(self, uri: str) -> None:
+        self.uri = uri
+        self.latency = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+
+class Endpoints:
+    """Rank server URIs by health and latency.
+
+    A server that stops answering is skipped for cooldown seconds, doubled on every
+    consecutive failure up to max_cooldown, and tried again once the cooldown expired.
+    """
+
+    def __init__(self, uris: Iterable[str], cooldown: float = 5.0, max_cooldown: float = 300.0, alpha: float = 0.2) -> None:
+        self.uris = list(dict.fromkeys(uris))
+        assert self.uris, "At least one server URI is required"
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.__lock = threading.Lock()
+        self.__endpoints: Dict[str, _Endpoint] = {uri: _Endpoint(uri) for uri in self.uris}
+
+    def ranked(self) -> List[str]:
+        """Servers up, lowest latency first, then servers down, soonest to be retried first."""
+        now = time.monotonic()
+        with self.__lock:
+            endpoints = list(self.__endpoints.values())
+        up = sorted((e for e in endpoints if e.down_until <= now), key=lambda e: e.latency)
+        down = sorted((e for e in endpoints if e.down_until > now), key=lambda e: e.down_until)
+        return [e.uri for e in up + down]
+
+    def up(self, uri: str) -> bool:
+        return self.__endpoints[uri].down_until <= time.monotonic()
+
+    def observe(self, uri: str, seconds: float) -> None:
+        """Record a successful operation that took seconds."""
+        with self.__lock:
+            endpoint = self.__endpoints[uri]
+            endpoint.latency = seconds if not endpoint.latency else (
+                self.alpha * seconds + (1 - self.alpha) * endpoint.latency
+            )
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+    def fail(self, uri: str) -> None:
+        """Record a server that stopped answering."""
+        with self.__lock:
+            endpoint = self.__endpoints[uri]
+            endpoint.failures += 1
+            backoff = min(self.cooldown * 2 ** (endpoint.failures - 1), self.max_cooldown)
+            endpoint.down_until = time.monotonic() + backoff
+
+    def __repr__(self) -> str:
+        with self.__lock:
+            return 'Endpoints(' + ', '.join(
+                f'{e.uri}: {e.latency * 1000:.1f}ms{" down" if e.down_until > time.monotonic() else ""}'
+                for e in self.__endpoints.values()
+            ) + ')'
@@ -1,5 +1,12 @@
 import ldap
+import inspect
+import functools
 from typing import Any, NoReturn
+from .metrics import instrument
+from .state import State
+
+# errors after which the connection is gone, the client is marked Disconnected so pools drop it
+UNAVAILABLE = (ldap.SERVER_DOWN, ldap.CONNECT_ERROR, ldap.TIMEOUT)
 
 
 class LdapSuccessResult:
@@ -23,14 +30,52 @@ class LdapErrorResult(Exception):
 
 # ref: https://stackoverflow.com/questions/11420464/catch-exceptions-inside-a-class
 def catch_exception(f):
-    """Function decorator exception handler!"""
+    """Function decorator exception handler, coroutine functions are wrapped by a coroutine!"""
+    if inspect.iscoroutinefunction(f):
+        async def afunc(*args, **kwargs):
+            try:
+                return await f(*args, **kwargs)
+            except ldap.LDAPError as e:
+                if isinstance(e, UNAVAILABLE):
+                    args[0].state = State.Disconnected
+                if args[0].debug:
+                    raise e
+
+                return LdapErrorResult(e)
+        return instrument('ldap', f.__name__, afunc)
+
     def func(*args, **kwargs):
         try:
             return f(*args, **kwargs)
         except ldap.LDAPError as e:
+            if isinstance(e, UNAVAILABLE):
+                args[0].state = State.Disconnected
             if args[0].debug:
                 raise e
             
             return LdapErrorResult(e)
-    return func
+    return instrument('ldap', f.__name__, func)
+
+
+def reconnect(idempotent: bool = False):
+    """Method decorator reconnecting a client whose server was lost before running the operation.
 
+    Idempotent operations losing their server are retried on a new connection up to retries times
+    of the client, others still fail since the server may have applied them. Apply it below catch_exception!
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def func(client, *args, **kwargs):
+            if client.lost:
+                client._reconnect()
+            attempt = 0
+            while True:
+                try:
+                    return f(client, *args, **kwargs)
+                except UNAVAILABLE:
+                    if not idempotent or attempt >= client.retries:
+                        raise
+                    client._reconnect(attempt)
+                    attempt += 1
+        return func
+    return decorator
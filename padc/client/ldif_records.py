@@ -0,0 +1,86 @@
+from typing import Iterator, List, Optional, Tuple
+
+from ldif import LDIFParser, MOD_OP_INTEGER, is_dn
+from .operations import OpKind, Operation
+
+
+class LDIFChangeRecordList(LDIFParser):
+    """Parse content and change records (changetype add/modify/delete) of a ldif file into operations."""
+
+    def __init__(self, input_file):
+        LDIFParser.__init__(self, input_file)
+        self.all_records: List[Operation] = []
+
+    def _record_line(self) -> Tuple[Optional[str], Optional[bytes]]:
+        """Read next line of current record, end of file also ends the record."""
+        try:
+            return self._next_key_and_value()
+        except EOFError:
+            return None, None
+
+    def _parse_record(self, dn: str) -> Operation:
+        """Parse the lines following a dn line until the record separator."""
+        k, v = self._record_line()
+        changetype = 'add'
+        if k == 'changetype':
+            changetype = v.decode('ascii').strip().lower()
+            k, v = self._record_line()
+
+        match changetype:
+            case 'add':
+                entry = {}
+                while k is not None:
+                    entry.setdefault(k, []).append(v)
+                    k, v = self._record_line()
+                return Operation(OpKind.Add, dn, entry)
+            case 'delete':
+                while k is not None:
+                    k, v = self._record_line()
+                return Operation(OpKind.Delete, dn)
+            case 'modify':
+                modlist = []
+                while k is not None:
+                    if k == '-':
+                        k, v = self._record_line()
+                        continue
+                    if k not in MOD_OP_INTEGER:
+                        raise ValueError(f'invalid mod-op {k!r}')
+                    op, attr = MOD_OP_INTEGER[k], v.decode('utf-8').strip()
+                    values = []
+                    k, v = self._record_line()
+                    while k is not None and k.lower() == attr.lower():
+                        values.append(v)
+                        k, v = self._record_line()
+                    modlist.append((op, attr, values or None))
+                return Operation(OpKind.Modify, dn, modlist)
+            case _:
+                raise ValueError(f'unsupported changetype {changetype!r}')
+
+    def records(self) -> Iterator[Operation]:
+        """Yield every record of the input as soon as it was parsed.
+
+        A malformed record raises ValueError naming the line it was found at.
+        """
+        try:
+            k, v = self._consume_empty_lines()
+            if k == 'version':
+                self.version = int(v.decode('ascii'))
+                k, v = self._consume_empty_lines()
+
+            while k is not None:
+                if k != 'dn':
+                    raise ValueError(f'record does not start with "dn:": {k!r}')
+                dn = v.decode('utf-8')
+                if not is_dn(dn):
+                    raise ValueError(f'not a valid dn: {dn!r}')
+                record = self._parse_record(dn)
+                self.records_read += 1
+                yield record
+                k, v = self._consume_empty_lines()
+        except ValueError as e:
+            # the parser has already read the line following the faulty one
+            raise ValueError(f'line {self.line_counter - 1}: {e}') from e
+
+    def parse(self) -> None:
+        """Parse whole input, records are appended to all_records."""
+        self.all_records.extend(self.records())
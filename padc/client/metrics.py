@@ -0,0 +1,190 @@
+import os
+import time
+import inspect
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+__all__ = ['Metrics', 'METRICS', 'instrument', 'serve_metrics']
+
+# seconds, tuned for ldap round trips on a lan up to slow binds against a degraded DC
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    """Cumulative latency histogram in prometheus layout."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += seconds
+        self.count += 1
+
+class Metrics:
+    """Per operation counters and latency histograms, labelled by layer, operation, result code and server URI.
+
+    Disabled by default, the catch_exception layers then only check the enabled flag.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.__lock = threading.Lock()
+        self.__counters: Dict[Tuple[str, str, str, str], int] = {}
+        self.__histograms: Dict[Tuple[str, str, str], _Histogram] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    def observe(self, layer: str, op: str, uri: str, code: str, seconds: float) -> None:
+        with self.__lock:
+            key = (layer, op, uri, code)
+            self.__counters[key] = self.__counters.get(key, 0) + 1
+            histogram = self.__histograms.get(key[:3])
+            if histogram is None:
+                histogram = self.__histograms[key[:3]] = _Histogram()
+            histogram.observe(seconds)
+
+    def count(self, layer: str, op: str, uri: str = '', code: Optional[str] = None) -> int:
+        """Operations recorded, of any server URI when uri is empty and of any result code when code is None."""
+        with self.__lock:
+            return sum(
+                n for (l, o, u, c), n in self.__counters.items()
+                if l == layer and o == op and (not uri or u == uri) and (code is None or c == code)
+            )
+
+    @staticmethod
+    def __labels(**labels: str) -> str:
+        escaped = (
+            k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for k, v in labels.items()
+        )
+        return '{' + ','.join(escaped) + '}'
+
+    def render(self) -> str:
+        """Metrics in prometheus text exposition format."""
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            histograms = sorted((k, (list(h.counts), h.sum, h.count)) for k, h in self.__histograms.items())
+
+        lines = [
+            '# HELP padc_operations_total Operations completed by result code.',
+            '# TYPE padc_operations_total counter',
+        ]
+        for (layer, op, uri, code), n in counters:
+            lines.append(f'padc_operations_total{self.__labels(layer=layer, op=op, uri=uri, code=code)} {n}')
+
+        lines += [
+            '# HELP padc_operation_duration_seconds Operation latency.',
+            '# TYPE padc_operation_duration_seconds histogram',
+        ]
+        for (layer, op, uri), (counts, total, count) in histograms:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                labels = self.__labels(layer=layer, op=op, uri=uri, le=repr(bound))
+                lines.append(f'padc_operation_duration_seconds_bucket{labels} {cumulative}')
+            labels = self.__labels(layer=layer, op=op, uri=uri, le='+Inf')
+            lines.append(f'padc_operation_duration_seconds_bucket{labels} {count}')
+            labels = self.__labels(layer=layer, op=op, uri=uri)
+            lines.append(f'padc_operation_duration_seconds_sum{labels} {total}')
+            lines.append(f'padc_operation_duration_seconds_count{labels} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str) -> None:
+        """Write metrics for node_exporter textfile collector, replacing path atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.padc-metrics-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.render())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+METRICS = Metrics()
+
+
+def _result_code(outcome: Any) -> str:
+    """Result code label of a returned result or raised exception.
+
+    LDAP failures are labelled by python-ldap exception name, e.g. SERVER_DOWN or INVALID_CREDENTIALS.
+    """
+    if not isinstance(outcome, BaseException):
+        return 'success'
+    # ADErrorResult keeps the error it wraps, LdapErrorResult the python-ldap exception
+    if isinstance(getattr(outcome, 'error', None), BaseException):
+        outcome = outcome.error
+    if isinstance(getattr(outcome, 'message', None), BaseException):
+        outcome = outcome.message
+    if isinstance(outcome, AssertionError):
+        return 'not_found'
+    return type(outcome).__name__
+
+def instrument(layer: str, op: str, call: Callable) -> Callable:
+    """Wrap call, recording its latency and result code in METRICS when enabled."""
+    if inspect.iscoroutinefunction(call):
+        async def atimed(*args, **kwargs):
+            if not METRICS.enabled:
+                return await call(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = await call(*args, **kwargs)
+            except BaseException as e:
+                METRICS.observe(layer, op, getattr(args[0], 'uri', ''), _result_code(e), time.perf_counter() - start)
+                raise
+            METRICS.observe(layer, op, getattr(args[0], 'uri', ''), _result_code(result), time.perf_counter() - start)
+            return result
+        return atimed
+
+    def timed(*args, **kwargs):
+        if not METRICS.enabled:
+            return call(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = call(*args, **kwargs)
+        except BaseException as e:
+            METRICS.observe(layer, op, getattr(args[0], 'uri', ''), _result_code(e), time.perf_counter() - start)
+            raise
+        METRICS.observe(layer, op, getattr(args[0], 'uri', ''), _result_code(result), time.perf_counter() - start)
+        return result
+    return timed
+
+def serve_metrics(port: int, addr: str = '127.0.0.1', metrics: Metrics = METRICS) -> ThreadingHTTPServer:
+    """Serve metrics on http://addr:port/metrics from a daemon thread, enabling them."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    metrics.enable()
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='padc-metrics', daemon=True).start()
+    return server
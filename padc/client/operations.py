@@ -0,0 +1,84 @@
+import time
+from enum import Enum, auto
+from typing import Any, List, Optional
+
+
+class OpKind(Enum):
+    """Kinds of LDAP write operations that can be pipelined."""
+    Add = auto()
+    Modify = auto()
+    Delete = auto()
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+class Operation:
+    """A single write operation, payload is an entry for add and a modlist for modify."""
+
+    def __init__(self, kind: OpKind, dn: str, payload: Any = None):
+        self.kind = kind
+        self.dn = dn
+        self.payload = payload
+
+    def __repr__(self) -> str:
+        return f'Operation: {self.kind} {self.dn}'
+
+class OperationResult:
+    """Outcome of a pipelined operation, error is None when it succeeded."""
+
+    def __init__(self, operation: Operation, error: Optional[Exception] = None):
+        self.operation = operation
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __str__(self) -> str:
+        if self.ok:
+            return f'{self.operation.kind}: {self.operation.dn}'
+        return f'{self.operation.kind}: {self.operation.dn} failed: {self.error}'
+
+class PipelineReport:
+    """Collected results of a pipeline run.
+
+    Without keep_succeeded only failed results are kept, so memory does not grow with the
+    number of operations, total still counts every one of them. error is set when reading
+    the operations failed, operations before it were still applied and reported.
+    """
+
+    def __init__(self, keep_succeeded: bool = True):
+        self.keep_succeeded = keep_succeeded
+        self.results: List[OperationResult] = []
+        self.total = 0
+        self.error: Optional[Exception] = None
+        self.started = time.monotonic()
+        self.finished = self.started
+
+    def add(self, result: OperationResult) -> None:
+        self.total += 1
+        if self.keep_succeeded or not result.ok:
+            self.results.append(result)
+        self.finished = time.monotonic()
+
+    @property
+    def succeeded(self) -> List[OperationResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[OperationResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def elapsed(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Operations per second."""
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        summary = (f'{self.total} operations, {len(self.failed)} failed '
+                   f'in {self.elapsed:.2f}s ({self.throughput:.1f} ops/s)')
+        return summary if self.error is None else f'{summary}, stopped: {self.error}'
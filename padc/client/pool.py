@@ -0,0 +1,107 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from .client import Client
+from .state import State
+from .error_handler import LdapSuccessResult
+
+T = TypeVar('T')
+
+
+class ConnectionPool:
+    """Thread-safe pool of bound connections.
+
+    factory must return a Client with tls started and bind done, it is called
+    whenever the pool needs a new connection or has to replace a stale one.
+    """
+
+    def __init__(
+            self,
+            factory: Callable[[], Client],
+            size: int = 4,
+            max_idle: float = 300.0,
+            check_after: float = 30.0) -> None:
+        assert size >= 1, "Pool size must be at least 1"
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._idle: List[Tuple[Client, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _discard(self, client: Client) -> None:
+        """Unbind a connection that leaves the pool."""
+        if client.state == State.Signed:
+            client._close()
+
+    def _healthy(self, client: Client, idle_since: float) -> bool:
+        """Check idle connection, connections idle for too long are never reused."""
+        idle = time.monotonic() - idle_since
+        if client.state != State.Signed or idle > self.max_idle:
+            return False
+        if idle > self.check_after:
+            return isinstance(client._ping(), LdapSuccessResult)
+        return True
+
+    def checkout(self, timeout: Optional[float] = None) -> Client:
+        """Take a bound connection from the pool, waiting up to timeout seconds for a free slot."""
+        assert not self._closed, "Cannot checkout from a closed pool"
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"checkout: no connection available after {timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    client, idle_since = self._idle.pop()
+                if self._healthy(client, idle_since):
+                    return client
+                self._discard(client)
+            return self.factory()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, client: Client) -> None:
+        """Give back a connection taken by checkout."""
+        try:
+            if self._closed or client.state != State.Signed:
+                self._discard(client)
+                return
+            with self._lock:
+                self._idle.append((client, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Client]:
+        """Checkout a connection for the duration of a with block."""
+        client = self.checkout(timeout)
+        try:
+            yield client
+        finally:
+            self.checkin(client)
+
+    def run(self, fn: Callable[[Client], T], timeout: Optional[float] = None, idempotent: bool = False) -> T:
+        """Run fn over a pooled connection, idempotent is only used by pools of several servers that retry."""
+        with self.connection(timeout) as client:
+            return fn(client)
+
+    def close(self) -> None:
+        """Unbind every idle connection, connections checked out are unbound when returned."""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for client, _ in idle:
+            self._discard(client)
+
+    def __enter__(self) -> 'ConnectionPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,28 @@
+from typing import Any, List, Optional
+
+__all__ = ['VLVPage']
+
+
+class VLVPage:
+    """Window of a server side sorted result read with the Virtual List View control.
+
+    offset is the position (from 1) of the first entry in the sorted result and total the
+    server estimate of the result size, context_id may be sent back to read the next window.
+    entries are (dn, entry) tuples read by Client and Entry objects read by MsAD.
+    """
+
+    __slots__ = ('entries', 'offset', 'total', 'context_id')
+
+    def __init__(self, entries: List[Any], offset: int, total: int, context_id: Optional[str] = None) -> None:
+        self.entries = entries
+        self.offset = offset
+        self.total = total
+        self.context_id = context_id
+
+    @property
+    def last(self) -> int:
+        """Position of the last entry of the window."""
+        return self.offset + len(self.entries) - 1
+
+    def __repr__(self) -> str:
+        return f'VLVPage(rows {self.offset}-{self.last} of {self.total})'
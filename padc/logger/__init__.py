@@ -1 +1,2 @@
 from .setup_log import *
+from .setup_log import __getattr__
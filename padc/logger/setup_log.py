@@ -1,8 +1,81 @@
 from pathlib import Path
+from typing import Any
+import os
 import logging
-import logging.config
+import threading
 
 settings_path = Path.joinpath(Path(__file__).parent.parent, Path('config/logging_settings.ini'))
-print(settings_path)
-logging.config.fileConfig(settings_path)
-logger = logging.getLogger('root')
+_setup_lock = threading.Lock()
+_logger = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one json object per line, usable as formatter class in logging_settings.ini."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        import json
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def _write_in_background(logger: logging.Logger) -> None:
+    """Move handlers loaded from settings behind a queue, a listener thread does the writes.
+
+    Callers only enqueue records, the listener is stopped at exit so every queued record is written.
+    """
+    global _listener
+    import atexit
+    import queue
+    import logging.handlers
+
+    handlers = logger.handlers[:]
+    if os.environ.get('PADC_LOG_FORMAT', '').lower() == 'json':
+        for handler in handlers:
+            handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def setup_logging() -> logging.Logger:
+    """Load logging settings the first time a message is logged, importing padc stays side effect free."""
+    global _logger
+    if _logger is None:
+        with _setup_lock:
+            if _logger is None:
+                import logging.config
+                logging.config.fileConfig(settings_path, disable_existing_loggers=False)
+                logger = logging.getLogger('root')
+                _write_in_background(logger)
+                _logger = logger
+    return _logger
+
+def match_level(message: Any, level: int = 10, *args: Any) -> None:
+    """Match level of loggin and send message!
+
+    message is only formatted with args, %-style, when level is enabled.
+    """
+    logger = setup_logging()
+    match level:
+        case 10 | 20 | 30 | 40 | 50:
+            if logger.isEnabledFor(level):
+                logger.log(level, message, *args)
+        case _:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("counld not match any level for this message: %s", message % args if args else message)
+
+def __getattr__(name: str) -> Any:
+    # `logger` used to be configured at import time, keep it reachable lazily
+    if name == 'logger':
+        return setup_logging()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
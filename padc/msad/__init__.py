@@ -1 +1,11 @@
 from .msad import *
+from .async_msad import *
+from .dn_cache import *
+from .export import *
+from .changes import *
+from .cluster import *
+from .reconcile import *
+from .group_graph import *
+from .entry import *
+from .filters import *
+from .loader import *
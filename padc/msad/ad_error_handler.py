@@ -1,25 +1,11 @@
 from typing import Any
+import inspect
 import logging
 
 from ..client.error_handler import LdapErrorResult
-from ..logger import logger
-
-
-def match_level(message: Any, level: int = 10) -> None:
-    """Match level of loggin and send message!"""
-    match level:
-        case 10:
-            logger.debug(message)
-        case 20:
-            logger.info(message)
-        case 30:
-            logger.warning(message)
-        case 40:
-            logger.error(message)
-        case 50:
-            logger.critical(message)
-        case _:
-            logger.debug(f"counld not match any level for this message: {message}")
+from ..client.metrics import instrument
+from ..logger import match_level
+
 
 class ADSuccessResult:
     """Active Directory Success Result."""
@@ -34,22 +20,35 @@ class ADSuccessResult:
         return self.payload
 
 class ADErrorResult(Exception):
-    """Active Directory Error Result."""
+    """Active Directory Error Result, message is formatted on first use."""
     
     def __init__(self, message, fn: str):
-        self.message = f'{fn}: {message}'
+        self.error = message
+        self.fn = fn
+
+    @property
+    def message(self) -> str:
+        return f'{self.fn}: {self.error}'
 
     def unwrap(self, level: int = logging.ERROR) -> str:
         """Get message, send log maintaing the flexibility to change the loggin level of the exception."""
-        match_level(self.message, level)
+        match_level('%s: %s', level, self.fn, self.error)
         return self.message
    
 # ref: https://stackoverflow.com/questions/11420464/catch-exceptions-inside-a-class
 def catch_exception(f):
-    """Function decorator exception handler."""
+    """Function decorator exception handler, coroutine functions are wrapped by a coroutine."""
+    if inspect.iscoroutinefunction(f):
+        async def afunc(*args, **kwargs):
+            try:
+                return await f(*args, **kwargs)
+            except (LdapErrorResult, AssertionError) as e:
+                return ADErrorResult(e, f.__name__)
+        return instrument('ad', f.__name__, afunc)
+
     def func(*args, **kwargs):
         try:
             return f(*args, **kwargs)
         except (LdapErrorResult, AssertionError) as e:
             return ADErrorResult(e, f.__name__)
-    return func
+    return instrument('ad', f.__name__, func)
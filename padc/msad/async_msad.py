@@ -0,0 +1,113 @@
+from typing import List, Optional
+from ..client import Scope, Endpoints
+from ..client.async_client import AsyncClient
+from .ad_error_handler import catch_exception, ADSuccessResult
+from .msad import AccountControlCode, UacFlag, _user_dn, _user_entry
+from .entry import Entry
+
+
+class AsyncMsAD(AsyncClient):
+    """Active Directory client for asyncio, every operation is a coroutine.
+
+    Results are the same ADSuccessResult/ADErrorResult as MsAD, and many
+    operations can be awaited concurrently over the same connection.
+    """
+
+    def __init__(
+            self, uri: str,
+            base_dn: str,
+            bind_dn: str,
+            auth_pass: str,
+            debug: bool = False,
+            endpoints: Optional[Endpoints] = None) -> None:
+        AsyncClient.__init__(self, uri, 0, debug, endpoints)
+        self.base_dn = base_dn
+        self.auth_pass = auth_pass
+        self.bind_dn = bind_dn
+
+    @catch_exception
+    async def connect(self) -> ADSuccessResult:
+        """Should connect to ad server."""
+        return ADSuccessResult(f'connect::{(await self._bind_async(self.bind_dn, self.auth_pass)).unwrap()}')
+
+    @catch_exception
+    async def start_tls(self, ca_path: Optional[str] = None) -> ADSuccessResult:
+        """Should start tls over created connection in Active Directory."""
+        return ADSuccessResult(f'tls::{(await self._start_tls_async(ca_path)).unwrap()}')
+
+    @catch_exception
+    async def close(self) -> ADSuccessResult:
+        """Should unbind a created connection in Active Directory."""
+        return ADSuccessResult(f'close::{(await self._close_async()).unwrap()}')
+
+    @catch_exception
+    async def create_user(
+            self, user_name: str,
+            user_password: str,
+            acc: Optional[AccountControlCode],
+            exp: int = 0,
+            lockout: int = 0) -> ADSuccessResult:
+        """Should create a new user in Active Directory."""
+        parsed_dn = self._parse_dn(self.base_dn).unwrap()
+        target_dn, entry = _user_entry(self.base_dn, parsed_dn, user_name, user_password, acc, exp, lockout)
+
+        return ADSuccessResult(f'create_user::{(await self._add_async(target_dn, entry)).unwrap()}')
+
+    @catch_exception
+    async def delete_user(self, user_name: str) -> ADSuccessResult:
+        """Should delete user by his username."""
+        target_dn = _user_dn(self.base_dn, user_name)
+
+        return ADSuccessResult(f'delete_user::{(await self._delete_async(target_dn)).unwrap()}')
+
+    async def __get_entries(self, s_filter: str, attr: Optional[List[str]], scope: Scope = Scope.SubTree) -> List[Entry]:
+        """Get attributes entries by performing ldap search over a specified filter, base and scope."""
+        raw_entry = (await self._search_async(self.base_dn, s_filter, attr, scope)).unwrap()
+        entry = [Entry(dn, val) for dn, val in raw_entry if type(val) is dict and val]
+
+        assert len(entry) >= 1, f'__get_entries: {s_filter} not found any entry'
+        return entry
+
+    @catch_exception
+    async def search(self, s_filter: str, attr: Optional[List[str]] = None) -> ADSuccessResult:
+        """Should search base DN subtree, payload is the list of Entry found."""
+        return ADSuccessResult(await self.__get_entries(s_filter, attr))
+
+    @catch_exception
+    async def modify_account_control(self, s_filter: str, state: AccountControlCode) -> ADSuccessResult:
+        """Should enable or disable user account, other userAccountControl flags are kept."""
+
+        user_entry = (await self.__get_entries(s_filter, ['distinguishedName', 'userAccountControl']))[0]
+        target_dn = user_entry.distinguishedName
+        old = user_entry.userAccountControl
+        disable = int(UacFlag.ACCOUNTDISABLE)
+        new = old | disable if state == AccountControlCode.DisableAccount else old & ~disable
+        if new == old:
+            return ADSuccessResult(f'modify_account_control::unchanged: {target_dn}')
+        old_acc = {'userAccountControl': user_entry['userAccountControl']}
+        new_acc = {'userAccountControl': [f'{new}'.encode()]}
+
+        mod = (await self._modify_replace_async(target_dn, (old_acc, new_acc))).unwrap()
+
+        return ADSuccessResult(f'modify_account_control::{mod}')
+
+    @catch_exception
+    async def add_account_to_group(self, s_filter: str, group_dn: str) -> ADSuccessResult:
+        """Should add user account to AD group."""
+        user_entry = (await self.__get_entries(s_filter, ['distinguishedName']))[0]
+        user_dn = user_entry['distinguishedName'][0]
+        mod = (await self._modify_add_async(group_dn, {'member': [user_dn]})).unwrap()
+
+        return ADSuccessResult(f'add_account_to_group::{mod}, user: {user_dn.decode()}')
+
+    @catch_exception
+    async def remove_account_from_group(self, s_filter: str, group_dn: str) -> ADSuccessResult:
+        """Should remove user account from a group of ms ad."""
+        user_entry = (await self.__get_entries(s_filter, ['distinguishedName']))[0]
+        user_dn = user_entry['distinguishedName'][0]
+        mod = (await self._modify_delete_async(group_dn, {'member': [user_dn]})).unwrap()
+
+        return ADSuccessResult(f'remove_account_from_group::{mod} user: {user_dn.decode()}')
+
+    def __str__(self) -> str:
+        return f'uri: {self.uri}\nbind_dn: {self.bind_dn}\n{self.state}'
@@ -0,0 +1,65 @@
+import os
+import json
+import tempfile
+from enum import Enum
+from base64 import b64encode, b64decode
+from typing import Any, Dict, List
+
+__all__ = ['ChangeKind', 'Change', 'SyncState']
+
+
+class ChangeKind(Enum):
+    """Kind of change of an entry since the last sync, DirSync does not tell additions from modifications."""
+
+    Changed = 'changed'
+    Deleted = 'deleted'
+
+    def __repr__(self) -> str:
+        return f'ChangeKind: {self.name}'
+
+class Change:
+    """Entry changed since the last sync, deleted entries keep their objectGUID and mangled DN."""
+
+    __slots__ = ('kind', 'dn', 'entry')
+
+    def __init__(self, kind: ChangeKind, dn: str, entry: Dict[str, List[bytes]]) -> None:
+        self.kind = kind
+        self.dn = dn
+        self.entry = entry
+
+    def __repr__(self) -> str:
+        return f'Change({self.kind.value}, {self.dn})'
+
+class SyncState:
+    """Where the last sync stopped, a DirSync cookie or the uSNChanged high-water mark of one DC.
+
+    USNs are local to a domain controller, a watermark read from another server is not reused.
+    """
+
+    def __init__(self, mode: str = '', cookie: bytes = b'', usn: int = 0, server: str = '') -> None:
+        self.mode = mode
+        self.cookie = cookie
+        self.usn = usn
+        self.server = server
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'mode': self.mode, 'cookie': b64encode(self.cookie).decode(), 'usn': self.usn, 'server': self.server}
+
+    @classmethod
+    def load(cls, path: str) -> 'SyncState':
+        """State saved at path, an empty state (full sync) when path does not exist yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        return cls(saved.get('mode', ''), b64decode(saved.get('cookie', '')), int(saved.get('usn', 0)), saved.get('server', ''))
+
+    def save(self, path: str) -> None:
+        """Replace state at path atomically, a crash never leaves half a state behind."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.padc-sync-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.as_dict(), f)
+        os.replace(tmp, path)
+
+    def __repr__(self) -> str:
+        return f'SyncState(mode={self.mode or "none"}, usn={self.usn}, server={self.server})'
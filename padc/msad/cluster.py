@@ -0,0 +1,129 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+
+from ..client import ConnectionPool, Endpoints
+from ..client.state import State
+from .msad import MsAD
+from .dn_cache import DNCache
+from .ad_error_handler import ADErrorResult
+
+__all__ = ['MsADCluster']
+
+T = TypeVar('T')
+
+
+class MsADCluster:
+    """Pools of bound sessions on several domain controllers of one domain.
+
+    Every operation goes to a free session of the healthiest, lowest latency DC, busy DCs
+    are skipped so concurrent work spreads over all of them. A DC that stops answering is
+    left out until its cooldown expires, idempotent operations are retried on the next one.
+    Same connection/run/close interface as ConnectionPool.
+    """
+
+    def __init__(
+            self, uris: Iterable[str],
+            base_dn: str,
+            bind_dn: str,
+            auth_pass: str,
+            ca_path: Optional[str] = None,
+            sessions: int = 2,
+            debug: bool = False,
+            dn_cache: Optional[DNCache] = None,
+            cooldown: float = 5.0) -> None:
+        self.endpoints = Endpoints(uris, cooldown)
+        self.pools: Dict[str, ConnectionPool] = {
+            uri: ConnectionPool(
+                lambda uri=uri: MsAD.bound(uri, base_dn, bind_dn, auth_pass, ca_path, debug, dn_cache), sessions
+            )
+            for uri in self.endpoints.uris
+        }
+
+    def __take(self, uri: str, timeout: Optional[float]) -> Optional[MsAD]:
+        """Session of uri, None when its pool stays busy for timeout seconds."""
+        try:
+            return self.pools[uri].checkout(timeout)
+        except TimeoutError:
+            return None
+
+    def __checkout(self, tried: Set[str], timeout: Optional[float]) -> Tuple[str, MsAD]:
+        """Free session of the best ranked DC not tried yet, waiting on the best one when every DC is busy."""
+        error: Any = 'no domain controller left to try'
+        while True:
+            ranked = [uri for uri in self.endpoints.ranked() if uri not in tried]
+            if not ranked:
+                raise ADErrorResult(error, 'checkout')
+            uri = ranked[0]
+            try:
+                # DCs in cooldown are only tried when no DC is up
+                for candidate in [u for u in ranked if self.endpoints.up(u)] or ranked[:1]:
+                    uri = candidate
+                    ad = self.__take(uri, 0)
+                    if ad is not None:
+                        return uri, ad
+                uri = ranked[0]
+                ad = self.__take(uri, timeout)
+                if ad is None:
+                    raise TimeoutError(f"checkout: no connection available after {timeout}s")
+                return uri, ad
+            except ADErrorResult as e:
+                # tls or bind failed, a new session could not be opened on that DC
+                error = e.message
+                self.endpoints.fail(uri)
+                tried.add(uri)
+
+    def __checkin(self, uri: str, ad: MsAD, started: float) -> bool:
+        """Give back session, False when its DC stopped answering during the operation."""
+        alive = ad.state == State.Signed
+        self.pools[uri].checkin(ad)
+        if alive:
+            self.endpoints.observe(uri, time.monotonic() - started)
+        else:
+            self.endpoints.fail(uri)
+        return alive
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[MsAD]:
+        """Checkout a session of the best DC for the duration of a with block, without retry."""
+        uri, ad = self.__checkout(set(), timeout)
+        started = time.monotonic()
+        try:
+            yield ad
+        finally:
+            self.__checkin(uri, ad, started)
+
+    def run(self, fn: Callable[[MsAD], T], timeout: Optional[float] = None, idempotent: bool = False) -> T:
+        """Run fn over a session of the best DC, retrying idempotent fn on the next DC when the session is lost.
+
+        A write may have been applied by a DC that went down before answering, so it is never run
+        again: an ADErrorResult saying its outcome is unknown is raised instead.
+        """
+        tried: Set[str] = set()
+        while True:
+            uri, ad = self.__checkout(tried, timeout)
+            started = time.monotonic()
+            try:
+                result = fn(ad)
+            finally:
+                alive = self.__checkin(uri, ad, started)
+            if alive:
+                return result
+            if not idempotent:
+                raise ADErrorResult(f'{uri} stopped answering, outcome unknown, the operation may have been applied', 'run')
+            if len(tried) + 1 >= len(self.pools):
+                return result
+            tried.add(uri)
+
+    def close(self) -> None:
+        for pool in self.pools.values():
+            pool.close()
+
+    def __enter__(self) -> 'MsADCluster':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'MsADCluster({self.endpoints})'
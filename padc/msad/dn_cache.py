@@ -0,0 +1,114 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class CachedEntry:
+    """DN remembered for a lookup key."""
+
+    __slots__ = ('dn', 'expires')
+
+    def __init__(self, dn: str, expires: float):
+        self.dn = dn
+        self.expires = expires
+
+class DNCache:
+    """LRU cache with TTL of lookup key (a search filter) to DN.
+
+    When path is given entries are also kept in a small sqlite store, so several
+    CLI runs share resolved names. Writes that rename or delete an entry must call
+    invalidate_dn. Other attributes are not cached, they may change outside padc.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: float = 300.0, path: Optional[str] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, CachedEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+        if path:
+            self._store = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._store.execute(
+                'CREATE TABLE IF NOT EXISTS dn_cache (key TEXT PRIMARY KEY, dn TEXT, expires REAL)'
+            )
+            self._store.execute('DELETE FROM dn_cache WHERE expires < ?', (time.time(),))
+            self._store.commit()
+
+    def __remember(self, key: str, entry: CachedEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        """Cached entry of key, None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires < now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._store is not None:
+                row = self._store.execute(
+                    'SELECT dn, expires FROM dn_cache WHERE key = ? AND expires >= ?', (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = CachedEntry(row[0], row[1])
+                    self.__remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, dn: str) -> None:
+        """Remember DN of key for ttl seconds."""
+        entry = CachedEntry(dn, time.time() + self.ttl)
+        with self._lock:
+            self.__remember(key, entry)
+            if self._store is not None:
+                # columns are named, so stores written with an attrs column are still used
+                self._store.execute(
+                    'INSERT OR REPLACE INTO dn_cache (key, dn, expires) VALUES (?, ?, ?)', (key, dn, entry.expires)
+                )
+                self._store.commit()
+
+    def invalidate(self, key: str) -> None:
+        """Forget a single lookup key."""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._store is not None:
+                self._store.execute('DELETE FROM dn_cache WHERE key = ?', (key,))
+                self._store.commit()
+
+    def invalidate_dn(self, dn: str) -> None:
+        """Forget every key resolved to dn, DNs are compared case insensitive."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.dn.lower() == dn.lower()]:
+                del self._entries[key]
+            if self._store is not None:
+                self._store.execute('DELETE FROM dn_cache WHERE lower(dn) = ?', (dn.lower(),))
+                self._store.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.execute('DELETE FROM dn_cache')
+                self._store.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def __str__(self) -> str:
+        return f'hits: {self.hits}, misses: {self.misses}, size: {len(self._entries)}'
@@ -0,0 +1,131 @@
+import struct
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+__all__ = ['Entry', 'decode_value']
+
+_FILETIME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+_FILETIME_NEVER = (0, 0x7FFFFFFFFFFFFFFF)
+
+
+def _integer(value: bytes) -> int:
+    return int(value)
+
+def _filetime(value: bytes) -> Optional[datetime]:
+    """100 nanoseconds intervals since 1601, 0 and the largest value mean never."""
+    ticks = int(value)
+    if ticks in _FILETIME_NEVER:
+        return None
+    return _FILETIME_EPOCH + timedelta(microseconds=ticks // 10)
+
+def _generalized_time(value: bytes) -> datetime:
+    """YYYYmmddHHMMSS.0Z, Active Directory always stores UTC."""
+    return datetime.strptime(value.decode('ascii')[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
+
+def _guid(value: bytes) -> UUID:
+    return UUID(bytes_le=value)
+
+def _sid(value: bytes) -> str:
+    """Binary SID in its S-1-5-21-... string form."""
+    revision, count = value[0], value[1]
+    authority = int.from_bytes(value[2:8], 'big')
+    subs = struct.unpack(f'<{count}I', value[8:8 + 4 * count])
+    return f'S-{revision}-{authority}' + ''.join(f'-{s}' for s in subs)
+
+def _boolean(value: bytes) -> bool:
+    return value.upper() == b'TRUE'
+
+def _text(value: bytes) -> Any:
+    """utf-8 text, values that are not utf-8 stay bytes."""
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return value
+
+# decoder of attributes whose Active Directory syntax is not a string, keyed by lower cased name
+_DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    **dict.fromkeys((
+        'useraccountcontrol', 'msds-user-account-control-computed', 'samaccounttype', 'grouptype',
+        'primarygroupid', 'admincount', 'badpwdcount', 'logoncount', 'countrycode', 'codepage',
+        'instancetype', 'usnchanged', 'usncreated', 'highestcommittedusn', 'systemflags',
+    ), _integer),
+    **dict.fromkeys((
+        'accountexpires', 'pwdlastset', 'lastlogon', 'lastlogontimestamp', 'lastlogoff',
+        'badpasswordtime', 'lockouttime',
+    ), _filetime),
+    **dict.fromkeys(('whencreated', 'whenchanged', 'dscorepropagationdata'), _generalized_time),
+    **dict.fromkeys(('objectguid', 'msexchmailboxguid'), _guid),
+    **dict.fromkeys(('objectsid', 'sidhistory'), _sid),
+    **dict.fromkeys(('isdeleted', 'iscriticalsystemobject', 'showinadvancedviewonly'), _boolean),
+}
+
+def decode_value(attr: str, value: bytes) -> Any:
+    """Decode one raw value of attr following its Active Directory syntax."""
+    return _DECODERS.get(attr.lower(), _text)(value)
+
+
+class Entry(Mapping[str, List[bytes]]):
+    """Search result entry, a read only mapping of raw values with case insensitive attribute names.
+
+    Values are decoded following their AD syntax (integers, FILETIME and generalized times as
+    UTC datetimes, GUIDs as UUID, SIDs as strings) the first time they are read, with first or
+    as attributes, e.g. entry.accountExpires. Attributes never read are never decoded.
+    """
+
+    __slots__ = ('dn', '_raw', '_decoded')
+
+    def __init__(self, dn: Optional[str], raw: Dict[str, List[bytes]]) -> None:
+        self.dn = dn
+        self._raw = raw
+        self._decoded: Optional[Dict[str, List[Any]]] = None
+
+    def __key(self, attr: str) -> Optional[str]:
+        """Attribute name as returned by the server, names are compared lower cased on a miss only."""
+        if attr in self._raw:
+            return attr
+        lower = attr.lower()
+        return next((k for k in self._raw if k.lower() == lower), None)
+
+    def __getitem__(self, attr: str) -> List[bytes]:
+        key = self.__key(attr)
+        if key is None:
+            raise KeyError(attr)
+        return self._raw[key]
+
+    def __contains__(self, attr: object) -> bool:
+        return isinstance(attr, str) and self.__key(attr) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def all(self, attr: str) -> List[Any]:
+        """Decoded values of attr, empty when the entry does not have it."""
+        key = self.__key(attr)
+        if key is None:
+            return []
+        if self._decoded is None:
+            self._decoded = {}
+        values = self._decoded.get(key)
+        if values is None:
+            values = self._decoded[key] = [decode_value(key, v) for v in self._raw[key]]
+        return values
+
+    def first(self, attr: str, default: Any = None) -> Any:
+        """First decoded value of attr, default when the entry does not have it."""
+        values = self.all(attr)
+        return values[0] if values else default
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        key = self.__key(attr)
+        if key is None:
+            raise AttributeError(f'entry has no attribute {attr}')
+        return self.first(key)
+
+    def __repr__(self) -> str:
+        return f'Entry({self.dn}, {sorted(self._raw)})'
@@ -0,0 +1,40 @@
+import json
+from base64 import b64encode
+from typing import Callable, Dict, IO, List
+
+from ldif import LDIFWriter
+
+__all__ = ['EXPORT_FORMATS', 'entry_writer', 'json_attributes']
+
+
+def _ldif_writer(output: IO[str]) -> Callable[[str, Dict[str, List[bytes]]], None]:
+    """Write entries as LDIF content records, non printable values are base64 encoded."""
+    writer = LDIFWriter(output, cols=76)
+    return writer.unparse
+
+def json_attributes(entry: Dict[str, List[bytes]]) -> Dict[str, List[str]]:
+    """Attributes as json strings, attributes with values that are not utf-8 are
+    base64 encoded under 'attr;binary', like objectGUID and objectSid.
+    """
+    attributes: Dict[str, List[str]] = {}
+    for attr, values in entry.items():
+        try:
+            attributes[attr] = [v.decode('utf-8') for v in values]
+        except UnicodeDecodeError:
+            attributes[f'{attr};binary'] = [b64encode(v).decode() for v in values]
+    return attributes
+
+def _jsonl_writer(output: IO[str]) -> Callable[[str, Dict[str, List[bytes]]], None]:
+    """Write one json object per line."""
+    def write(dn: str, entry: Dict[str, List[bytes]]) -> None:
+        output.write(json.dumps({'dn': dn, 'attributes': json_attributes(entry)}, ensure_ascii=False))
+        output.write('\n')
+    return write
+
+EXPORT_FORMATS = {'ldif': _ldif_writer, 'jsonl': _jsonl_writer}
+
+
+def entry_writer(output: IO[str], fmt: str = 'ldif') -> Callable[[str, Dict[str, List[bytes]]], None]:
+    """Writer of (dn, entry) to output in one of EXPORT_FORMATS."""
+    assert fmt in EXPORT_FORMATS, f'unknown export format {fmt}, use one of {", ".join(EXPORT_FORMATS)}'
+    return EXPORT_FORMATS[fmt](output)
@@ -0,0 +1,71 @@
+import re
+from typing import Iterable, Optional, Union
+from ..client import Scope
+
+__all__ = ['USER_ACCOUNT', 'SearchPlan', 'Lookup', 'optimize_filter', 'account_filter', 'accounts_filter', 'account_plan']
+
+# sAMAccountType SAM_NORMAL_USER_ACCOUNT, indexed unlike objectClass
+USER_ACCOUNT = '(sAMAccountType=805306368)'
+
+# equivalent indexed forms of the filters padc used to build, names are matched case insensitive
+_REWRITES = [
+    (re.compile(r'\(&\(objectClass=user\)\(objectCategory=person\)\)', re.I), USER_ACCOUNT),
+    (re.compile(r'\(&\(objectCategory=person\)\(objectClass=user\)\)', re.I), USER_ACCOUNT),
+    (re.compile(r'\(&\(objectClass=user\)(\(sAMAccountName=[^()]*\))\)', re.I), rf'(&{USER_ACCOUNT}\1)'),
+    (re.compile(r'\(objectClass=group\)', re.I), '(objectCategory=group)'),
+]
+
+
+def optimize_filter(s_filter: str) -> str:
+    """Rewrite the parts of s_filter that have an indexed equivalent, other parts are kept as is.
+
+    (objectClass=User) alone is kept: it also matches computers, which sAMAccountType does not.
+    """
+    for pattern, indexed in _REWRITES:
+        s_filter = pattern.sub(indexed, s_filter)
+    return s_filter
+
+def account_filter(name: str) -> str:
+    """Search filter of a user account by sAMAccountName, name is escaped following RFC 4515."""
+    from ldap.filter import escape_filter_chars
+    return f'(&{USER_ACCOUNT}(sAMAccountName={escape_filter_chars(name)}))'
+
+def accounts_filter(names: Iterable[str]) -> str:
+    """Search filter of the user accounts of every sAMAccountName, merged in one OR filter."""
+    from ldap.filter import escape_filter_chars
+    return f'(&{USER_ACCOUNT}(|{"".join(f"(sAMAccountName={escape_filter_chars(n)})" for n in names)}))'
+
+
+class SearchPlan:
+    """Base, scope and filter of a search, str() shows them for tuning."""
+
+    __slots__ = ('base', 's_filter', 'scope')
+
+    def __init__(self, base: str, s_filter: str, scope: Scope = Scope.SubTree) -> None:
+        self.base = base
+        self.s_filter = s_filter
+        self.scope = scope
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SearchPlan) and (self.base, self.s_filter, self.scope) == (other.base, other.s_filter, other.scope)
+
+    def __str__(self) -> str:
+        return f'base: {self.base}\nscope: {self.scope.name}\nfilter: {self.s_filter}'
+
+    def __repr__(self) -> str:
+        return f'SearchPlan({self.base!r}, {self.s_filter!r}, {self.scope.name})'
+
+
+# account lookups take a search filter of the base DN subtree or a planned search
+Lookup = Union[str, SearchPlan]
+
+
+def account_plan(name: str, base_dn: str, ou: Optional[str] = None) -> SearchPlan:
+    """Search of a user account by sAMAccountName under ou (base_dn when not known).
+
+    sAMAccountNames cannot hold '=', so a name that does is the DN of the account and
+    is read with a base search.
+    """
+    if '=' in name:
+        return SearchPlan(name, USER_ACCOUNT, Scope.Base)
+    return SearchPlan(ou or base_dn, account_filter(name))
@@ -0,0 +1,73 @@
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+__all__ = ['GroupGraph', 'LDAP_MATCHING_RULE_IN_CHAIN']
+
+# AD matching rule walking nested memberships server side
+LDAP_MATCHING_RULE_IN_CHAIN = '1.2.840.113556.1.4.1941'
+
+
+class GroupGraph:
+    """Group nesting of a directory, held in memory to answer transitive membership checks.
+
+    Built from (group DN, memberOf of the group) pairs, DNs are compared lower cased.
+    Walks keep a visited set, so nesting cycles end the walk instead of looping.
+    """
+
+    def __init__(self, groups: Iterable[Tuple[str, Iterable[str]]], ttl: float = 300.0) -> None:
+        self.names: Dict[str, str] = {}
+        self.parents: Dict[str, Set[str]] = {}
+        self.children: Dict[str, Set[str]] = {}
+        for dn, member_of in groups:
+            key = dn.lower()
+            self.names[key] = dn
+            self.parents.setdefault(key, set())
+            for parent in member_of:
+                self.parents[key].add(parent.lower())
+                self.children.setdefault(parent.lower(), set()).add(key)
+        self.expires = time.monotonic() + ttl
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def __contains__(self, dn: str) -> bool:
+        return dn.lower() in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def __walk(start: Iterable[str], edges: Dict[str, Set[str]]) -> Set[str]:
+        seen: Set[str] = set()
+        queue = deque(dn.lower() for dn in start)
+        while queue:
+            dn = queue.popleft()
+            if dn in seen:
+                continue
+            seen.add(dn)
+            queue.extend(edges.get(dn, ()))
+        return seen
+
+    def ancestors(self, groups: Iterable[str]) -> Set[str]:
+        """Groups and every group they are nested in, lower cased."""
+        return self.__walk(groups, self.parents)
+
+    def descendants(self, group: str) -> Set[str]:
+        """Group and every group nested in it, lower cased."""
+        return self.__walk([group], self.children)
+
+    def is_member(self, member_of: Iterable[str], group: str) -> bool:
+        """True when an entry directly in member_of groups is effectively in group."""
+        return group.lower() in self.ancestors(member_of)
+
+    def cycles(self) -> List[str]:
+        """Groups nested in themselves through other groups."""
+        return sorted(
+            self.names[g] for g in self.names
+            if g in self.__walk(self.parents[g], self.parents)
+        )
+
+    def __repr__(self) -> str:
+        return f'GroupGraph({len(self.names)} groups)'
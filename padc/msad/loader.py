@@ -0,0 +1,64 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .filters import account_filter
+
+__all__ = ['AccountLoader']
+
+
+def _key(s_filter: str) -> str:
+    # sAMAccountName matching is case insensitive
+    return s_filter.lower()
+
+
+class AccountLoader:
+    """Batched loader of sAMAccountName to DN, shared by the sessions running a batch.
+
+    Names read ahead are resolved together with one OR search per chunk_size names, then
+    sessions answer account_filter(name) lookups from the loader instead of one subtree
+    search each. Only DNs are kept, other attributes are read fresh with a base search,
+    and names not found are searched again, so accounts created by the batch are found.
+    """
+
+    def __init__(self, chunk_size: int = 200) -> None:
+        self.chunk_size = chunk_size
+        self.searches = 0
+        self.hits = 0
+        self._dns: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load_many(self, names: Iterable[str], resolve: Callable[[List[str]], Dict[str, str]]) -> int:
+        """Resolve names not loaded yet, resolve gets chunks of chunk_size lower cased names.
+
+        resolve returns DNs keyed by lower cased name, return the number of names found.
+        """
+        names = list(dict.fromkeys(n.lower() for n in names))
+        with self._lock:
+            missing = [n for n in names if _key(account_filter(n)) not in self._dns]
+        for i in range(0, len(missing), self.chunk_size):
+            found = resolve(missing[i:i + self.chunk_size])
+            with self._lock:
+                self.searches += 1
+                self._dns.update((_key(account_filter(n)), dn) for n, dn in found.items())
+        with self._lock:
+            return sum(_key(account_filter(n)) in self._dns for n in names)
+
+    def get(self, s_filter: str) -> Optional[str]:
+        """DN loaded for an account_filter lookup, None for other filters and names not found."""
+        with self._lock:
+            dn = self._dns.get(_key(s_filter))
+            self.hits += dn is not None
+            return dn
+
+    def forget(self, s_filter: str) -> None:
+        with self._lock:
+            self._dns.pop(_key(s_filter), None)
+
+    def forget_dn(self, dn: str) -> None:
+        """Forget the name resolved to dn, DNs are compared case insensitive."""
+        with self._lock:
+            for key in [k for k, v in self._dns.items() if v.lower() == dn.lower()]:
+                del self._dns[key]
+
+    def __str__(self) -> str:
+        return f'searches: {self.searches}, hits: {self.hits}, size: {len(self._dns)}'
@@ -1,7 +1,19 @@
-from ..client import Client, Scope
-from typing import List, Dict, Optional, Any
-from enum import Enum
-from .ad_error_handler import catch_exception, ADSuccessResult
+from ..client import Client, Scope, OpKind, Operation, DirSyncControl, ShowDeletedControl, DIRSYNC_REFUSED
+from typing import List, Dict, Tuple, Optional, Any, Iterator, Iterable, IO
+import ldap
+from ldap.filter import escape_filter_chars
+from itertools import islice
+from enum import Enum, IntFlag
+from ..client.error_handler import LdapSuccessResult, LdapErrorResult
+from .ad_error_handler import catch_exception, ADSuccessResult, ADErrorResult
+from .dn_cache import DNCache
+from .export import entry_writer
+from .changes import ChangeKind, Change, SyncState
+from .reconcile import DesiredUser, ReconcilePlan, plan_changes
+from .group_graph import GroupGraph, LDAP_MATCHING_RULE_IN_CHAIN
+from .entry import Entry
+from .loader import AccountLoader
+from .filters import USER_ACCOUNT, Lookup, SearchPlan, optimize_filter, accounts_filter
 
 class AccountControlCode(Enum):
     """Possible Account Control States.
@@ -14,6 +26,60 @@ class AccountControlCode(Enum):
     def __repr__(self) -> str:
         return f'AccountControl: {self.name}'
 
+class UacFlag(IntFlag):
+    """userAccountControl bits, set or cleared one by one so the other flags of an account are kept.
+    ref <https://learn.microsoft.com/en-us/troubleshoot/windows-server/identity/useraccountcontrol-manipulate-account-properties>
+    """
+
+    ACCOUNTDISABLE = 0x2
+    HOMEDIR_REQUIRED = 0x8
+    LOCKOUT = 0x10
+    PASSWD_NOTREQD = 0x20
+    PASSWD_CANT_CHANGE = 0x40
+    ENCRYPTED_TEXT_PWD_ALLOWED = 0x80
+    NORMAL_ACCOUNT = 0x200
+    DONT_EXPIRE_PASSWORD = 0x10000
+    SMARTCARD_REQUIRED = 0x40000
+    TRUSTED_FOR_DELEGATION = 0x80000
+    NOT_DELEGATED = 0x100000
+    DONT_REQ_PREAUTH = 0x400000
+    PASSWORD_EXPIRED = 0x800000
+
+    @classmethod
+    def parse(cls, names: Iterable[str]) -> 'UacFlag':
+        """Flags named by their names (case insensitive) or integer values."""
+        flags = cls(0)
+        for name in names:
+            flags |= cls(int(name, 0)) if name[:1].isdigit() else cls[name.upper()]
+        return flags
+
+# LDAP_MATCHING_RULE_BIT_AND and LDAP_MATCHING_RULE_BIT_OR of Active Directory
+_BIT_AND = '1.2.840.113556.1.4.803'
+_BIT_OR = '1.2.840.113556.1.4.804'
+
+def _uac_filter(s_filter: str, set_flags: int, clear_flags: int) -> str:
+    """Narrow filter to entries whose userAccountControl misses a flag to set or has a flag to clear."""
+    needed = []
+    if set_flags:
+        needed.append(f'(!(userAccountControl:{_BIT_AND}:={set_flags}))')
+    if clear_flags:
+        needed.append(f'(userAccountControl:{_BIT_OR}:={clear_flags})')
+    return f'(&{s_filter}(|{"".join(needed)}))'
+
+def _uac_change(dn: str, old: bytes, set_flags: int, clear_flags: int) -> Optional[Operation]:
+    """Modify setting and clearing flags, None when userAccountControl already is in that state.
+
+    The old value is deleted and the new one added, like modifyModlist does, so the modify fails
+    instead of overwriting a value changed by someone else since it was read.
+    """
+    # flags are plain ints here, inverting an IntFlag would also clear bits it does not name
+    new = (int(old) | int(set_flags)) & ~int(clear_flags)
+    if new == int(old):
+        return None
+    return Operation(OpKind.Modify, dn, [
+        (ldap.MOD_DELETE, 'userAccountControl', [old]), (ldap.MOD_ADD, 'userAccountControl', [str(new).encode()])
+    ])
+
 def match_code(code: int) -> AccountControlCode:
         """Match the possible code, return Normal Account variant if code doens't matchs any of them."""
         match code:
@@ -25,15 +91,91 @@ def match_code(code: int) -> AccountControlCode:
                 return AccountControlCode.NormalAccount
 
 
+def _account_name(user_name: str) -> str:
+    """sAMAccountName padc gives to a user account, its capitalized first name."""
+    return user_name.split()[0].capitalize()
+
+def _user_dn(base_dn: str, user_name: str) -> str:
+    """DN of a user account created by padc."""
+    return f"CN={user_name},CN=Users,{base_dn}"
+
+def _user_entry(
+        base_dn: str,
+        parsed_dn: List[Any],
+        user_name: str,
+        user_password: str,
+        acc: Optional[AccountControlCode],
+        exp: int = 0,
+        lockout: int = 0) -> Tuple[str, Dict[str, Any]]:
+    """Build target DN and attributes of a new user account."""
+    names = [n.capitalize() for n in user_name.split()]
+    name = names[0]
+    sn = " ".join(names[1:])
+    principal_name = f"{name}@{parsed_dn[0][0][1]}.{parsed_dn[1][0][1]}"
+
+    target_dn = _user_dn(base_dn, user_name)
+    entry = {}
+    entry['objectclass'] = [b'top', b'person', b'organizationalPerson', b'user']
+    entry['cn'] = user_name.encode('utf-8')
+
+    if sn:
+        entry['sn'] = sn.encode('utf-8')
+    entry['unicodePwd'] = f'"{user_password}"'.encode('utf-16-le')
+    entry['sAMAccountName'] = name.encode('utf-8')
+    entry['givenName'] = name.encode('utf-8')
+    entry['userPrincipalName'] = principal_name.encode('utf-8')
+    entry['displayName'] = user_name.encode('utf-8')
+
+    if acc is not None and type(acc) == AccountControlCode:
+        entry['userAccountControl'] = f'{acc.value}'.encode('utf-8')
+    else:
+        entry['userAccountControl'] = f'{AccountControlCode.NormalAccount.value}'.encode('utf-8')
+
+    entry['lockoutTime'] = f'{lockout}'.encode('utf-8')
+    entry['accountExpires'] = f'{exp}'.encode('utf-8')
+
+    return target_dn, entry
+
+
 class MsAD(Client):
     """Active Directory client."""
 
-    def __init__(self, uri: str, base_dn: str, bind_dn: str, auth_pass: str, debug: bool = False) -> None:
+    def __init__(
+            self, uri: str,
+            base_dn: str,
+            bind_dn: str,
+            auth_pass: str,
+            debug: bool = False,
+            dn_cache: Optional[DNCache] = None) -> None:
         Client.__init__(self, uri, 0, debug)
-        self.uri = uri
         self.base_dn = base_dn
         self.auth_pass = auth_pass
         self.bind_dn = bind_dn
+        self.dn_cache = dn_cache
+        self.loader: Optional[AccountLoader] = None
+        self.group_graph_ttl = 300.0
+        self.__group_graph: Optional[GroupGraph] = None
+        self.__in_chain: Optional[bool] = None
+
+    @classmethod
+    def bound(
+            cls, uri: str,
+            base_dn: str,
+            bind_dn: str,
+            auth_pass: str,
+            ca_path: Optional[str] = None,
+            debug: bool = False,
+            dn_cache: Optional[DNCache] = None) -> 'MsAD':
+        """Create a client with tls started and bind done, raise ADErrorResult if any step fails.
+
+        Useful as ConnectionPool factory.
+        """
+        ad = cls(uri, base_dn, bind_dn, auth_pass, debug, dn_cache)
+        for step in (lambda: ad.start_tls(ca_path), ad.connect):
+            result = step()
+            if isinstance(result, ADErrorResult):
+                raise result
+        return ad
 
     @catch_exception
     def connect(self) -> ADSuccessResult:
@@ -58,105 +200,547 @@ class MsAD(Client):
             exp: int = 0,
             lockout: int = 0) -> ADSuccessResult:
         """Should create a new user in Active Directory."""
-        names = [n.capitalize() for n in user_name.split()]
-        name = names[0]
-        sn = " ".join(names[1:])
         parsed_dn = self._parse_dn(self.base_dn).unwrap()
-        principal_name = f"{name}@{parsed_dn[0][0][1]}.{parsed_dn[1][0][1]}"
-
-        target_dn = f"CN={user_name},CN=Users,{self.base_dn}"
-        entry = {}
-        entry['objectclass'] = [b'top', b'person', b'organizationalPerson', b'user']
-        entry['cn'] = user_name.encode('utf-8')
-
-        if sn:
-            entry['sn'] = sn.encode('utf-8')
-        entry['unicodePwd'] = f'"{user_password}"'.encode('utf-16-le')
-        entry['sAMAccountName'] = name.encode('utf-8')
-        entry['givenName'] = name.encode('utf-8')
-        entry['userPrincipalName'] = principal_name.encode('utf-8')
-        entry['displayName'] = user_name.encode('utf-8')
-    
-        if acc is not None and type(acc) == AccountControlCode:
-            entry['userAccountControl'] = f'{acc.value}'.encode('utf-8')
-        else:
-            entry['userAccountControl'] = f'{AccountControlCode.NormalAccount.value}'.encode('utf-8')
-
-        entry['lockoutTime'] = f'{lockout}'.encode('utf-8')
-        entry['accountExpires'] = f'{exp}'.encode('utf-8')
+        target_dn, entry = _user_entry(self.base_dn, parsed_dn, user_name, user_password, acc, exp, lockout)
 
         return ADSuccessResult(f'create_user::{self._add(target_dn, entry).unwrap()}')
 
     @catch_exception
     def delete_user(self, user_name: str) -> ADSuccessResult:
         """Should delete user by his username."""
-        target_dn = f"CN={user_name},CN=Users,{self.base_dn}"
+        target_dn = _user_dn(self.base_dn, user_name)
+        delete = self._delete(target_dn).unwrap()
+        if self.dn_cache is not None:
+            self.dn_cache.invalidate_dn(target_dn)
+        if self.loader is not None:
+            self.loader.forget_dn(target_dn)
+
+        return ADSuccessResult(f'delete_user::{delete}')
+
+    def __iter_entries(
+            self, s_filter: str,
+            attr: Optional[List[str]],
+            scope: Scope = Scope.SubTree,
+            page_size: int = 500,
+            base: Optional[str] = None) -> Iterator[Entry]:
+        """Yield entries page by page from a paged search of base (base DN by default), search references are skipped."""
+        for dn, val in self._paged_search(base or self.base_dn, s_filter, attr, scope, page_size).unwrap():
+            if type(val) is dict and val:
+                yield Entry(dn, val)
+
+    def __get_entries(
+            self, s_filter: str,
+            attr: List[str],
+            scope: Scope = Scope.SubTree,
+            limit: Optional[int] = None,
+            base: Optional[str] = None) -> List[Entry]:
+        """Get attributes entries by permforming ldap search over a specified filter,base and scope.
+
+        Search stops as soon as limit entries were found.
+        """
+        page_size = min(limit, 500) if limit else 500
+        entry = list(islice(self.__iter_entries(s_filter, attr, scope, page_size, base), limit))
 
-        return ADSuccessResult(f'delete_user::{self._delete(target_dn).unwrap()}')
+        assert len(entry) >= 1, f'__get_entries: {s_filter} not found any entry'
+        return entry
 
-    def __get_entries(self, s_filter: str, attr: List[str], scope: Scope=Scope.SubTree) -> List[Dict[Any, Any]]:
-        """Get attributes entries by permforming ldap search over a specified filter,base and scope."""
-        raw_entry = self._search(self.base_dn, s_filter, attr, scope).unwrap()
+    def plan(self, lookup: Lookup) -> SearchPlan:
+        """Search run for a lookup, filters are searched in the base DN subtree once optimized."""
+        if isinstance(lookup, SearchPlan):
+            return lookup
+        return SearchPlan(self.base_dn, optimize_filter(lookup))
+
+    def __cache_key(self, plan: SearchPlan) -> str:
+        return f'{plan.base}|{plan.s_filter}'
+
+    def __entry_of(self, lookup: Lookup, attr: List[str]) -> Entry:
+        """First entry matching filter, when dn_cache is enabled the subtree search is replaced by the cached DN.
+
+        Other attributes are read fresh with a base search on the cached DN, DNs
+        preloaded by the loader are used the same way.
+        """
+        plan = self.plan(lookup)
+        if plan.scope == Scope.Base:
+            raw = self._search(plan.base, plan.s_filter, attr, Scope.Base).unwrap()
+            assert raw, f'__entry_of: {plan.base} is not a {plan.s_filter} entry'
+            return Entry(raw[0][0], raw[0][1])
+
+        dn = self.loader.get(plan.s_filter) if self.loader is not None else None
+        if dn is not None:
+            if all(a == 'distinguishedName' for a in attr):
+                return Entry(dn, {'distinguishedName': [dn.encode()]})
+            raw = self._search(dn, '(objectClass=*)', attr, Scope.Base)
+            if isinstance(raw, LdapSuccessResult) and raw.unwrap():
+                return Entry(dn, raw.unwrap()[0][1])
+            self.loader.forget(plan.s_filter)
+
+        if self.dn_cache is None:
+            return self.__get_entries(plan.s_filter, attr, limit=1, base=plan.base)[0]
+
+        key = self.__cache_key(plan)
+        cached = self.dn_cache.get(key)
+        if cached is not None:
+            if all(a == 'distinguishedName' for a in attr):
+                return Entry(cached.dn, {'distinguishedName': [cached.dn.encode()]})
+            raw = self._search(cached.dn, '(objectClass=*)', attr, Scope.Base)
+            if isinstance(raw, LdapSuccessResult) and raw.unwrap():
+                return Entry(cached.dn, raw.unwrap()[0][1])
+            # renamed or deleted outside padc
+            self.dn_cache.invalidate(key)
+
+        entry = self.__get_entries(plan.s_filter, list(dict.fromkeys(['distinguishedName', *attr])), limit=1, base=plan.base)[0]
+        self.dn_cache.put(key, entry.distinguishedName)
+        return entry
 
-        entry = list()
+    def __forget(self, lookup: Lookup) -> None:
+        plan = self.plan(lookup)
+        if self.loader is not None:
+            self.loader.forget(plan.s_filter)
+        if self.dn_cache is not None:
+            self.dn_cache.invalidate(self.__cache_key(plan))
 
-        assert_dict = lambda x: type(x) is dict and x
+    @catch_exception
+    def search(self, s_filter: str, attr: Optional[List[str]] = None, page_size: int = 500) -> ADSuccessResult:
+        """Should search base DN subtree, payload is a generator of Entry fetched page by page."""
+        return ADSuccessResult(self.__iter_entries(s_filter, attr, Scope.SubTree, page_size))
 
-        for _,val in raw_entry:
-            value = assert_dict(val)
-            if value:
-                entry.append(value)        
+    @catch_exception
+    def list_users(
+            self, offset: int = 1,
+            count: int = 50,
+            sort: str = 'displayName',
+            prefix: Optional[str] = None,
+            attr: Optional[List[str]] = None,
+            s_filter: str = USER_ACCOUNT) -> ADSuccessResult:
+        """Should read count users sorted server side by sort ('-attr' descending), payload is a VLVPage of Entry.
+
+        The window starts at offset (from 1) or, with prefix, at the first user whose sort attribute is
+        at or after prefix. Only the window is transferred, whatever its position in the sorted result.
+        """
+        assert count >= 1, "Count must be at least 1"
+        assert offset >= 1, "Offset must be at least 1"
+        page = self._vlv_search(
+            self.base_dn, optimize_filter(s_filter), attr, [sort], count - 1,
+            offset=None if prefix else offset, value=prefix or None
+        ).unwrap()
+        page.entries = [Entry(dn, entry) for dn, entry in page.entries if type(entry) is dict]
+        return ADSuccessResult(page)
 
-        assert len(entry) >= 1, f'__get_entries: {s_filter} not found any entry'
-        return entry
+    @catch_exception
+    def export(
+            self, output: IO[str],
+            s_filter: str = '(|(objectClass=User)(objectClass=Group))',
+            attr: Optional[List[str]] = None,
+            fmt: str = 'ldif',
+            page_size: int = 500) -> ADSuccessResult:
+        """Should write every entry of base DN subtree matching filter to output as ldif or jsonl, payload is the number written."""
+        write = entry_writer(output, fmt)
+        count = 0
+        for dn, entry in self._paged_search(self.base_dn, s_filter, attr, Scope.SubTree, page_size).unwrap():
+            if dn is None or type(entry) is not dict:
+                continue
+            write(dn, entry)
+            count += 1
+
+        return ADSuccessResult(count)
+
+    @staticmethod
+    def __change(dn: str, entry: Dict[str, List[bytes]]) -> Change:
+        deleted = entry.get('isDeleted', [b'FALSE'])[0].upper() == b'TRUE'
+        return Change(ChangeKind.Deleted if deleted else ChangeKind.Changed, dn, entry)
+
+    def __dirsync_changes(self, state: SyncState, s_filter: str, attr: Optional[List[str]]) -> Iterator[Change]:
+        control = DirSyncControl(cookie=state.cookie if state.mode == 'dirsync' else b'')
+        for dn, entry in self._dirsync_search(self.base_dn, s_filter, attr, control).unwrap():
+            if dn is not None and type(entry) is dict:
+                yield self.__change(dn, entry)
+        state.mode, state.cookie = 'dirsync', control.cookie
+
+    def __usn_changes(self, state: SyncState, s_filter: str, attr: Optional[List[str]], page_size: int) -> Iterator[Change]:
+        root = self._search('', '(objectClass=*)', ['highestCommittedUSN', 'dsServiceName'], Scope.Base).unwrap()[0][1]
+        server = root['dsServiceName'][0].decode()
+        highest = int(root['highestCommittedUSN'][0])
+        since = state.usn if state.mode == 'usn' and state.server == server else 0
+
+        changed = f'(&{s_filter}(uSNChanged>={since + 1}))'
+        for dn, entry in self._paged_search(self.base_dn, changed, attr, Scope.SubTree, page_size).unwrap():
+            if dn is not None and type(entry) is dict:
+                yield Change(ChangeKind.Changed, dn, entry)
+
+        # tombstones keep objectClass and objectGUID, a first full pass has nothing to delete
+        if since:
+            deleted = f'(&{s_filter}(isDeleted=TRUE)(uSNChanged>={since + 1}))'
+            tombstones = self._paged_search(
+                self.base_dn, deleted, attr, Scope.SubTree, page_size, [ShowDeletedControl()]
+            ).unwrap()
+            for dn, entry in tombstones:
+                if dn is not None and type(entry) is dict:
+                    yield Change(ChangeKind.Deleted, dn, entry)
+
+        state.mode, state.usn, state.server = 'usn', highest, server
+
+    def __changes(self, state: SyncState, s_filter: str, attr: Optional[List[str]], page_size: int) -> Iterator[Change]:
+        """DirSync changes, uSNChanged changes when the server or bound account refuses DirSync."""
+        if attr is not None:
+            attr = list(dict.fromkeys(['objectGUID', 'isDeleted', *attr]))
+
+        if state.mode != 'usn':
+            changes = self.__dirsync_changes(state, s_filter, attr)
+            try:
+                first = next(changes, None)
+            except (LdapErrorResult, *DIRSYNC_REFUSED) as e:
+                if not isinstance(getattr(e, 'message', e), DIRSYNC_REFUSED):
+                    raise
+            else:
+                if first is not None:
+                    yield first
+                yield from changes
+                return
+
+        yield from self.__usn_changes(state, s_filter, attr, page_size)
+
+    @catch_exception
+    def changes(
+            self, state: SyncState,
+            s_filter: str = '(|(objectClass=User)(objectClass=Group))',
+            attr: Optional[List[str]] = None,
+            page_size: int = 500) -> ADSuccessResult:
+        """Should yield Change of every entry added, modified or deleted since state.
+
+        DirSync is used when the server allows it, uSNChanged watermarks otherwise, an empty state
+        yields every entry. state is updated once the generator is exhausted, save it then.
+        """
+        return ADSuccessResult(self.__changes(state, s_filter, attr, page_size))
 
     @catch_exception
-    def modify_account_control(self, s_filter: str, state: AccountControlCode) -> ADSuccessResult:
-        """Should modify user account control."""
+    def modify_account_control(self, s_filter: Lookup, state: AccountControlCode) -> ADSuccessResult:
+        """Should enable or disable user account, other userAccountControl flags are kept."""
+
+        user_entry = self.__entry_of(s_filter, ['distinguishedName', 'userAccountControl'])
+        target_dn = user_entry.distinguishedName
+        old = user_entry.userAccountControl
+        disable = int(UacFlag.ACCOUNTDISABLE)
+        new = old | disable if state == AccountControlCode.DisableAccount else old & ~disable
+        if new == old:
+            return ADSuccessResult(f'modify_account_control::unchanged: {target_dn}')
 
-        user_entry = self.__get_entries(s_filter, ['distinguishedName', 'userAccountControl'])[0]
-        target_dn = user_entry['distinguishedName'][0].decode()
         old_acc = {'userAccountControl': user_entry['userAccountControl']}
-        new_acc = {'userAccountControl': [f'{state.value}'.encode()]}
+        new_acc = {'userAccountControl': [f'{new}'.encode()]}
         
         entry = (old_acc, new_acc)
         mod =  self._modify_replace(target_dn, entry).unwrap()
 
         return ADSuccessResult(f'modify_account_control::{mod}')
+
+    def __uac_changes(self, s_filter: str, set_flags: int, clear_flags: int, base: str, page_size: int) -> Iterator[Operation]:
+        """Modifies of entries matching filter, read page by page while the pipeline consumes them."""
+        for dn, entry in self._paged_search(base, s_filter, ['userAccountControl'], Scope.SubTree, page_size).unwrap():
+            if dn is None or type(entry) is not dict or not entry.get('userAccountControl'):
+                continue
+            change = _uac_change(dn, entry['userAccountControl'][0], set_flags, clear_flags)
+            if change is not None:
+                yield change
+
+    @catch_exception
+    def update_account_control(
+            self, s_filter: str,
+            set_flags: int = 0,
+            clear_flags: int = 0,
+            base: Optional[str] = None,
+            window: int = 32,
+            page_size: int = 500) -> ADSuccessResult:
+        """Should set and clear userAccountControl flags of every entry matching filter under base, base DN by default.
+
+        Entries already in the target state are left out by the search filter, the others are
+        modified while pages are read, keeping window modifies in flight. Payload is a PipelineReport
+        keeping failed modifies only, a modify fails when the entry changed since it was read.
+        """
+        assert set_flags or clear_flags, "Nothing to set or clear"
+        assert not set_flags & clear_flags, "A flag cannot be set and cleared at once"
+        set_flags, clear_flags = int(set_flags), int(clear_flags)
+        changes = self.__uac_changes(
+            _uac_filter(optimize_filter(s_filter), set_flags, clear_flags), set_flags, clear_flags, base or self.base_dn, page_size
+        )
+        return ADSuccessResult(self._pipeline(changes, window, keep_succeeded=False).unwrap())
     
     @catch_exception
     def create_user_from_ldif(self, ldif_path: str) -> ADSuccessResult:
         """Should create a new user from ldif file, if exists unicodePwd this function will encoded it."""
-        all_records = self._parse_ldif(ldif_path).unwrap()
-        unicode_pwd = all_records[0][1].get('unicodePwd')
+        records = self._stream_ldif_changes(ldif_path).unwrap()
+        try:
+            record = next(records, None)
+        finally:
+            records.close()
+        assert record is not None and record.kind == OpKind.Add, f'create_user_from_ldif: {ldif_path} has no entry to add'
+
+        unicode_pwd = record.payload.get('unicodePwd')
         if unicode_pwd:
-            enc = f'"{unicode_pwd[0].decode()}"'.encode('utf-16-le')
-            all_records[0][1].update({'unicodePwd': [enc]})
+            record.payload['unicodePwd'] = self.__encode_unicode_pwd(unicode_pwd[:1])
 
-        add = self._add(all_records[0][0], all_records[0][1]).unwrap()
+        add = self._add(record.dn, record.payload).unwrap()
 
         return ADSuccessResult(f'create_user_from_ldif::{add}')
 
+    @staticmethod
+    def __encode_unicode_pwd(values: List[bytes]) -> List[bytes]:
+        """Encode plain text unicodePwd values the way Active Directory expects them."""
+        return [f'"{v.decode()}"'.encode('utf-16-le') for v in values]
+
+    def __prepared(self, operations: Iterable[Operation]) -> Iterator[Operation]:
+        """Encode unicodePwd values of ldif operations and forget DNs being deleted, one operation at a time."""
+        for op in operations:
+            if op.kind == OpKind.Add and op.payload.get('unicodePwd'):
+                op.payload['unicodePwd'] = self.__encode_unicode_pwd(op.payload['unicodePwd'])
+            elif op.kind == OpKind.Modify:
+                op.payload = [
+                    (mod, attr, self.__encode_unicode_pwd(values) if attr.lower() == 'unicodepwd' and values else values)
+                    for mod, attr, values in op.payload
+                ]
+            elif op.kind == OpKind.Delete and self.dn_cache is not None:
+                self.dn_cache.invalidate_dn(op.dn)
+            yield op
+
     @catch_exception
-    def add_account_to_group(self, s_filter, group_dn) -> ADSuccessResult:
+    def import_ldif(self, ldif_path: str, window: int = 32) -> ADSuccessResult:
+        """Should apply every add/modify/delete record of a ldif file keeping window operations in flight, payload is a PipelineReport.
+
+        A malformed record stops the import, records before it were applied and report.error names its line.
+        """
+        records = self._stream_ldif_changes(ldif_path).unwrap()
+        try:
+            report = self._pipeline(self.__prepared(records), window, keep_succeeded=False).unwrap()
+        finally:
+            records.close()
+
+        return ADSuccessResult(report)
+
+    @catch_exception
+    def add_account_to_group(self, s_filter: Lookup, group_dn) -> ADSuccessResult:
         """Should add user account to AD group."""
-        user_entry = self.__get_entries(s_filter, ['distinguishedName'])[0]
+        user_entry = self.__entry_of(s_filter, ['distinguishedName'])
         user_dn = user_entry['distinguishedName'][0]
         entry = {'member': [user_dn]}
-        mod = self._modify_add(group_dn, entry).unwrap()
+        try:
+            mod = self._modify_add(group_dn, entry).unwrap()
+        except LdapErrorResult:
+            self.__forget(s_filter)
+            raise
 
         return ADSuccessResult(f'add_account_to_group::{mod}, user: {str(user_dn)}')
 
     @catch_exception
-    def remove_account_from_group(self, s_filter: str, group_dn: str) -> ADSuccessResult:
+    def remove_account_from_group(self, s_filter: Lookup, group_dn: str) -> ADSuccessResult:
         """Should remove user account from a group of ms ad."""
-        user_entry = self.__get_entries(s_filter, ['distinguishedName'])[0]
+        user_entry = self.__entry_of(s_filter, ['distinguishedName'])
         user_dn = user_entry['distinguishedName'][0]
         entry = {'member': [user_dn]}
-        mod = self._modify_delete(group_dn, entry).unwrap()
+        try:
+            mod = self._modify_delete(group_dn, entry).unwrap()
+        except LdapErrorResult:
+            self.__forget(s_filter)
+            raise
 
         return ADSuccessResult(f'remove_account_from_group::{mod} user: {user_dn.decode()}')
 
+    def __resolve_dns(self, names: Iterable[str], chunk_size: int = 200, base: Optional[str] = None) -> Dict[str, bytes]:
+        """Resolve sAMAccountNames to DNs under base (base DN by default), merging lookups in OR filters of chunk_size names.
+
+        Returned keys are lower cased names, names not found are missing.
+        """
+        names = list(dict.fromkeys(n.lower() for n in names))
+        dns = {}
+        for i in range(0, len(names), chunk_size):
+            s_filter = accounts_filter(names[i:i + chunk_size])
+            for entry in self.__iter_entries(s_filter, ['sAMAccountName', 'distinguishedName'], base=base):
+                dns[entry.sAMAccountName.lower()] = entry['distinguishedName'][0]
+        return dns
+
+    @catch_exception
+    def preload_accounts(self, names: Iterable[str], base: Optional[str] = None) -> ADSuccessResult:
+        """Resolve sAMAccountNames under base (base DN by default) with the loader, so later lookups of account_filter(name) skip the subtree search.
+
+        Return the number of names found.
+        """
+        assert self.loader is not None, 'preload_accounts: no loader'
+        resolve = lambda chunk: {n: dn.decode() for n, dn in self.__resolve_dns(chunk, len(chunk), base).items()}
+        return ADSuccessResult(self.loader.load_many(names, resolve))
+
+    def __current_users(self, names: Iterable[str], attr: Iterable[str], chunk_size: int = 200) -> Dict[str, Entry]:
+        """Entries of sAMAccountNames read by OR filters of chunk_size names, keyed by lower cased name."""
+        names = list(dict.fromkeys(n.lower() for n in names))
+        attr = list(dict.fromkeys(['sAMAccountName', 'distinguishedName', 'memberOf', *attr]))
+        current = {}
+        for i in range(0, len(names), chunk_size):
+            for entry in self.__iter_entries(accounts_filter(names[i:i + chunk_size]), attr):
+                current[entry.sAMAccountName.lower()] = entry
+        return current
+
+    @catch_exception
+    def reconcile(
+            self, desired: Iterable[DesiredUser],
+            dry_run: bool = False,
+            window: int = 32,
+            chunk_size: int = 1000) -> ADSuccessResult:
+        """Should bring users to desired state writing only what differs from the live directory.
+
+        Current state is read in bulk, diffed in memory and only the needed adds, modifies,
+        deletes and group member changes are pipelined. Payload is the ReconcilePlan, with
+        a report per applied pipeline unless dry_run.
+        """
+        desired = list(desired)
+        attr = {a for user in desired for a in user.attributes}
+        found = self.__current_users((_account_name(user.name) for user in desired), attr)
+        current = {
+            user.name.lower(): found[_account_name(user.name).lower()]
+            for user in desired if _account_name(user.name).lower() in found
+        }
+
+        parsed_dn = self._parse_dn(self.base_dn).unwrap()
+        plan = plan_changes(
+            desired,
+            current,
+            lambda user: _user_entry(self.base_dn, parsed_dn, user.name, user.password, None),
+            chunk_size
+        )
+        if dry_run:
+            return ADSuccessResult(plan)
+
+        for operations in (plan.users, plan.groups):
+            if operations:
+                plan.reports.append(self._pipeline(operations, window).unwrap())
+        if self.dn_cache is not None:
+            for op in plan.users:
+                if op.kind == OpKind.Delete:
+                    self.dn_cache.invalidate_dn(op.dn)
+
+        return ADSuccessResult(plan)
+
+    def __ranged_values(self, target_dn: str, attr: str) -> Iterator[bytes]:
+        """Yield every value of a multi valued attribute using ranged retrieval (attr;range=low-high)."""
+        low = 0
+        while True:
+            ranged = f'{attr};range={low}-*'
+            raw_entry = self._search(target_dn, '(objectClass=*)', [ranged], Scope.Base).unwrap()
+            values = raw_entry[0][1] if raw_entry else {}
+            key = next((k for k in values if k.lower().startswith(f'{attr.lower()};range=')), None)
+            if key is None:
+                # small enough to be returned at once, or empty
+                yield from next((v for k, v in values.items() if k.lower() == attr.lower()), [])
+                return
+            yield from values[key]
+            high = key.rsplit('-', 1)[1]
+            if high == '*':
+                return
+            low = int(high) + 1
+
+    @catch_exception
+    def group_members(self, group_dn: str) -> ADSuccessResult:
+        """Should list every member DN of a group, groups bigger than MaxValRange are read by ranges."""
+        return ADSuccessResult([dn.decode() for dn in self.__ranged_values(group_dn, 'member')])
+
+    @catch_exception
+    def update_group_members(
+            self, group_dn: str,
+            add: Iterable[str] = (),
+            remove: Iterable[str] = (),
+            exact: bool = False,
+            chunk_size: int = 1000) -> ADSuccessResult:
+        """Should add and remove many sAMAccountNames from a group, writing only the real changes.
+
+        Current membership is read first and members are changed by chunks of chunk_size values
+        per modify. When exact is True add is the whole desired membership and every other member is removed.
+        """
+        add, remove = list(add), list(remove)
+        dns = self.__resolve_dns(add + remove)
+        missing = [n for n in add + remove if n.lower() not in dns]
+
+        current = {dn.lower(): dn for dn in self.__ranged_values(group_dn, 'member')}
+        desired = {dns[n.lower()].lower(): dns[n.lower()] for n in add if n.lower() in dns}
+        unwanted = {dns[n.lower()].lower() for n in remove if n.lower() in dns}
+
+        to_add = [dn for key, dn in desired.items() if key not in current]
+        to_remove = [dn for key, dn in current.items() if key in unwanted or (exact and key not in desired)]
+
+        for i in range(0, len(to_add), chunk_size):
+            self._modify_add(group_dn, {'member': to_add[i:i + chunk_size]}).unwrap()
+        for i in range(0, len(to_remove), chunk_size):
+            self._modify_delete(group_dn, {'member': to_remove[i:i + chunk_size]}).unwrap()
+
+        return ADSuccessResult(
+            f'update_group_members::{group_dn} added: {len(to_add)}, removed: {len(to_remove)}, '
+            f'not found: {", ".join(missing) if missing else "none"}'
+        )
+
+    def __supports_in_chain(self) -> bool:
+        """Active Directory advertises LDAP_CAP_ACTIVE_DIRECTORY_OID, other servers ignore the in chain rule."""
+        if self.__in_chain is None:
+            root = self._search('', '(objectClass=*)', ['supportedCapabilities'], Scope.Base).unwrap()
+            capabilities = root[0][1].get('supportedCapabilities', []) if root else []
+            self.__in_chain = b'1.2.840.113556.1.4.800' in capabilities
+        return self.__in_chain
+
+    def __use_in_chain(self, strategy: str) -> bool:
+        assert strategy in ('auto', 'chain', 'graph'), f'unknown strategy {strategy}, use auto, chain or graph'
+        if strategy == 'auto':
+            loaded = self.__group_graph is not None and not self.__group_graph.expired
+            return not loaded and self.__supports_in_chain()
+        return strategy == 'chain'
+
+    def __graph(self, refresh: bool = False) -> GroupGraph:
+        """Cached GroupGraph, read again once expired, search errors are raised."""
+        if refresh or self.__group_graph is None or self.__group_graph.expired:
+            groups = self.__iter_entries('(objectClass=Group)', ['distinguishedName', 'memberOf'])
+            self.__group_graph = GroupGraph(
+                ((g.distinguishedName, g.all('memberOf')) for g in groups),
+                self.group_graph_ttl
+            )
+        return self.__group_graph
+
+    @catch_exception
+    def group_graph(self, refresh: bool = False) -> ADSuccessResult:
+        """Should read nesting of every group in one paged search, payload is a GroupGraph kept for group_graph_ttl seconds."""
+        return ADSuccessResult(self.__graph(refresh))
+
+    @catch_exception
+    def is_member(self, s_filter: Lookup, group_dn: str, strategy: str = 'auto') -> ADSuccessResult:
+        """Should tell whether entry matching filter is in group directly or through nested groups.
+
+        strategy chain asks the server with LDAP_MATCHING_RULE_IN_CHAIN, graph answers from the
+        cached GroupGraph and auto uses the graph once loaded, the in chain rule on Active Directory
+        and the graph on other servers. Payload is a bool.
+        """
+        user_entry = self.__entry_of(s_filter, ['distinguishedName', 'memberOf'])
+        user_dn = user_entry.distinguishedName
+
+        if self.__use_in_chain(strategy):
+            in_chain = f'(memberOf:{LDAP_MATCHING_RULE_IN_CHAIN}:={escape_filter_chars(group_dn)})'
+            return ADSuccessResult(bool(self._search(user_dn, in_chain, ['distinguishedName'], Scope.Base).unwrap()))
+
+        graph = self.__graph()
+        return ADSuccessResult(graph.is_member(user_entry.all('memberOf'), group_dn))
+
+    @catch_exception
+    def effective_members(self, group_dn: str, strategy: str = 'auto', chunk_size: int = 200) -> ADSuccessResult:
+        """Should list DN of every entry in group directly or through nested groups, nested groups excluded.
+
+        strategy works as in is_member, with the graph entries in any nested group are read by
+        one paged memberOf search per chunk_size groups.
+        """
+        if self.__use_in_chain(strategy):
+            in_chain = f'(&(!(objectClass=Group))(memberOf:{LDAP_MATCHING_RULE_IN_CHAIN}:={escape_filter_chars(group_dn)}))'
+            entries = self.__iter_entries(in_chain, ['distinguishedName'])
+            return ADSuccessResult([e.distinguishedName for e in entries])
+
+        graph = self.__graph()
+        groups = [graph.names.get(g, group_dn) for g in sorted(graph.descendants(group_dn))]
+        members: Dict[str, str] = {}
+        for i in range(0, len(groups), chunk_size):
+            member_of = ''.join(f'(memberOf={escape_filter_chars(g)})' for g in groups[i:i + chunk_size])
+            for entry in self.__iter_entries(f'(&(!(objectClass=Group))(|{member_of}))', ['distinguishedName']):
+                if entry.distinguishedName not in graph:
+                    members.setdefault(entry.distinguishedName.lower(), entry.distinguishedName)
+        return ADSuccessResult(list(members.values()))
+
     def __str__(self) -> str:
         return f'uri: {self.uri}\nbind_dn: {self.bind_dn}\nauth_pass: {self.auth_pass}\n{self.state}'
 
@@ -0,0 +1,178 @@
+import json
+from itertools import chain
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+import ldap
+from ldap.modlist import modifyModlist
+
+from ..client import OpKind, Operation, PipelineReport
+
+__all__ = ['DesiredUser', 'ReconcilePlan', 'read_desired_state', 'plan_changes']
+
+
+def _values(value: Any) -> List[bytes]:
+    """Desired attribute value as ldap values, a json list is a multi valued attribute."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [v if isinstance(v, bytes) else str(v).encode('utf-8') for v in value]
+
+class DesiredUser:
+    """Desired state of one account, groups None leaves memberships alone and absent deletes it.
+
+    password is only used when the account has to be created, existing passwords are never compared.
+    """
+
+    __slots__ = ('name', 'attributes', 'groups', 'password', 'absent')
+
+    def __init__(
+            self, name: str,
+            attributes: Optional[Dict[str, Any]] = None,
+            groups: Optional[Iterable[str]] = None,
+            password: Optional[str] = None,
+            absent: bool = False) -> None:
+        self.name = name
+        self.attributes = {attr: _values(value) for attr, value in (attributes or {}).items()}
+        self.groups = None if groups is None else {g.lower(): g for g in groups}
+        self.password = password
+        self.absent = absent
+
+    def __repr__(self) -> str:
+        return f'DesiredUser({self.name}{", absent" if self.absent else ""})'
+
+def read_desired_state(stream: IO[str]) -> Iterator[DesiredUser]:
+    """Read desired users from a jsonl stream, one object per line:
+
+    {"name": "Pingu", "password": "...", "attributes": {"displayName": "Pingu"}, "groups": ["CN=..."]}
+    {"name": "Pinga", "absent": true}
+
+    A json array of the same objects is also accepted.
+    """
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        records = json.loads(first + stream.read())
+    else:
+        records = (
+            json.loads(line) for line in chain([first + stream.readline()], stream)
+            if line.strip() and not line.lstrip().startswith('#')
+        )
+    for record in records:
+        assert record.get('name'), f'desired state record without name: {record}'
+        yield DesiredUser(
+            record['name'], record.get('attributes'), record.get('groups'), record.get('password'), bool(record.get('absent'))
+        )
+
+class ReconcilePlan:
+    """Writes needed to reach a desired state, user writes go first so new accounts exist before group writes.
+
+    unchanged counts users whose own entry needs no write, reports are filled once the plan was applied.
+    """
+
+    def __init__(self) -> None:
+        self.users: List[Operation] = []
+        self.groups: List[Operation] = []
+        self.errors: List[str] = []
+        self.unchanged = 0
+        self.reports: List[PipelineReport] = []
+
+    @property
+    def empty(self) -> bool:
+        return not self.users and not self.groups
+
+    def describe(self) -> Iterator[Dict[str, Any]]:
+        """Json ready description of every planned write, passwords are never shown."""
+        ops = {ldap.MOD_ADD: 'add', ldap.MOD_DELETE: 'delete', ldap.MOD_REPLACE: 'replace'}
+        for operation in self.users + self.groups:
+            record: Dict[str, Any] = {'op': str(operation.kind), 'dn': operation.dn}
+            if operation.kind == OpKind.Modify:
+                record['changes'] = [
+                    {'mod': ops[mod], 'attr': attr, 'values': [] if attr.lower() == 'unicodepwd' else [v.decode('utf-8', 'replace') for v in values or []]}
+                    for mod, attr, values in operation.payload
+                ]
+            elif operation.kind == OpKind.Add:
+                record['attributes'] = sorted(a for a in operation.payload if a.lower() != 'unicodepwd')
+            yield record
+        for error in self.errors:
+            yield {'op': 'error', 'message': error}
+
+    def __str__(self) -> str:
+        kinds = {kind: sum(1 for op in self.users if op.kind == kind) for kind in OpKind}
+        return (
+            f'{kinds[OpKind.Add]} to add, {kinds[OpKind.Modify]} to modify, {kinds[OpKind.Delete]} to delete, '
+            f'{len(self.groups)} group writes, {self.unchanged} unchanged, {len(self.errors)} errors'
+        )
+
+def _current_values(entry: Dict[str, List[bytes]], attr: str) -> List[bytes]:
+    """Values of attr, attribute names returned by the server may differ in case from the desired ones."""
+    lower = attr.lower()
+    return next((values for name, values in entry.items() if name.lower() == lower), [])
+
+def plan_changes(
+        desired: Iterable[DesiredUser],
+        current: Dict[str, Dict[str, List[bytes]]],
+        new_user: Any,
+        chunk_size: int = 1000) -> ReconcilePlan:
+    """Diff desired users against current entries keyed by lower cased desired name.
+
+    Current entries must hold distinguishedName, memberOf and every desired attribute. new_user(user)
+    returns (dn, entry) of an account to create. Only groups listed by a desired user are managed,
+    their memberships are added or removed by chunks of chunk_size members per group write.
+    """
+    plan = ReconcilePlan()
+    group_add: Dict[str, Set[bytes]] = {}
+    group_remove: Dict[str, Set[bytes]] = {}
+    group_names: Dict[str, str] = {}
+    memberships: Dict[bytes, Tuple[Set[str], Dict[str, str]]] = {}
+
+    for user in desired:
+        entry = current.get(user.name.lower())
+        if user.absent:
+            if entry is not None:
+                plan.users.append(Operation(OpKind.Delete, entry['distinguishedName'][0].decode()))
+            else:
+                plan.unchanged += 1
+            continue
+
+        if entry is None:
+            if not user.password:
+                plan.errors.append(f'{user.name}: does not exist and has no password to create it')
+                continue
+            dn, new_entry = new_user(user)
+            for attr, values in user.attributes.items():
+                new_entry = {k: v for k, v in new_entry.items() if k.lower() != attr.lower()}
+                new_entry[attr] = values
+            plan.users.append(Operation(OpKind.Add, dn, new_entry))
+            user_dn, member_of = dn.encode(), set()
+        else:
+            old = {attr: _current_values(entry, attr) for attr in user.attributes}
+            modlist = modifyModlist(
+                {k: v for k, v in old.items() if v}, {k: v for k, v in user.attributes.items() if v}
+            )
+            if modlist:
+                plan.users.append(Operation(OpKind.Modify, entry['distinguishedName'][0].decode(), modlist))
+            user_dn = entry['distinguishedName'][0]
+            member_of = {g.decode().lower() for g in _current_values(entry, 'memberOf')}
+            plan.unchanged += not modlist
+
+        if user.groups is not None:
+            for key, group in user.groups.items():
+                group_names.setdefault(key, group)
+            memberships[user_dn] = (member_of, user.groups)
+
+    # memberships of managed groups only, a group nobody lists is never touched
+    for user_dn, (member_of, groups) in memberships.items():
+        for key in groups.keys() - member_of:
+            group_add.setdefault(key, set()).add(user_dn)
+        for key in (member_of & group_names.keys()) - groups.keys():
+            group_remove.setdefault(key, set()).add(user_dn)
+
+    for mod, changes in ((ldap.MOD_ADD, group_add), (ldap.MOD_DELETE, group_remove)):
+        for key, dns in sorted(changes.items()):
+            dns = sorted(dns)
+            for i in range(0, len(dns), chunk_size):
+                plan.groups.append(Operation(OpKind.Modify, group_names[key], [(mod, 'member', dns[i:i + chunk_size])]))
+
+    return plan
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from unittest import mock
+import ldap
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+from padc.msad import UacFlag, AccountControlCode
+from padc.msad.async_msad import AsyncMsAD
+from padc.msad.msad import _uac_change, _uac_filter
+
+DN = 'CN=Pingu,CN=Users,DC=RTS,DC=LOCAL'
+# NORMAL_ACCOUNT | DONT_EXPIRE_PASSWORD | WORKSTATION_TRUST_ACCOUNT (0x1000, not named by UacFlag)
+UAC = 0x200 | 0x10000 | 0x1000
+
+
+class AccountControlTest(unittest.TestCase):
+    """userAccountControl flags unittest class."""
+
+    def test_other_flags_are_kept(self):
+        """Should only set the disable bit!"""
+        change = _uac_change(DN, str(UAC).encode(), UacFlag.ACCOUNTDISABLE, 0)
+        self.assertEqual(change.payload, [
+            (ldap.MOD_DELETE, 'userAccountControl', [str(UAC).encode()]),
+            (ldap.MOD_ADD, 'userAccountControl', [str(UAC | 0x2).encode()]),
+        ])
+
+        change = _uac_change(DN, str(UAC | 0x2).encode(), 0, UacFlag.ACCOUNTDISABLE)
+        self.assertEqual(change.payload[1][2], [str(UAC).encode()])
+
+    def test_target_state_is_skipped(self):
+        """Should not write accounts already in the target state!"""
+        self.assertIsNone(_uac_change(DN, str(UAC | 0x2).encode(), UacFlag.ACCOUNTDISABLE, 0))
+        self.assertIsNone(_uac_change(DN, str(UAC).encode(), 0, UacFlag.PASSWORD_EXPIRED))
+
+    def test_filter_reads_accounts_to_change_only(self):
+        """Should narrow the filter with bitwise matching rules!"""
+        self.assertEqual(
+            _uac_filter('(objectClass=User)', 2, 65536),
+            '(&(objectClass=User)(|(!(userAccountControl:1.2.840.113556.1.4.803:=2))'
+            '(userAccountControl:1.2.840.113556.1.4.804:=65536)))'
+        )
+
+    def test_parse_flags(self):
+        """Should parse flag names and values!"""
+        self.assertEqual(UacFlag.parse(['accountdisable', '0x10000']), UacFlag.ACCOUNTDISABLE | UacFlag.DONT_EXPIRE_PASSWORD)
+        self.assertRaises(KeyError, UacFlag.parse, ['DISABLED'])
+
+
+class AsyncAccountControlTest(unittest.TestCase):
+    """AsyncMsAD userAccountControl unittest class."""
+
+    def modify(self, uac, state):
+        with mock.patch('ldap.initialize'):
+            ad = AsyncMsAD('ldaps://dc1', 'DC=RTS,DC=LOCAL', 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        found = LdapSuccessResult([(DN, {'distinguishedName': [DN.encode()], 'userAccountControl': [str(uac).encode()]})])
+        with mock.patch.object(ad, '_search_async', mock.AsyncMock(return_value=found)), \
+                mock.patch.object(ad, '_modify_replace_async', mock.AsyncMock(return_value=LdapSuccessResult('ok'))) as modify:
+            result = asyncio.run(ad.modify_account_control('(sAMAccountName=pingu)', state)).unwrap()
+        return result, modify
+
+    def test_other_flags_are_kept(self):
+        """Should only flip the disable bit!"""
+        _, modify = self.modify(UAC, AccountControlCode.DisableAccount)
+        modify.assert_awaited_once_with(
+            DN, ({'userAccountControl': [str(UAC).encode()]}, {'userAccountControl': [str(UAC | 0x2).encode()]})
+        )
+        _, modify = self.modify(UAC | 0x2, AccountControlCode.NormalAccount)
+        self.assertEqual(modify.await_args.args[1][1], {'userAccountControl': [str(UAC).encode()]})
+
+    def test_target_state_is_skipped(self):
+        """Should not write an account already in the target state!"""
+        result, modify = self.modify(UAC, AccountControlCode.NormalAccount)
+        self.assertEqual(result, f'modify_account_control::unchanged: {DN}')
+        modify.assert_not_awaited()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import socket
+import asyncio
+import unittest
+from unittest import mock
+import ldap
+from padc.client import Endpoints
+from padc.client.state import State
+from padc.msad import AsyncMsAD
+from padc.msad.ad_error_handler import ADErrorResult
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+
+
+class FakeConnection:
+    """Non-blocking connection double holding answers until released, then answering the last request first."""
+
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.sent = []
+        self.ready = []
+        self.failures = {}
+        self.unbound = False
+        self.tls = False
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+    def set_option(self, option, value):
+        pass
+
+    def get_option(self, option):
+        return self.reader.fileno()
+
+    def start_tls_s(self):
+        self.tls = True
+
+    def simple_bind(self, who, cred):
+        self.sent.append(None)
+        return len(self.sent)
+
+    def search_ext(self, base, scope, s_filter, attr, attrsonly):
+        self.sent.append(s_filter)
+        return len(self.sent)
+
+    def release(self, error=None):
+        """Make every request sent so far answered, error answers all of them at once."""
+        if error is not None:
+            self.ready.append(error)
+            return
+        for msgid in range(len(self.sent), 0, -1):
+            self.ready.append(self.failures.get(msgid, msgid))
+
+    def result3(self, msgid=ldap.RES_ANY, all=1, timeout=-1):
+        if not self.ready:
+            return None, None, None, None
+        answer = self.ready.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        if self.sent[answer - 1] is None:
+            return 97, [], answer, []
+        name = self.sent[answer - 1][4:-1]
+        return 101, [(f'CN={name},{BASE_DN}', {'cn': [name.encode()]})], answer, []
+
+    def unbind_s(self):
+        self.unbound = True
+
+
+class AsyncMsADTest(unittest.TestCase):
+    """Asyncio client over one shared connection unittest class."""
+
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.addCleanup(self.connection.close)
+        self.endpoints = Endpoints(['ldaps://dc1'], cooldown=60)
+        with mock.patch('ldap.initialize', return_value=self.connection):
+            self.ad = AsyncMsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret', endpoints=self.endpoints)
+        self.ad.state = State.Signed
+        self.ad.poll_interval = 0.001
+
+    async def searches(self, count, error=None):
+        tasks = [asyncio.create_task(self.ad.search(f'(cn=user{i})')) for i in range(count)]
+        # every request is sent before the first answer comes back
+        await asyncio.sleep(0)
+        self.connection.release(error)
+        return await asyncio.gather(*tasks)
+
+    def test_bind_is_recorded(self):
+        """Should keep credentials and rank the server like the sync client, then mark it failed once lost!"""
+        async def scenario():
+            (await self.ad.start_tls('/etc/ssl/ca.pem')).unwrap()
+            bind = asyncio.create_task(self.ad.connect())
+            await asyncio.sleep(0)
+            self.connection.release()
+            (await bind).unwrap()
+            self.assertEqual(self.ad.state, State.Signed)
+            self.assertTrue(self.endpoints.up('ldaps://dc1'))
+            return await self.searches(1, ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"}))
+
+        self.ad.state = State.Connected
+        self.endpoints.fail('ldaps://dc1')
+        asyncio.run(scenario())
+        self.assertTrue(self.connection.tls)
+        self.assertTrue(self.ad.lost)
+        self.assertFalse(self.endpoints.up('ldaps://dc1'))
+
+    def test_results_follow_message_id(self):
+        """Should hand answers read in any order to the request they belong to!"""
+        results = asyncio.run(self.searches(5))
+        self.assertEqual(len(self.connection.sent), 5)
+        self.assertEqual([r.unwrap()[0].cn for r in results], [f'user{i}' for i in range(5)])
+
+    def test_request_error(self):
+        """Should fail the request an error answers only!"""
+        self.connection.failures[2] = ldap.NO_SUCH_OBJECT({'msgid': 2, 'desc': 'No such object'})
+        results = asyncio.run(self.searches(3))
+        self.assertIsInstance(results[1], ADErrorResult)
+        self.assertEqual([results[0].unwrap()[0].cn, results[2].unwrap()[0].cn], ['user0', 'user2'])
+        self.assertEqual(self.ad.state, State.Signed)
+
+    def test_connection_error(self):
+        """Should fail every waiting request when the connection is lost!"""
+        results = asyncio.run(self.searches(3, ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})))
+        self.assertTrue(all(isinstance(r, ADErrorResult) for r in results))
+        self.assertEqual((self.ad.state, self.ad._fd, self.ad._pending), (State.Disconnected, None, {}))
+
+    def test_close_unwatches_connection(self):
+        """Should wait for requests in flight, then stop reading the connection socket!"""
+        async def scenario():
+            search = asyncio.create_task(self.ad.search('(cn=pingu)'))
+            await asyncio.sleep(0)
+            close = asyncio.create_task(self.ad.close())
+            await asyncio.sleep(0.01)
+            self.assertFalse(close.done())
+            self.connection.release()
+            await close
+            # the reader was removed already, nothing is left to remove
+            self.assertFalse(asyncio.get_running_loop().remove_reader(self.connection.reader.fileno()))
+            return await search
+
+        self.assertEqual(asyncio.run(scenario()).unwrap()[0].cn, 'pingu')
+        self.assertTrue(self.connection.unbound)
+        self.assertEqual((self.ad.state, self.ad._fd), (State.Disconnected, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
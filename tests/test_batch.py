@@ -0,0 +1,101 @@
+import io
+import json
+import unittest
+from unittest import mock
+from padc.client import Scope
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+from padc.cli.batch import read_operations, run_operation, run_batch
+from padc.msad import MsAD
+from padc.msad.ad_error_handler import ADErrorResult, ADSuccessResult
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+USERS_OU = f'OU=Staff,{BASE_DN}'
+DN = f'CN=Pingu,{USERS_OU}'
+CONFIG = {'BASE_DN': BASE_DN, 'USERS_OU': USERS_OU}
+
+
+class FakeAD:
+    """Bound session double deleting any user."""
+
+    loader = None
+
+    def delete_user(self, name):
+        return ADSuccessResult(f'delete_user::{name}')
+
+
+class FlakyPool:
+    """Pool double raising, like a lost checkout or bind would, on the operations of some users."""
+
+    def __init__(self, unavailable):
+        self.unavailable = unavailable
+
+    def run(self, fn, timeout=None, idempotent=False):
+        result = fn(FakeAD())
+        if result['name'] in self.unavailable:
+            raise self.unavailable[result['name']]
+        return result
+
+
+class BatchTest(unittest.TestCase):
+    """Batch operations parsing unittest class."""
+
+    def test_read_jsonl(self):
+        """Should read one operation per line and report invalid lines!"""
+        stream = io.StringIO('{"op": "disable", "name": "Pingu"}\n\n# comment\nnot json\n')
+        ops = list(read_operations(stream, "jsonl"))
+        self.assertEqual(ops[0], {'op': 'disable', 'name': 'Pingu'})
+        self.assertIn('error', ops[1])
+
+    def test_read_csv(self):
+        """Should read csv rows skipping empty columns!"""
+        stream = io.StringIO('op,name,password,group,acc\ncreate,Pingu pythonico,Pingupassword@123,,514\n')
+        ops = list(read_operations(stream, "csv"))
+        self.assertEqual(ops, [{'op': 'create', 'name': 'Pingu pythonico', 'password': 'Pingupassword@123', 'acc': '514'}])
+
+    def test_invalid_operations(self):
+        """Should reject invalid operations without touching the server!"""
+        for op in ({'op': 'rename', 'name': 'Pingu'},
+                   {'op': 'add-to-group', 'name': 'Pingu'},
+                   {'op': 'create', 'name': 'Pingu'},
+                   {'op': 'create', 'name': 'Pingu', 'password': 'x', 'acc': 'disabled'}):
+            result = run_operation(None, op, CONFIG)
+            self.assertFalse(result['ok'], op)
+
+    def test_pool_errors_are_results(self):
+        """Should write a failed result line for operations no session could run and go on!"""
+        pool = FlakyPool({
+            'user1': TimeoutError('checkout: no connection available after 5s'),
+            'user2': ADErrorResult("Can't contact LDAP server", 'start_tls'),
+        })
+        output = io.StringIO()
+        for workers in (1, 2):
+            output.seek(0)
+            output.truncate()
+            counts = run_batch([{'op': 'delete', 'name': f'user{i}'} for i in range(4)], pool, output, CONFIG, workers)
+            results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+            self.assertEqual(counts, {'total': 4, 'failed': 2})
+            self.assertEqual([r['ok'] for r in results], [True, False, False, True])
+            self.assertEqual(results[1]['error'], 'checkout: no connection available after 5s')
+            self.assertEqual(results[2]['error'], "start_tls: Can't contact LDAP server")
+
+    def test_lookups_follow_single_commands(self):
+        """Should look accounts up in USERS_OU and read DNs with a base search, as single commands do!"""
+        with mock.patch('ldap.initialize'):
+            ad = MsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        found = [(DN, {'distinguishedName': [DN.encode()]})]
+        group = f'CN=it,{BASE_DN}'
+        with mock.patch.object(ad, '_search', return_value=LdapSuccessResult(found)) as search, \
+                mock.patch.object(ad, '_paged_search', return_value=LdapSuccessResult(iter(found))) as paged_search, \
+                mock.patch.object(ad, '_modify_add', return_value=LdapSuccessResult('ok')):
+            self.assertTrue(run_operation(ad, {'op': 'add-to-group', 'name': DN, 'group': group}, CONFIG)['ok'])
+            self.assertTrue(run_operation(ad, {'op': 'add-to-group', 'name': 'pingu', 'group': group}, CONFIG)['ok'])
+
+        search.assert_called_once_with(DN, '(sAMAccountType=805306368)', ['distinguishedName'], Scope.Base)
+        self.assertEqual(paged_search.call_args.args[0], USERS_OU)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks import run
+
+BASELINE = {
+    "meta": {"scale": 1000, "count": 500},
+    "results": {
+        "search_single": {"ops": 500, "errors": 0, "ops_per_sec": 1000.0},
+        "modify": {"ops": 500, "errors": 0, "ops_per_sec": 400.0},
+        "delete": {"ops": 500, "errors": 0, "ops_per_sec": 300.0},
+    },
+}
+
+
+class RegressionsTest(unittest.TestCase):
+    """Benchmark comparison against a baseline unittest class."""
+
+    def baseline(self) -> str:
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(BASELINE, f)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_drop_beyond_tolerance(self):
+        """Should report benchmarks slower than tolerance allows only!"""
+        results = {
+            "search_single": {"ops_per_sec": 790.0},
+            "modify": {"ops_per_sec": 330.0},
+            "delete": {"ops_per_sec": 900.0},
+            "add_to_group": {"ops_per_sec": 1.0},
+        }
+        with open(self.baseline()) as f:
+            slower = run.regressions(results, json.load(f)["results"], 0.2)
+        self.assertEqual(slower, ['search_single: 790.0 ops/s, baseline 1000.0 ops/s'])
+
+    def test_exit_code(self):
+        """Should exit 1 and print regressions when the run is slower than the baseline!"""
+        results = {name: dict(r, ops_per_sec=r["ops_per_sec"] / 2) for name, r in BASELINE["results"].items()}
+        baseline = self.baseline()
+        stderr = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(run, 'Slapd') as slapd, \
+                mock.patch.object(run, 'run', return_value=results), mock.patch('sys.stderr', stderr):
+            slapd.available.return_value = True
+            output = os.path.join(tmp, 'results.json')
+            self.assertEqual(run.main(['--output', output, '--baseline', baseline]), 1)
+            self.assertEqual(run.main(['--output', output, '--baseline', baseline, '--tolerance', '0.6']), 0)
+            with open(output) as f:
+                self.assertEqual(json.load(f)["results"], results)
+
+        self.assertEqual(stderr.getvalue().count('regression: '), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
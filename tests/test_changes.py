@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from padc.client import DirSyncControl
+from padc.msad import SyncState
+
+
+class SyncStateTest(unittest.TestCase):
+    """Change feed state unittest class."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'sync.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_state_is_full_sync(self):
+        """Should start from an empty state when nothing was saved!"""
+        state = SyncState.load(self.path)
+        self.assertEqual((state.mode, state.cookie, state.usn), ('', b'', 0))
+
+    def test_round_trip(self):
+        """Should keep binary cookie and watermark between runs!"""
+        SyncState('dirsync', b'\x00\xffcookie', 0, '').save(self.path)
+        state = SyncState.load(self.path)
+        self.assertEqual((state.mode, state.cookie), ('dirsync', b'\x00\xffcookie'))
+
+        SyncState('usn', b'', 123456, 'CN=NTDS Settings,CN=DC1').save(self.path)
+        state = SyncState.load(self.path)
+        self.assertEqual((state.mode, state.usn, state.server), ('usn', 123456, 'CN=NTDS Settings,CN=DC1'))
+        self.assertEqual(os.listdir(self.dir.name), ['sync.json'])
+
+
+class DirSyncControlTest(unittest.TestCase):
+    """DirSync control unittest class."""
+
+    def test_response_cookie_and_more_results(self):
+        """Should decode the cookie and more results flag answered by the server!"""
+        response = DirSyncControl(cookie=b'next', flags=1, max_bytes=0)
+        control = DirSyncControl()
+        control.decodeControlValue(response.encodeControlValue())
+
+        self.assertEqual(control.cookie, b'next')
+        self.assertTrue(control.more_results)
+
+
+if __name__ == '__main__':
+    unittest.main()
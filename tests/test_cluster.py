@@ -0,0 +1,101 @@
+import unittest
+from padc.client import ConnectionPool, Endpoints
+from padc.client.state import State
+from padc.msad import MsADCluster, ADErrorResult
+
+
+class FakeAD:
+    """Bound session double of one domain controller."""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.state = State.Signed
+
+    def _close(self):
+        self.state = State.Disconnected
+
+
+class EndpointsTest(unittest.TestCase):
+    """Domain controllers ranking unittest class."""
+
+    def test_lowest_latency_first(self):
+        """Should rank faster servers first!"""
+        endpoints = Endpoints(['ldaps://dc1', 'ldaps://dc2'])
+        endpoints.observe('ldaps://dc1', 0.2)
+        endpoints.observe('ldaps://dc2', 0.01)
+        self.assertEqual(endpoints.ranked(), ['ldaps://dc2', 'ldaps://dc1'])
+
+    def test_failed_server_goes_last(self):
+        """Should skip a server that stopped answering until its cooldown expires!"""
+        endpoints = Endpoints(['ldaps://dc1', 'ldaps://dc2'], cooldown=60)
+        endpoints.fail('ldaps://dc1')
+        self.assertFalse(endpoints.up('ldaps://dc1'))
+        self.assertEqual(endpoints.ranked(), ['ldaps://dc2', 'ldaps://dc1'])
+
+        endpoints = Endpoints(['ldaps://dc1'], cooldown=0)
+        endpoints.fail('ldaps://dc1')
+        self.assertTrue(endpoints.up('ldaps://dc1'))
+
+
+class MsADClusterTest(unittest.TestCase):
+    """Multi domain controller routing unittest class."""
+
+    def setUp(self):
+        self.uris = ['ldaps://dc1', 'ldaps://dc2']
+        self.down = set()
+        self.cluster = MsADCluster(self.uris, 'DC=RTS,DC=LOCAL', 'administrator@rts.local', 'secret', sessions=1, cooldown=60)
+        self.cluster.pools = {uri: ConnectionPool(lambda uri=uri: self.bound(uri), size=1) for uri in self.uris}
+
+    def bound(self, uri: str) -> FakeAD:
+        if uri in self.down:
+            raise ADErrorResult("{'desc': \"Can't contact LDAP server\"}", 'start_tls')
+        return FakeAD(uri)
+
+    def test_busy_dc_spreads_work(self):
+        """Should use another DC when the best one has no free session!"""
+        with self.cluster.connection() as first, self.cluster.connection() as second:
+            self.assertEqual({first.uri, second.uri}, set(self.uris))
+
+    def test_failover_when_session_is_lost(self):
+        """Should retry the operation on the next DC when the server goes down!"""
+        def operation(ad):
+            if ad.uri == 'ldaps://dc1':
+                ad.state = State.Disconnected
+            return ad.uri
+
+        self.cluster.endpoints.observe('ldaps://dc1', 0.001)
+        self.cluster.endpoints.observe('ldaps://dc2', 0.5)
+        self.assertEqual(self.cluster.run(operation, idempotent=True), 'ldaps://dc2')
+        self.assertFalse(self.cluster.endpoints.up('ldaps://dc1'))
+
+    def test_write_is_not_run_again(self):
+        """Should report an unknown outcome rather than run a write on the next DC!"""
+        calls = []
+        def operation(ad):
+            calls.append(ad.uri)
+            ad.state = State.Disconnected
+
+        self.cluster.endpoints.observe('ldaps://dc1', 0.001)
+        self.cluster.endpoints.observe('ldaps://dc2', 0.5)
+        with self.assertRaises(ADErrorResult) as raised:
+            self.cluster.run(operation)
+        self.assertIn('outcome unknown', raised.exception.message)
+        self.assertEqual(calls, ['ldaps://dc1'])
+
+    def test_failover_when_bind_fails(self):
+        """Should open sessions on another DC when one cannot be reached!"""
+        self.down.add('ldaps://dc1')
+        self.cluster.endpoints.observe('ldaps://dc1', 0.001)
+        self.cluster.endpoints.observe('ldaps://dc2', 0.5)
+        self.assertEqual(self.cluster.run(lambda ad: ad.uri), 'ldaps://dc2')
+        self.assertEqual(self.cluster.endpoints.ranked()[0], 'ldaps://dc2')
+
+    def test_every_dc_down(self):
+        """Should raise when no DC can be reached!"""
+        self.down.update(self.uris)
+        with self.assertRaises(ADErrorResult):
+            self.cluster.run(lambda ad: ad.uri)
+
+
+if __name__ == '__main__':
+    unittest.main()
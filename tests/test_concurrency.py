@@ -0,0 +1,149 @@
+import time
+import unittest
+from unittest import mock
+import ldap
+from padc.client import Client, ConcurrencyLimit, RateLimit, Operation, OpKind
+from padc.client.state import State
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+
+
+class FakeConnection:
+    """Connection double answering deletes in order, refusing the first attempt of busy DNs.
+
+    refused DNs are answered UNWILLING_TO_PERFORM with their diagnostic on every attempt.
+    """
+
+    def __init__(self, busy=(), refused=None):
+        self.busy = set(busy)
+        self.refused = refused or {}
+        self.sent = []
+        self.answers = []
+        self.max_in_flight = 0
+
+    def set_option(self, option, value):
+        pass
+
+    def delete_ext(self, dn):
+        self.sent.append(dn)
+        self.answers.append((len(self.sent), dn))
+        self.max_in_flight = max(self.max_in_flight, len(self.answers))
+        return len(self.sent)
+
+    def result3(self, msgid, all=1, timeout=-1):
+        msgid, dn = self.answers.pop(0)
+        if dn in self.busy:
+            self.busy.discard(dn)
+            raise ldap.BUSY({'msgid': msgid, 'desc': 'Server is busy'})
+        if dn in self.refused:
+            raise ldap.UNWILLING_TO_PERFORM({'msgid': msgid, 'desc': 'Server is unwilling to perform', 'info': self.refused[dn]})
+        return 107, [], msgid, []
+
+
+class ConcurrencyLimitTest(unittest.TestCase):
+    """AIMD window unittest class."""
+
+    def test_additive_increase(self):
+        """Should widen the window by about one per window of healthy completions!"""
+        limit = ConcurrencyLimit(4, maximum=6)
+        for _ in range(5):
+            limit.observe(0.01)
+        self.assertEqual(limit.window, 5)
+        for _ in range(100):
+            limit.observe(0.01)
+        self.assertEqual(limit.window, 6)
+
+    def test_busy_backoff(self):
+        """Should halve the window once per window of completions!"""
+        limit = ConcurrencyLimit(32, minimum=2)
+        limit.busy()
+        limit.busy()
+        self.assertEqual((limit.window, limit.decreases), (16, 1))
+        for _ in range(16):
+            limit.busy()
+        self.assertEqual(limit.window, 8)
+        for _ in range(20):
+            limit.busy()
+        self.assertEqual(limit.window, 2)
+
+    def test_latency_backoff(self):
+        """Should back off when p99 latency rises above the best one seen!"""
+        limit = ConcurrencyLimit(16, sample=10)
+        for _ in range(10):
+            limit.observe(0.01)
+        self.assertIsNotNone(limit.p99())
+        for _ in range(5):
+            limit.observe(0.5)
+        self.assertEqual(limit.decreases, 1)
+        self.assertLess(limit.window, 16)
+
+    def test_rate_ceiling(self):
+        """Should space operations by 1 / max_rate!"""
+        rate = RateLimit(100)
+        self.assertEqual(rate.reserve(), 0.0)
+        self.assertAlmostEqual(rate.reserve(), 0.01, delta=0.005)
+        self.assertGreater(rate.delay(), 0.0)
+
+
+class PipelineTest(unittest.TestCase):
+    """Adaptive pipeline unittest class."""
+
+    def client(self, connection: FakeConnection) -> Client:
+        with mock.patch('ldap.initialize', return_value=connection):
+            client = Client('ldaps://dc1')
+        client.state = State.Signed
+        return client
+
+    def operations(self, count: int):
+        return [Operation(OpKind.Delete, f'CN=user{i},{BASE_DN}') for i in range(count)]
+
+    def test_busy_operations_are_sent_again(self):
+        """Should send operations refused by a busy server again and shrink the window!"""
+        connection = FakeConnection(busy={f'CN=user3,{BASE_DN}'})
+        limit = ConcurrencyLimit(8)
+        report = self.client(connection)._pipeline(self.operations(20), limit=limit).unwrap()
+
+        self.assertEqual((report.total, len(report.failed)), (20, 0))
+        self.assertEqual(connection.sent.count(f'CN=user3,{BASE_DN}'), 2)
+        self.assertEqual(limit.decreases, 1)
+
+    def test_permanent_refusal_is_not_sent_again(self):
+        """Should fail a record AD will never accept at once, without shrinking the window!"""
+        weak = f'CN=user3,{BASE_DN}'
+        connection = FakeConnection(refused={
+            weak: '0000052D: Constraint violation - check_password_restrictions: the password is too short',
+        })
+        limit = ConcurrencyLimit(8)
+        report = self.client(connection)._pipeline(self.operations(10), limit=limit).unwrap()
+
+        self.assertEqual(connection.sent.count(weak), 1)
+        self.assertEqual((len(report.failed), limit.decreases), (1, 0))
+
+    def test_busy_diagnostic(self):
+        """Should send again operations refused as unwilling by a server saying it is busy!"""
+        busy = f'CN=user3,{BASE_DN}'
+        connection = FakeConnection(refused={busy: '00002024: The server is busy'})
+        limit = ConcurrencyLimit(8)
+        report = self.client(connection)._pipeline(self.operations(10), limit=limit).unwrap()
+
+        self.assertEqual(connection.sent.count(busy), 3)
+        self.assertEqual(len(report.failed), 1)
+        self.assertGreaterEqual(limit.decreases, 1)
+
+    def test_window_bounds_in_flight(self):
+        """Should never keep more operations in flight than the window!"""
+        connection = FakeConnection()
+        self.client(connection)._pipeline(self.operations(50), limit=ConcurrencyLimit(3, maximum=3)).unwrap()
+        self.assertEqual(connection.max_in_flight, 3)
+
+    def test_rate_ceiling(self):
+        """Should not send more than max_rate operations per second!"""
+        client = self.client(FakeConnection())
+        client.max_rate = 200
+        started = time.monotonic()
+        client._pipeline(self.operations(11), 4).unwrap()
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from padc.cli.daemon import PadcServer
+from padc.cli.daemon_client import forward, trusted_socket, config_fingerprint
+from padc.msad.ad_error_handler import ADSuccessResult
+
+CONFIG = {'URI': 'ldaps://dc1', 'BASE_DN': 'DC=RTS,DC=LOCAL', 'BIND_DN': 'administrator@rts.local', 'AUTH_PASS': 'secret'}
+
+
+class FakeAD:
+    """Session double recording deleted users."""
+
+    def __init__(self):
+        self.deleted = []
+
+    def delete_user(self, name):
+        self.deleted.append(name)
+        return ADSuccessResult(f'delete_user::{name}')
+
+class FakePool:
+    def __init__(self):
+        self.ad = FakeAD()
+
+    def run(self, fn, timeout=None, idempotent=False):
+        return fn(self.ad)
+
+
+class DaemonTest(unittest.TestCase):
+    """padc daemon and client unittest class."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        os.chmod(self.dir.name, 0o700)
+        self.path = os.path.join(self.dir.name, 'padc.sock')
+        self.env = mock.patch.dict(os.environ, {'PADC_SOCKET': self.path}, clear=False)
+        self.env.start()
+        os.environ.pop('PADC_NO_DAEMON', None)
+
+    def tearDown(self):
+        self.env.stop()
+        self.dir.cleanup()
+
+    def serve(self, fingerprint: str = config_fingerprint(CONFIG)) -> PadcServer:
+        server = PadcServer(self.path, FakePool(), fingerprint, CONFIG)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_forward(self):
+        """Should run the operation on the daemon!"""
+        server = self.serve()
+        response = forward({'op': 'delete', 'name': 'Pingu'}, CONFIG)
+        self.assertTrue(response['ok'])
+        self.assertEqual(server.pool.ad.deleted, ['Pingu'])
+
+    def test_other_directory(self):
+        """Should run locally when the daemon serves other credentials!"""
+        server = self.serve()
+        self.assertIsNone(forward({'op': 'delete', 'name': 'Pingu'}, {**CONFIG, 'AUTH_PASS': 'other'}))
+        self.assertEqual(server.pool.ad.deleted, [])
+
+    def test_no_daemon(self):
+        """Should run locally when no daemon listens!"""
+        self.assertIsNone(forward({'op': 'delete', 'name': 'Pingu'}, CONFIG))
+
+    def test_untrusted_directory(self):
+        """Should not talk to a socket other users could have bound!"""
+        self.serve()
+        os.chmod(self.dir.name, 0o777)
+        self.assertFalse(trusted_socket(self.path))
+        self.assertIsNone(forward({'op': 'delete', 'name': 'Pingu'}, CONFIG))
+        os.chmod(self.dir.name, 0o1777)
+        self.assertTrue(trusted_socket(self.path))
+
+    def test_socket_is_private_once_bound(self):
+        """Should create the socket readable and writable by its owner only, whatever the umask!"""
+        umask = os.umask(0)
+        try:
+            with mock.patch('os.chmod') as chmod:
+                self.serve()
+            self.assertEqual(os.umask(0), 0)
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        chmod.assert_not_called()
+
+    def test_untrusted_socket_mode(self):
+        """Should not talk to a socket other users can connect to!"""
+        self.serve()
+        os.chmod(self.path, 0o666)
+        self.assertFalse(trusted_socket(self.path))
+
+    def test_lost_answer(self):
+        """Should report a failure, not run again, once the request was sent!"""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(1)
+        self.addCleanup(listener.close)
+        def accept_and_drop():
+            conn, _ = listener.accept()
+            conn.recv(4096)
+            conn.close()
+        threading.Thread(target=accept_and_drop, daemon=True).start()
+
+        response = forward({'op': 'delete', 'name': 'Pingu'}, CONFIG, timeout=2)
+        self.assertIsNotNone(response)
+        self.assertFalse(response['ok'])
+        self.assertIn('may have been applied', response['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
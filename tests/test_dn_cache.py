@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from padc.msad import DNCache
+
+
+class DNCacheTest(unittest.TestCase):
+    """DN cache unittest class."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'dn.db')
+        self.key = '(&(objectClass=User)(sAMAccountName=unittester))'
+        self.dn = 'CN=unittester pythonic,CN=Users,DC=RTS,DC=LOCAL'
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_hit_and_miss(self):
+        """Should count hits and misses!"""
+        cache = DNCache()
+        self.assertIsNone(cache.get(self.key))
+        cache.put(self.key, self.dn)
+        self.assertEqual(cache.get(self.key).dn, self.dn)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_ttl(self):
+        """Should expire entries after ttl!"""
+        cache = DNCache(ttl=-1)
+        cache.put(self.key, self.dn)
+        self.assertIsNone(cache.get(self.key))
+
+    def test_lru(self):
+        """Should evict least recently used entries!"""
+        cache = DNCache(max_size=2)
+        cache.put('a', 'CN=a')
+        cache.put('b', 'CN=b')
+        cache.get('a')
+        cache.put('c', 'CN=c')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_invalidate_dn(self):
+        """Should forget every key of a deleted DN!"""
+        cache = DNCache(path=self.path)
+        cache.put(self.key, self.dn)
+        cache.put('other', self.dn)
+        cache.invalidate_dn(self.dn.lower())
+        self.assertIsNone(cache.get(self.key))
+        self.assertIsNone(cache.get('other'))
+        cache.close()
+
+    def test_shared_store(self):
+        """Should share entries between caches of the same file!"""
+        first = DNCache(path=self.path)
+        first.put(self.key, self.dn)
+        first.close()
+        second = DNCache(path=self.path)
+        self.assertEqual(second.get(self.key).dn, self.dn)
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
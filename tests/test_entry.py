@@ -0,0 +1,53 @@
+import unittest
+from uuid import UUID
+from datetime import datetime, timezone
+from padc.msad import Entry
+
+GUID = UUID('2b6e2a32-94a2-4a5a-8e1d-6c0b8f3a1c55')
+# S-1-5-21-1004336348-1177238915-682003330-512
+SID = bytes.fromhex('010500000000000515000000dcf4dc3b833d2b46828ba62800020000')
+
+
+class EntryTest(unittest.TestCase):
+    """Search result entry unittest class."""
+
+    def setUp(self):
+        self.raw = {
+            'distinguishedName': [b'CN=Pingu,CN=Users,DC=RTS,DC=LOCAL'],
+            'userAccountControl': [b'514'],
+            'accountExpires': [b'9223372036854775807'],
+            'pwdLastSet': [b'133485408000000000'],
+            'whenCreated': [b'20240101120000.0Z'],
+            'objectGUID': [GUID.bytes_le],
+            'objectSid': [SID],
+            'memberOf': [b'CN=testgroup,CN=Users,DC=RTS,DC=LOCAL', b'CN=it,CN=Users,DC=RTS,DC=LOCAL'],
+        }
+        self.entry = Entry('CN=Pingu,CN=Users,DC=RTS,DC=LOCAL', self.raw)
+
+    def test_raw_mapping(self):
+        """Should keep raw values, whatever the attribute name case!"""
+        self.assertEqual(self.entry['useraccountcontrol'], [b'514'])
+        self.assertIn('MEMBEROF', self.entry)
+        self.assertEqual(dict(self.entry), self.raw)
+
+    def test_ad_syntaxes(self):
+        """Should decode integers, FILETIME, times, GUID and SID values!"""
+        self.assertEqual(self.entry.userAccountControl, 514)
+        self.assertIsNone(self.entry.accountExpires)
+        self.assertEqual(self.entry.pwdLastSet, datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc))
+        self.assertEqual(self.entry.whenCreated, datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc))
+        self.assertEqual(self.entry.objectGUID, GUID)
+        self.assertEqual(self.entry.objectsid, 'S-1-5-21-1004336348-1177238915-682003330-512')
+        self.assertEqual(self.entry.all('memberOf')[1], 'CN=it,CN=Users,DC=RTS,DC=LOCAL')
+        self.assertEqual(self.entry.first('description', ''), '')
+
+    def test_lazy_decoding(self):
+        """Should decode an attribute only when it is first read!"""
+        self.assertIsNone(self.entry._decoded)
+        self.assertEqual(self.entry.distinguishedName, self.entry.dn)
+        self.assertEqual(list(self.entry._decoded), ['distinguishedName'])
+        self.assertIs(self.entry.all('distinguishedName'), self.entry.all('distinguishedname'))
+
+
+if __name__ == '__main__':
+    unittest.main()
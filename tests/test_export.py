@@ -0,0 +1,66 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+from padc.msad import entry_writer
+from padc.msad.ad_error_handler import ADErrorResult, ADSuccessResult
+from padc.cli import users_utils
+
+
+class ExportWriterTest(unittest.TestCase):
+    """Export writers unittest class."""
+
+    def setUp(self):
+        self.dn = 'CN=unittester pythonic,CN=Users,DC=RTS,DC=LOCAL'
+        self.entry = {
+            'sAMAccountName': [b'unittester'],
+            'objectGUID': [b'\xff\xfe\x00\x81'],
+            'memberOf': [b'CN=testgroup,CN=Users,DC=RTS,DC=LOCAL', b'CN=other,CN=Users,DC=RTS,DC=LOCAL'],
+        }
+
+    def test_jsonl_writes_one_object_per_line(self):
+        """Should write one json line per entry, binary values base64 encoded!"""
+        output = io.StringIO()
+        write = entry_writer(output, 'jsonl')
+        write(self.dn, self.entry)
+        write(self.dn, {'cn': [b'unittester']})
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        record = json.loads(lines[0])
+        self.assertEqual(record['dn'], self.dn)
+        self.assertEqual(record['attributes']['sAMAccountName'], ['unittester'])
+        self.assertEqual(record['attributes']['objectGUID;binary'], ['//4AgQ=='])
+        self.assertEqual(len(record['attributes']['memberOf']), 2)
+
+    def test_ldif_writes_content_records(self):
+        """Should write ldif records with base64 values for binary attributes!"""
+        output = io.StringIO()
+        entry_writer(output, 'ldif')(self.dn, self.entry)
+
+        text = output.getvalue()
+        self.assertIn(f'dn: {self.dn}', text)
+        self.assertIn('sAMAccountName: unittester', text)
+        self.assertIn('objectGUID:: //4AgQ==', text)
+
+    def test_unknown_format(self):
+        """Should refuse unknown formats!"""
+        with self.assertRaises(AssertionError):
+            entry_writer(io.StringIO(), 'csv')
+
+    def test_failed_export_is_not_a_count(self):
+        """Should answer None rather than 0 entries when the export fails!"""
+        ad = mock.Mock()
+        ad.connect.return_value = ADErrorResult('invalid credentials', 'connect')
+        ad.export.return_value = ADErrorResult('Cannot perform search without a signed connection', 'export')
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(users_utils, 'new_msad', return_value=ad):
+            count = users_utils.export_entries(
+                os.path.join(tmp, 'users.jsonl'), None, '(objectClass=User)', None, False, 500, {'CA_PATH': ''}
+            )
+        self.assertIsNone(count)
+
+
+if __name__ == '__main__':
+    unittest.main()
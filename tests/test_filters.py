@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+from padc.client import Scope
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+from padc.msad import MsAD, SearchPlan, optimize_filter, account_plan
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+USERS_OU = f'OU=Staff,{BASE_DN}'
+DN = f'CN=Pingu,{USERS_OU}'
+
+
+class FiltersTest(unittest.TestCase):
+    """Indexed filter rewriting unittest class."""
+
+    def test_indexed_equivalents(self):
+        """Should rewrite objectClass lookups to indexed attributes!"""
+        self.assertEqual(optimize_filter('(&(objectClass=User)(objectCategory=person))'), '(sAMAccountType=805306368)')
+        self.assertEqual(
+            optimize_filter('(&(objectclass=user)(sAMAccountName=pingu))'),
+            '(&(sAMAccountType=805306368)(sAMAccountName=pingu))'
+        )
+        self.assertEqual(
+            optimize_filter('(|(objectClass=User)(objectClass=Group))'), '(|(objectClass=User)(objectCategory=group))'
+        )
+
+    def test_account_plan(self):
+        """Should narrow the base to the OU and read a known DN with a base search!"""
+        self.assertEqual(
+            account_plan('pingu', BASE_DN, USERS_OU),
+            SearchPlan(USERS_OU, '(&(sAMAccountType=805306368)(sAMAccountName=pingu))')
+        )
+        self.assertEqual(account_plan(DN, BASE_DN), SearchPlan(DN, '(sAMAccountType=805306368)', Scope.Base))
+        self.assertEqual(
+            str(account_plan('pingu', BASE_DN)),
+            f'base: {BASE_DN}\nscope: SubTree\nfilter: (&(sAMAccountType=805306368)(sAMAccountName=pingu))'
+        )
+
+    def test_lookup_follows_plan(self):
+        """Should search the planned base, scope and filter!"""
+        with mock.patch('ldap.initialize'):
+            ad = MsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        found = [(DN, {'distinguishedName': [DN.encode()]})]
+        with mock.patch.object(ad, '_search', return_value=LdapSuccessResult(found)) as search, \
+                mock.patch.object(ad, '_modify_add', return_value=LdapSuccessResult('ok')):
+            ad.add_account_to_group(account_plan(DN, BASE_DN), f'CN=it,{BASE_DN}').unwrap()
+        search.assert_called_once_with(DN, '(sAMAccountType=805306368)', ['distinguishedName'], Scope.Base)
+
+        with mock.patch.object(ad, '_paged_search', return_value=LdapSuccessResult(iter(found))) as search, \
+                mock.patch.object(ad, '_modify_add', return_value=LdapSuccessResult('ok')):
+            ad.add_account_to_group(account_plan('pingu', BASE_DN, USERS_OU), f'CN=it,{BASE_DN}').unwrap()
+        self.assertEqual(search.call_args.args[:2], (USERS_OU, '(&(sAMAccountType=805306368)(sAMAccountName=pingu))'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+from padc.client import LdapErrorResult
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+from padc.msad import GroupGraph, MsAD, ADErrorResult
+
+ADMINS = 'CN=admins,CN=Users,DC=RTS,DC=LOCAL'
+IT = 'CN=it,CN=Users,DC=RTS,DC=LOCAL'
+STAFF = 'CN=staff,CN=Users,DC=RTS,DC=LOCAL'
+LOOP_A = 'CN=loop a,CN=Users,DC=RTS,DC=LOCAL'
+LOOP_B = 'CN=loop b,CN=Users,DC=RTS,DC=LOCAL'
+
+
+class GroupGraphTest(unittest.TestCase):
+    """Nested groups unittest class."""
+
+    def setUp(self):
+        # admins is in it, it is in staff, loop a and loop b are nested in each other
+        self.graph = GroupGraph([
+            (ADMINS, [IT]),
+            (IT, [STAFF.upper()]),
+            (STAFF, []),
+            (LOOP_A, [LOOP_B, STAFF]),
+            (LOOP_B, [LOOP_A]),
+        ])
+
+    def test_transitive_membership(self):
+        """Should find groups reached through nesting, whatever the DN case!"""
+        self.assertTrue(self.graph.is_member([ADMINS], STAFF))
+        self.assertTrue(self.graph.is_member([ADMINS], ADMINS))
+        self.assertFalse(self.graph.is_member([STAFF], ADMINS))
+        self.assertFalse(self.graph.is_member([], STAFF))
+
+    def test_descendants(self):
+        """Should list every group nested in a group!"""
+        self.assertEqual(self.graph.descendants(STAFF), {g.lower() for g in (STAFF, IT, ADMINS, LOOP_A, LOOP_B)})
+
+    def test_cycles_end(self):
+        """Should walk nesting cycles once and report them!"""
+        self.assertTrue(self.graph.is_member([LOOP_B], STAFF))
+        self.assertEqual(self.graph.cycles(), [LOOP_A, LOOP_B])
+
+    def test_ttl(self):
+        """Should expire after its ttl!"""
+        self.assertFalse(self.graph.expired)
+        self.assertTrue(GroupGraph([], ttl=0).expired)
+
+
+class EffectiveMembersTest(unittest.TestCase):
+    """Effective members from the group graph unittest class."""
+
+    def test_searches_do_not_grow_with_groups(self):
+        """Should read members of every nested group with one search!"""
+        with mock.patch('ldap.initialize'):
+            ad = MsAD('ldaps://dc1', 'DC=RTS,DC=LOCAL', 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        groups = [(ADMINS, [IT]), (IT, [STAFF]), (STAFF, []), (LOOP_A, [LOOP_B, STAFF]), (LOOP_B, [LOOP_A])]
+        users = [(f'CN=user{i},{STAFF}', {'distinguishedName': [f'CN=user{i},{STAFF}'.encode()]}) for i in range(3)]
+        filters = []
+        def paged_search(base, s_filter, attr, *args, **kwargs):
+            filters.append(s_filter)
+            if s_filter == '(objectClass=Group)':
+                return LdapSuccessResult(iter(
+                    (dn, {'distinguishedName': [dn.encode()], 'memberOf': [p.encode() for p in parents]}) for dn, parents in groups
+                ))
+            return LdapSuccessResult(iter(users + users[:1]))
+
+        with mock.patch.object(ad, '_paged_search', side_effect=paged_search), \
+                mock.patch.object(ad, '_search') as search:
+            members = ad.effective_members(STAFF, 'graph').unwrap()
+
+        self.assertEqual(members, [dn for dn, _ in users])
+        self.assertEqual(len(filters), 2)
+        self.assertEqual(filters[1].count('(memberOf='), 5)
+        search.assert_not_called()
+
+
+class GraphErrorTest(unittest.TestCase):
+    """Group graph search failure unittest class."""
+
+    def test_failed_group_search(self):
+        """Should return an error result when groups cannot be read!"""
+        with mock.patch('ldap.initialize'):
+            ad = MsAD('ldaps://dc1', 'DC=RTS,DC=LOCAL', 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        user = (f'CN=Pingu,{STAFF}', {'distinguishedName': [b'CN=Pingu'], 'memberOf': [IT.encode()]})
+        def paged_search(base, s_filter, *args, **kwargs):
+            if 'Group' in s_filter:
+                raise LdapErrorResult('size limit exceeded')
+            return LdapSuccessResult(iter([user]))
+
+        with mock.patch.object(ad, '_paged_search', side_effect=paged_search):
+            self.assertIsInstance(ad.is_member('(sAMAccountName=pingu)', STAFF, 'graph'), ADErrorResult)
+            self.assertIsInstance(ad.effective_members(STAFF, 'graph'), ADErrorResult)
+
+
+if __name__ == '__main__':
+    unittest.main()
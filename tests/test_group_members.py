@@ -0,0 +1,85 @@
+import re
+import unittest
+from unittest import mock
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+from padc.msad import MsAD
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+GROUP_DN = f'CN=staff,CN=Users,{BASE_DN}'
+
+
+def user_dn(name: str) -> str:
+    return f'CN={name},CN=Users,{BASE_DN}'
+
+
+class GroupMembersTest(unittest.TestCase):
+    """Ranged member retrieval and bulk membership changes unittest class."""
+
+    def setUp(self):
+        with mock.patch('ldap.initialize'):
+            self.ad = MsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret')
+        self.ad.state = State.Signed
+
+    def ranged_search(self, ranges):
+        def search(base, s_filter, attr, scope):
+            key, values = ranges[attr[0]]
+            return LdapSuccessResult([(base, {key: values})])
+        return search
+
+    def test_member_ranges(self):
+        """Should read members range after range until the * terminated one!"""
+        members = [user_dn(f'user{i}').encode() for i in range(1502)]
+        ranges = {
+            'member;range=0-*': ('member;range=0-1499', members[:1500]),
+            'member;range=1500-*': ('member;range=1500-*', members[1500:]),
+        }
+        with mock.patch.object(self.ad, '_search', side_effect=self.ranged_search(ranges)) as searched:
+            self.assertEqual(self.ad.group_members(GROUP_DN).unwrap(), [m.decode() for m in members])
+        self.assertEqual([c.args[2] for c in searched.call_args_list], [['member;range=0-*'], ['member;range=1500-*']])
+
+    def test_small_group(self):
+        """Should read members returned at once without a range!"""
+        with mock.patch.object(self.ad, '_search', return_value=LdapSuccessResult([(GROUP_DN, {'member': [b'CN=a']})])):
+            self.assertEqual(self.ad.group_members(GROUP_DN).unwrap(), ['CN=a'])
+
+    def test_update_writes_chunked_changes(self):
+        """Should add and remove only the real changes, chunk_size values per modify!"""
+        ranges = {'member;range=0-*': ('member;range=0-*', [user_dn('user0').encode(), user_dn('user1').encode()])}
+        def paged_search(base, s_filter, attr, *args, **kwargs):
+            names = [n for n in re.findall(r'sAMAccountName=([^)]+)', s_filter) if n != 'ghost']
+            return LdapSuccessResult(iter(
+                (user_dn(n), {'sAMAccountName': [n.encode()], 'distinguishedName': [user_dn(n).encode()]}) for n in names
+            ))
+
+        with mock.patch.object(self.ad, '_search', side_effect=self.ranged_search(ranges)), \
+                mock.patch.object(self.ad, '_paged_search', side_effect=paged_search), \
+                mock.patch.object(self.ad, '_modify_add', return_value=LdapSuccessResult('ok')) as add, \
+                mock.patch.object(self.ad, '_modify_delete', return_value=LdapSuccessResult('ok')) as delete:
+            result = self.ad.update_group_members(
+                GROUP_DN, add=['user1', 'user2', 'User3', 'user4', 'ghost'], remove=['user0'], chunk_size=2
+            ).unwrap()
+
+        self.assertEqual([c.args for c in add.call_args_list], [
+            (GROUP_DN, {'member': [user_dn('user2').encode(), user_dn('user3').encode()]}),
+            (GROUP_DN, {'member': [user_dn('user4').encode()]}),
+        ])
+        delete.assert_called_once_with(GROUP_DN, {'member': [user_dn('user0').encode()]})
+        self.assertEqual(result, f'update_group_members::{GROUP_DN} added: 3, removed: 1, not found: ghost')
+
+    def test_exact_membership(self):
+        """Should remove every member missing from the desired membership!"""
+        ranges = {'member;range=0-*': ('member;range=0-*', [user_dn('user0').encode(), user_dn('user1').encode()])}
+        found = [(user_dn('user1'), {'sAMAccountName': [b'user1'], 'distinguishedName': [user_dn('user1').encode()]})]
+        with mock.patch.object(self.ad, '_search', side_effect=self.ranged_search(ranges)), \
+                mock.patch.object(self.ad, '_paged_search', return_value=LdapSuccessResult(iter(found))), \
+                mock.patch.object(self.ad, '_modify_add') as add, \
+                mock.patch.object(self.ad, '_modify_delete', return_value=LdapSuccessResult('ok')) as delete:
+            self.ad.update_group_members(GROUP_DN, add=['user1'], exact=True).unwrap()
+
+        add.assert_not_called()
+        delete.assert_called_once_with(GROUP_DN, {'member': [user_dn('user0').encode()]})
+
+
+if __name__ == '__main__':
+    unittest.main()
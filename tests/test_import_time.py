@@ -0,0 +1,45 @@
+import sys
+import subprocess
+import unittest
+
+
+def import_times(module: str):
+    """Cumulative import time in microseconds of every module loaded by importing module."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times, proc.stdout
+
+
+class ImportTimeTest(unittest.TestCase):
+    """Cold start regression unittest class."""
+
+    budget_us = 400_000
+    deferred = ('ldap', 'ldif', 'dotenv', 'logging.config')
+
+    def setUp(self):
+        self.times, self.stdout = import_times('padc.cli')
+
+    def test_cli_import_defers_heavy_modules(self):
+        """Should not load python-ldap, dotenv or logging settings before a command runs!"""
+        for module in self.deferred:
+            self.assertNotIn(module, self.times)
+
+    def test_cli_import_is_silent(self):
+        """Should not print anything on import!"""
+        self.assertEqual(self.stdout, '')
+
+    def test_cli_import_budget(self):
+        """Should import the cli within the cold start budget!"""
+        self.assertLess(self.times['padc.cli'], self.budget_us)
+
+
+if __name__ == '__main__':
+    unittest.main()
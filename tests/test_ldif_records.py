@@ -0,0 +1,128 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import ldap
+from padc.client import OpKind
+from padc.client.state import State
+from padc.msad import MsAD
+from padc.msad.ad_error_handler import ADErrorResult, ADSuccessResult
+from padc.cli import users_utils
+from padc.client.ldif_records import LDIFChangeRecordList
+
+
+LDIF = """version: 1
+dn: cn=Pingu pythonico,cn=Users,dc=rts,dc=local
+cn: Pingu pythonico
+objectClass: top
+objectClass: user
+description:: cGluZ3Ugw6kgbGVnYWw=
+sAMAccountName: Pingu
+
+dn: cn=Pingu pythonico,cn=Users,dc=rts,dc=local
+changetype: modify
+replace: displayName
+displayName: Pingu
+  pythonico
+-
+delete: description
+-
+
+dn: cn=Old pingu,cn=Users,dc=rts,dc=local
+changetype: delete
+"""
+
+
+class LDIFChangeRecordListTest(unittest.TestCase):
+    """LDIF change records parser unittest class."""
+
+    def setUp(self):
+        self.parser = LDIFChangeRecordList(io.StringIO(LDIF))
+        self.parser.parse()
+        self.records = self.parser.all_records
+
+    def test_parse_all_records(self):
+        """Should parse every record in order!"""
+        self.assertEqual([r.kind for r in self.records], [OpKind.Add, OpKind.Modify, OpKind.Delete])
+
+    def test_parse_add_record(self):
+        """Should decode base64 values of content records!"""
+        entry = self.records[0].payload
+        self.assertEqual(entry['objectClass'], [b'top', b'user'])
+        self.assertEqual(entry['description'], ['pingu é legal'.encode()])
+
+    def test_parse_modify_record(self):
+        """Should unfold lines and keep modify operations in order!"""
+        self.assertEqual(self.records[1].payload, [
+            (ldap.MOD_REPLACE, 'displayName', [b'Pingu pythonico']),
+            (ldap.MOD_DELETE, 'description', None),
+        ])
+
+    def test_records_are_yielded_while_reading(self):
+        """Should yield a record before the rest of the input was read!"""
+        source = io.StringIO(LDIF)
+        records = LDIFChangeRecordList(source).records()
+        first = next(records)
+
+        self.assertEqual(first.kind, OpKind.Add)
+        self.assertLess(source.tell(), len(LDIF))
+        self.assertEqual([r.kind for r in records], [OpKind.Modify, OpKind.Delete])
+
+    def test_parse_delete_record(self):
+        """Should parse delete records without payload!"""
+        self.assertEqual(self.records[2].dn, 'cn=Old pingu,cn=Users,dc=rts,dc=local')
+        self.assertIsNone(self.records[2].payload)
+
+
+class FakeConnection:
+    """Connection double answering pipelined writes in order."""
+
+    def __init__(self):
+        self.sent = []
+        self.answered = 0
+
+    def set_option(self, option, value):
+        pass
+
+    def add_ext(self, dn, modlist):
+        self.sent.append(dn)
+        return len(self.sent)
+
+    def result3(self, msgid, all=1, timeout=-1):
+        self.answered += 1
+        return 105, [], self.answered, []
+
+
+class ImportLdifTest(unittest.TestCase):
+    """Streamed ldif import unittest class."""
+
+    def test_malformed_record_stops_import(self):
+        """Should report records written before a malformed one and the line it is at!"""
+        records = ''.join(f'dn: cn=user{i},cn=Users,dc=rts,dc=local\ncn: user{i}\n\n' for i in range(3))
+        with tempfile.NamedTemporaryFile('w', suffix='.ldif', delete=False) as ldif:
+            ldif.write(records + 'cn: no dn here\n')
+        self.addCleanup(os.unlink, ldif.name)
+
+        connection = FakeConnection()
+        with mock.patch('ldap.initialize', return_value=connection):
+            ad = MsAD('ldaps://dc1', 'DC=RTS,DC=LOCAL', 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        report = ad.import_ldif(ldif.name, 2).unwrap()
+
+        self.assertEqual((report.total, connection.answered, len(report.failed)), (3, 3, 0))
+        self.assertIsInstance(report.error, ValueError)
+        self.assertIn('line 10', str(report))
+
+    def test_failed_import_is_reported(self):
+        """Should answer False instead of raising when the import itself fails!"""
+        ad = mock.Mock()
+        ad.import_ldif.return_value = ADErrorResult('ldif not found', 'import_ldif')
+        ad.close.return_value = ADSuccessResult('close::ok')
+        with mock.patch.object(users_utils, 'new_msad', return_value=ad):
+            self.assertFalse(users_utils.import_ldif('missing.ldif', {'CA_PATH': ''}))
+        ad.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import io
+import json
+import unittest
+from unittest import mock
+from padc.client import ConnectionPool
+from padc.client.error_handler import LdapSuccessResult
+from padc.cli.batch import run_batch
+from padc.msad.ad_error_handler import ADSuccessResult
+from padc.client.state import State
+from padc.msad import MsAD, AccountLoader, account_filter
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+GROUP_DN = f'CN=testgroup,CN=Users,{BASE_DN}'
+
+
+def user_dn(name: str) -> str:
+    return f'CN={name},CN=Users,{BASE_DN}'
+
+
+class AccountLoaderTest(unittest.TestCase):
+    """Batched account loader unittest class."""
+
+    def setUp(self):
+        self.chunks = []
+
+    def resolve(self, names):
+        self.chunks.append(names)
+        return {n: user_dn(n) for n in names if n != 'ghost'}
+
+    def test_chunked_resolution(self):
+        """Should resolve names with one call per chunk and only once!"""
+        loader = AccountLoader(chunk_size=200)
+        names = [f'user{i}' for i in range(450)]
+        self.assertEqual(loader.load_many(names + ['USER0'], self.resolve), 450)
+        self.assertEqual([len(c) for c in self.chunks], [200, 200, 50])
+
+        loader.load_many(names[:10], self.resolve)
+        self.assertEqual(loader.searches, 3)
+        self.assertEqual(loader.get(account_filter('User7')), user_dn('user7'))
+
+    def test_missing_names_are_searched_again(self):
+        """Should not remember names not found, they may be created meanwhile!"""
+        loader = AccountLoader()
+        loader.load_many(['ghost', 'pingu'], self.resolve)
+        self.assertIsNone(loader.get(account_filter('ghost')))
+        loader.load_many(['ghost', 'pingu'], self.resolve)
+        self.assertEqual(self.chunks[-1], ['ghost'])
+
+    def test_forget_dn(self):
+        """Should forget a deleted account!"""
+        loader = AccountLoader()
+        loader.load_many(['pingu'], self.resolve)
+        loader.forget_dn(user_dn('pingu').upper())
+        self.assertIsNone(loader.get(account_filter('pingu')))
+
+    def test_filter_escaping(self):
+        """Should escape filter special characters of names!"""
+        self.assertEqual(account_filter('a*)(cn=*'), r'(&(sAMAccountType=805306368)(sAMAccountName=a\2a\29\28cn=\2a))')
+
+
+class PreloadTest(unittest.TestCase):
+    """Lookups answered by the loader unittest class."""
+
+    def setUp(self):
+        with mock.patch('ldap.initialize'):
+            self.ad = MsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret')
+        self.ad.state = State.Signed
+        self.ad.loader = AccountLoader()
+        self.filters = []
+
+    def paged_search(self, base, s_filter, attr, scope=None, page_size=500, controls=None):
+        self.filters.append(s_filter)
+        rows = [(user_dn(n), {'sAMAccountName': [n.encode()], 'distinguishedName': [user_dn(n).encode()]})
+                for n in ('pingu', 'pinga')]
+        return LdapSuccessResult(iter(rows))
+
+    def test_lookups_skip_search(self):
+        """Should merge lookups in one OR search and answer group changes from it!"""
+        with mock.patch.object(self.ad, '_paged_search', side_effect=self.paged_search), \
+                mock.patch.object(self.ad, '_modify_add', return_value=LdapSuccessResult('ok')) as modify:
+            self.assertEqual(self.ad.preload_accounts(['pingu', 'Pinga']).unwrap(), 2)
+            self.assertEqual(
+                self.filters, ['(&(sAMAccountType=805306368)(|(sAMAccountName=pingu)(sAMAccountName=pinga)))']
+            )
+            self.ad.add_account_to_group(account_filter('Pingu'), GROUP_DN).unwrap()
+            self.ad.add_account_to_group(account_filter('pinga'), GROUP_DN).unwrap()
+
+        self.assertEqual(len(self.filters), 1)
+        modify.assert_called_with(GROUP_DN, {'member': [user_dn('pinga').encode()]})
+
+
+class FakeSession:
+    """Bound session double answering group changes from the names its loader preloaded."""
+
+    def __init__(self, preloads, fail_preload=False):
+        self.state = None
+        self.loader = None
+        self.preloads = preloads
+        self.fail_preload = fail_preload
+
+    def preload_accounts(self, names, base=None):
+        if self.fail_preload:
+            raise RuntimeError('preload search failed')
+        self.preloads.append(len(names))
+        return ADSuccessResult(self.loader.load_many(names, lambda chunk: {n: user_dn(n) for n in chunk}))
+
+    def add_account_to_group(self, s_filter, group_dn):
+        return ADSuccessResult(f'add_account_to_group:: {self.loader.get(s_filter.s_filter) or "searched"}')
+
+
+class RunBatchTest(unittest.TestCase):
+    """Batch with a loader unittest class."""
+
+    def run_batch(self, fail_preload=False):
+        preloads, sessions = [], []
+        def bound():
+            sessions.append(FakeSession(preloads, fail_preload))
+            return sessions[-1]
+        pool = ConnectionPool(bound, size=2)
+        operations = [{'op': 'add-to-group', 'name': f'user{i}', 'group': GROUP_DN} for i in range(450)]
+        output = io.StringIO()
+        counts = run_batch(operations, pool, output, {'BASE_DN': BASE_DN}, workers=2, loader=AccountLoader(chunk_size=200))
+        # pooled sessions outlive the batch, they must not keep its loader
+        self.assertEqual([session.loader for session in sessions], [None] * len(sessions))
+        return counts, preloads, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_chunks_are_preloaded(self):
+        """Should preload every chunk while workers hold every session!"""
+        counts, preloads, results = self.run_batch()
+        self.assertEqual(counts, {'total': 450, 'failed': 0})
+        self.assertEqual(preloads, [200, 200, 50])
+        self.assertEqual([r['index'] for r in results], list(range(450)))
+        self.assertIn(user_dn('user449'), results[-1]['message'])
+
+    def test_failed_preload(self):
+        """Should run operations without the loader when a preload fails!"""
+        counts, preloads, results = self.run_batch(fail_preload=True)
+        self.assertEqual(counts, {'total': 450, 'failed': 0})
+        self.assertIn('searched', results[0]['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
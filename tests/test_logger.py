@@ -0,0 +1,62 @@
+import json
+import logging
+import unittest
+from padc.logger import setup_log, match_level, JsonFormatter
+
+
+class Counted:
+    """Log argument counting how many times it was formatted."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'pingu'
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LoggerTest(unittest.TestCase):
+    """Logging unittest class."""
+
+    def setUp(self):
+        self.records = Records()
+        self.logger = logging.getLogger('padc-test')
+        self.logger.propagate = False
+        self.logger.addHandler(self.records)
+        self.addCleanup(self.logger.removeHandler, self.records)
+        previous, setup_log._logger = setup_log._logger, self.logger
+        self.addCleanup(setattr, setup_log, '_logger', previous)
+
+    def test_disabled_level_is_not_formatted(self):
+        """Should not format messages of disabled levels!"""
+        self.logger.setLevel(logging.ERROR)
+        argument = Counted()
+        match_level('create_user::%s', logging.INFO, argument)
+
+        self.assertEqual(argument.formatted, 0)
+        self.assertEqual(self.records.records, [])
+
+        match_level('create_user::%s', logging.ERROR, argument)
+        self.assertEqual(self.records.records[0].getMessage(), 'create_user::pingu')
+
+    def test_json_format(self):
+        """Should write one json object per record!"""
+        self.logger.setLevel(logging.DEBUG)
+        match_level('import_ldif::%s', logging.WARNING, 'pingu')
+        entry = json.loads(JsonFormatter().format(self.records.records[0]))
+
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['message'], 'import_ldif::pingu')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from padc.client import Metrics, METRICS, instrument, LdapErrorResult, LdapSuccessResult
+from padc.msad import ADErrorResult
+
+
+class FakeClient:
+    uri = 'ldaps://dc1.rts.local'
+
+
+class MetricsTest(unittest.TestCase):
+    """Operation metrics unittest class."""
+
+    def setUp(self):
+        METRICS.reset()
+        METRICS.enable()
+        self.client = FakeClient()
+
+    def tearDown(self):
+        METRICS.disable()
+        METRICS.reset()
+
+    def test_counts_success_and_error_codes(self):
+        """Should label results by operation, server and result code!"""
+        ok = instrument('ldap', '_bind', lambda self: LdapSuccessResult('bind'))
+        timeout = instrument('ad', 'connect', lambda self: ADErrorResult(LdapErrorResult(TimeoutError()), 'connect'))
+        missing = instrument('ad', 'modify_account_control', lambda self: ADErrorResult(AssertionError(), 'modify'))
+
+        ok(self.client)
+        ok(self.client)
+        timeout(self.client)
+        missing(self.client)
+
+        self.assertEqual(METRICS.count('ldap', '_bind', 'ldaps://dc1.rts.local', 'success'), 2)
+        self.assertEqual(METRICS.count('ad', 'connect', code='TimeoutError'), 1)
+        self.assertEqual(METRICS.count('ad', 'modify_account_control', code='not_found'), 1)
+
+    def test_records_raised_exceptions(self):
+        """Should record operations raising in debug mode!"""
+        def boom(self):
+            raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            instrument('ldap', '_search', boom)(self.client)
+        self.assertEqual(METRICS.count('ldap', '_search', code='ConnectionError'), 1)
+
+    def test_disabled_records_nothing(self):
+        """Should not record anything when disabled!"""
+        METRICS.disable()
+        instrument('ldap', '_bind', lambda self: LdapSuccessResult('bind'))(self.client)
+        self.assertEqual(METRICS.count('ldap', '_bind'), 0)
+
+    def test_render_prometheus_text(self):
+        """Should export counters and cumulative histogram buckets!"""
+        metrics = Metrics(enabled=True)
+        metrics.observe('ad', 'connect', 'ldaps://dc1', 'success', 0.003)
+        metrics.observe('ad', 'connect', 'ldaps://dc1', 'SERVER_DOWN', 20.0)
+        text = metrics.render()
+
+        self.assertIn('padc_operations_total{layer="ad",op="connect",uri="ldaps://dc1",code="SERVER_DOWN"} 1', text)
+        self.assertIn('padc_operation_duration_seconds_bucket{layer="ad",op="connect",uri="ldaps://dc1",le="0.005"} 1', text)
+        self.assertIn('padc_operation_duration_seconds_bucket{layer="ad",op="connect",uri="ldaps://dc1",le="+Inf"} 2', text)
+        self.assertIn('padc_operation_duration_seconds_count{layer="ad",op="connect",uri="ldaps://dc1"} 2', text)
+
+    def test_write_textfile(self):
+        """Should write the textfile collector file!"""
+        metrics = Metrics(enabled=True)
+        metrics.observe('ldap', '_bind', 'ldaps://dc1', 'success', 0.01)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'padc.prom')
+            metrics.write_textfile(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), metrics.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
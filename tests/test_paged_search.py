@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+from ldap.controls import SimplePagedResultsControl
+from padc.client import Client, ShowDeletedControl
+from padc.client.state import State
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+
+
+class FakeConnection:
+    """Connection double answering a paged search with pages of rows entries."""
+
+    def __init__(self, pages: int, rows: int = 2):
+        self.pages = pages
+        self.rows = rows
+        self.requests = []
+
+    def set_option(self, option, value):
+        pass
+
+    def search_ext(self, base, scope, s_filter, attr, attrsonly, serverctrls):
+        paged = serverctrls[0]
+        # controls are mutated between pages, remember what was sent
+        self.requests.append((paged.size, paged.cookie, [c.controlType for c in serverctrls]))
+        return len(self.requests)
+
+    def result3(self, msgid):
+        page = len([r for r in self.requests if r[0]])
+        response = SimplePagedResultsControl(False, size=0, cookie=f'page{page}'.encode() if page < self.pages else b'')
+        data = [(f'CN=user{page}-{i},CN=Users,{BASE_DN}', {'cn': [b'x']}) for i in range(self.rows)]
+        return 101, data, msgid, [response]
+
+
+class PagedSearchTest(unittest.TestCase):
+    """Simple Paged Results search unittest class."""
+
+    def client(self, connection: FakeConnection) -> Client:
+        with mock.patch('ldap.initialize', return_value=connection):
+            client = Client('ldaps://dc1')
+        client.state = State.Signed
+        return client
+
+    def test_request_controls_of_every_page(self):
+        """Should send the paged results and caller controls only, on every page!"""
+        connection = FakeConnection(pages=2)
+        entries = list(self.client(connection)._paged_search(
+            BASE_DN, '(isDeleted=TRUE)', None, page_size=2, controls=[ShowDeletedControl()]
+        ).unwrap())
+
+        self.assertEqual(len(entries), 4)
+        expected = [SimplePagedResultsControl.controlType, ShowDeletedControl.controlType]
+        self.assertEqual([r[2] for r in connection.requests], [expected, expected])
+
+    def test_cookie_of_previous_page(self):
+        """Should send back the cookie of every page and stop on the empty one!"""
+        connection = FakeConnection(pages=3)
+        entries = list(self.client(connection)._paged_search(BASE_DN, '(objectClass=User)', None, page_size=2).unwrap())
+
+        self.assertEqual([dn for dn, _ in entries][::2], [f'CN=user{p}-0,CN=Users,{BASE_DN}' for p in (1, 2, 3)])
+        self.assertEqual([r[:2] for r in connection.requests], [(2, ''), (2, b'page1'), (2, b'page2')])
+
+    def test_early_close_abandons_search(self):
+        """Should release the server side cursor with a zero sized page when the caller stops early!"""
+        connection = FakeConnection(pages=3)
+        entries = self.client(connection)._paged_search(BASE_DN, '(objectClass=User)', None, page_size=2).unwrap()
+        for _ in range(3):
+            next(entries)
+        entries.close()
+
+        self.assertEqual([r[:2] for r in connection.requests], [(2, ''), (2, b'page1'), (0, b'page2')])
+
+
+if __name__ == '__main__':
+    unittest.main()
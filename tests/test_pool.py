@@ -0,0 +1,102 @@
+import threading
+import unittest
+from padc.client import ConnectionPool
+from padc.client.error_handler import LdapErrorResult, LdapSuccessResult
+from padc.client.state import State
+
+
+class FakeClient:
+    """Bound connection double that counts pings and closes."""
+
+    def __init__(self, alive: bool = True):
+        self.state = State.Signed
+        self.alive = alive
+        self.pings = 0
+
+    def _ping(self):
+        self.pings += 1
+        return LdapSuccessResult('u:pingu') if self.alive else LdapErrorResult('server down')
+
+    def _close(self):
+        self.state = State.Disconnected
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """Connection pool unittest class."""
+
+    def setUp(self):
+        self.created = []
+        def factory():
+            client = FakeClient()
+            self.created.append(client)
+            return client
+        self.pool = ConnectionPool(factory, size=2, check_after=0)
+
+    def test_reuse_connection(self):
+        """Should give back the same bound connection!"""
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(first.pings, 1)
+
+    def test_replace_stale_connection(self):
+        """Should discard connections that fail the health check!"""
+        with self.pool.connection() as first:
+            first.alive = False
+        with self.pool.connection() as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertEqual(first.state, State.Disconnected)
+
+    def test_checkout_timeout(self):
+        """Should not hand out more connections than the pool size!"""
+        self.pool.checkout()
+        self.pool.checkout()
+        self.assertRaises(TimeoutError, self.pool.checkout, 0.01)
+
+    def test_checkout_waits_for_checkin(self):
+        """Should block a checkout without timeout until a connection is given back!"""
+        first, second = self.pool.checkout(), self.pool.checkout()
+        taken = []
+        waiting = threading.Thread(target=lambda: taken.append(self.pool.checkout()))
+        waiting.start()
+        waiting.join(0.05)
+        self.assertTrue(waiting.is_alive())
+        self.pool.checkin(first)
+        waiting.join(1)
+        self.assertEqual(taken, [first])
+        self.pool.checkin(second)
+
+    def test_concurrent_checkout(self):
+        """Should never create more connections than the pool size!"""
+        def work():
+            for _ in range(50):
+                with self.pool.connection():
+                    pass
+        errors = []
+        def guarded():
+            try:
+                work()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=guarded) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.created), 2)
+
+    def test_close(self):
+        """Should unbind idle connections when closed!"""
+        with self.pool.connection() as client:
+            pass
+        self.pool.close()
+        self.assertEqual(client.state, State.Disconnected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import io
+import unittest
+import ldap
+from padc.client import OpKind
+from padc.msad import DesiredUser, plan_changes, read_desired_state
+
+BASE_DN = 'CN=Users,DC=RTS,DC=LOCAL'
+GROUP = 'CN=testgroup,CN=Users,DC=RTS,DC=LOCAL'
+OTHER = 'CN=othergroup,CN=Users,DC=RTS,DC=LOCAL'
+
+
+def new_user(user):
+    return f'CN={user.name},{BASE_DN}', {'cn': [user.name.encode()], 'unicodePwd': [b'secret']}
+
+
+class ReconcileTest(unittest.TestCase):
+    """Desired state reconcile unittest class."""
+
+    def setUp(self):
+        self.current = {
+            'pingu': {
+                'distinguishedName': [f'CN=Pingu,{BASE_DN}'.encode()],
+                'displayName': [b'Pingu'],
+                'userAccountControl': [b'512'],
+                'memberOf': [GROUP.encode()],
+            },
+            'pinga': {
+                'distinguishedName': [f'CN=Pinga,{BASE_DN}'.encode()],
+                'memberOf': [GROUP.encode(), OTHER.encode()],
+            },
+        }
+
+    def test_matching_state_writes_nothing(self):
+        """Should plan no write when live state already matches!"""
+        desired = [DesiredUser('Pingu', {'displayName': 'Pingu', 'userAccountControl': 512}, [GROUP])]
+        plan = plan_changes(desired, self.current, new_user)
+
+        self.assertTrue(plan.empty)
+        self.assertEqual(plan.unchanged, 1)
+
+    def test_only_changed_attributes_are_written(self):
+        """Should modify only attributes that differ!"""
+        desired = [DesiredUser('Pingu', {'displayName': 'Pingu pythonico', 'userAccountControl': 512})]
+        plan = plan_changes(desired, self.current, new_user)
+
+        self.assertEqual(len(plan.users), 1)
+        self.assertEqual({attr for _, attr, _ in plan.users[0].payload}, {'displayName'})
+
+    def test_add_and_delete_accounts(self):
+        """Should create missing accounts and delete absent ones!"""
+        desired = [
+            DesiredUser('Pingo', {'displayName': 'Pingo'}, password='Secret@123'),
+            DesiredUser('Pinga', absent=True),
+            DesiredUser('Pinge'),
+        ]
+        plan = plan_changes(desired, self.current, new_user)
+
+        self.assertEqual([op.kind for op in plan.users], [OpKind.Add, OpKind.Delete])
+        self.assertEqual(plan.users[0].payload['displayName'], [b'Pingo'])
+        self.assertEqual(len(plan.errors), 1)
+        self.assertNotIn('Secret', str(list(plan.describe())))
+
+    def test_managed_group_memberships(self):
+        """Should add and remove memberships of listed groups only!"""
+        desired = [
+            DesiredUser('Pingu', groups=[OTHER]),
+            DesiredUser('Pinga', groups=[OTHER]),
+        ]
+        plan = plan_changes(desired, self.current, new_user)
+
+        writes = {(op.dn, mod): values for op in plan.groups for mod, _, values in op.payload}
+        self.assertEqual(writes, {
+            (OTHER, ldap.MOD_ADD): [f'CN=Pingu,{BASE_DN}'.encode()],
+        })
+
+        desired.append(DesiredUser('Pingo', password='Secret@123', groups=[GROUP]))
+        plan = plan_changes(desired, self.current, new_user)
+        writes = {(op.dn, mod): values for op in plan.groups for mod, _, values in op.payload}
+        self.assertEqual(writes[(GROUP, ldap.MOD_DELETE)], [f'CN=Pinga,{BASE_DN}'.encode(), f'CN=Pingu,{BASE_DN}'.encode()])
+        self.assertEqual(writes[(GROUP, ldap.MOD_ADD)], [f'CN=Pingo,{BASE_DN}'.encode()])
+
+    def test_read_desired_state(self):
+        """Should read jsonl and json array desired states!"""
+        jsonl = io.StringIO('{"name": "Pingu", "groups": ["%s"]}\n\n# comment\n{"name": "Pinga", "absent": true}\n' % GROUP)
+        array = io.StringIO(' [{"name": "Pingu", "attributes": {"displayName": ["Pingu"]}}]')
+
+        users = list(read_desired_state(jsonl))
+        self.assertEqual([u.name for u in users], ['Pingu', 'Pinga'])
+        self.assertTrue(users[1].absent)
+        self.assertEqual(list(read_desired_state(array))[0].attributes, {'displayName': [b'Pingu']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+import ldap
+from padc.client import Client, Endpoints, LdapErrorResult
+from padc.client.error_handler import LdapSuccessResult
+from padc.client.state import State
+
+
+class FakeConnection:
+    """LDAP connection double answering while its server is up."""
+
+    def __init__(self, uri: str, servers: dict):
+        self.uri = uri
+        self.servers = servers
+        self.calls = []
+
+    def __call(self, name, result=None):
+        if not self.servers[self.uri]:
+            raise ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})
+        self.calls.append(name)
+        return result
+
+    def set_option(self, option, value):
+        pass
+
+    def start_tls_s(self):
+        return self.__call('start_tls')
+
+    def simple_bind_s(self, who, cred):
+        return self.__call('bind')
+
+    def search_s(self, base, scope, s_filter, attr, attrsonly):
+        return self.__call('search', [(f'CN=Pingu,{base}', {'cn': [b'Pingu']})])
+
+    def modify_s(self, dn, modlist):
+        return self.__call('modify')
+
+    def unbind_ext(self):
+        pass
+
+    def unbind_s(self):
+        pass
+
+
+class ReconnectTest(unittest.TestCase):
+    """Client reconnect and failover unittest class."""
+
+    def setUp(self):
+        self.servers = {'ldaps://dc1': True, 'ldaps://dc2': True}
+        self.connections = []
+        def initialize(uri, log_level, stream):
+            self.connections.append(FakeConnection(uri, self.servers))
+            return self.connections[-1]
+        patcher = mock.patch('ldap.initialize', side_effect=initialize)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.endpoints = Endpoints(self.servers, cooldown=60)
+        self.client = self.bound()
+
+    def bound(self) -> Client:
+        client = Client(' '.join(self.servers), endpoints=self.endpoints)
+        client.retry_backoff = 0
+        client._start_tls()
+        client._bind('administrator@rts.local', 'secret')
+        return client
+
+    def test_retry_idempotent_operation(self):
+        """Should reconnect to another server, redo tls and bind and retry a search!"""
+        self.servers['ldaps://dc1'] = False
+        result = self.client._search('DC=RTS,DC=LOCAL', '(cn=Pingu)', None)
+
+        self.assertIsInstance(result, LdapSuccessResult)
+        self.assertEqual(self.client.uri, 'ldaps://dc2')
+        self.assertEqual(self.client.state, State.Signed)
+        self.assertEqual(self.connections[-1].calls, ['start_tls', 'bind', 'search'])
+
+    def test_write_is_not_retried(self):
+        """Should fail a write losing its server and reconnect on the next operation!"""
+        self.servers['ldaps://dc1'] = False
+        result = self.client._modify_add('CN=Pingu,DC=RTS,DC=LOCAL', {'description': [b'pingu']})
+
+        self.assertIsInstance(result, LdapErrorResult)
+        self.assertTrue(self.client.lost)
+        self.assertIsInstance(self.client._modify_add('CN=Pingu,DC=RTS,DC=LOCAL', {}), LdapSuccessResult)
+        self.assertEqual(self.connections[-1].calls, ['start_tls', 'bind', 'modify'])
+
+    def test_failing_server_is_skipped(self):
+        """Should open new connections on servers outside their cooldown!"""
+        self.servers['ldaps://dc1'] = False
+        self.client._search('DC=RTS,DC=LOCAL', '(cn=Pingu)', None)
+        self.servers['ldaps://dc1'] = True
+
+        self.assertFalse(self.endpoints.up('ldaps://dc1'))
+        self.assertEqual(self.bound().uri, 'ldaps://dc2')
+
+    def test_every_server_down(self):
+        """Should give up after retries when no server answers!"""
+        self.servers.update({uri: False for uri in self.servers})
+        result = self.client._search('DC=RTS,DC=LOCAL', '(cn=Pingu)', None)
+
+        self.assertIsInstance(result, LdapErrorResult)
+        self.assertEqual(self.client.state, State.Disconnected)
+
+
+if __name__ == '__main__':
+    unittest.main()
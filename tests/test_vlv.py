@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+from ldap.controls.sss import SSSRequestControl
+from ldap.controls.vlv import VLVRequestControl, VLVResponseControl
+from padc.client.state import State
+from padc.msad import MsAD, ADErrorResult
+
+BASE_DN = 'DC=RTS,DC=LOCAL'
+
+
+class FakeConnection:
+    """Connection double answering a window of a sorted result with a VLV response."""
+
+    def __init__(self, total: int, target: int, rows: int):
+        self.total = total
+        self.target = target
+        self.rows = rows
+        self.controls = []
+
+    def set_option(self, option, value):
+        pass
+
+    def search_ext(self, base, scope, s_filter, attr, attrsonly, serverctrls):
+        self.controls = serverctrls
+        return 1
+
+    def result3(self, msgid, resp_ctrl_classes=None):
+        response = VLVResponseControl()
+        response.target_position, response.content_count, response.context_id = self.target, self.total, None
+        data = [(f'CN=user{i},CN=Users,{BASE_DN}', {'displayName': [f'user{i}'.encode()]}) for i in range(self.rows)]
+        return 101, data + [(None, ['ldaps://rts.local/CN=Configuration'])], msgid, [response]
+
+
+class VLVTest(unittest.TestCase):
+    """Sorted windowed listing unittest class."""
+
+    def ad(self, connection: FakeConnection) -> MsAD:
+        with mock.patch('ldap.initialize', return_value=connection):
+            ad = MsAD('ldaps://dc1', BASE_DN, 'administrator@rts.local', 'secret')
+        ad.state = State.Signed
+        return ad
+
+    def test_window_at_offset(self):
+        """Should request a sorted window at offset and skip search references!"""
+        connection = FakeConnection(120000, 20000, 50)
+        page = self.ad(connection).list_users(20000, 50, 'displayName').unwrap()
+
+        sss, vlv = connection.controls
+        self.assertIsInstance(sss, SSSRequestControl)
+        self.assertIsInstance(vlv, VLVRequestControl)
+        self.assertEqual((vlv.offset, vlv.before_count, vlv.after_count), (20000, 0, 49))
+        self.assertEqual((page.offset, page.last, page.total), (20000, 20049, 120000))
+        self.assertEqual(page.entries[0].displayName, 'user0')
+
+    def test_window_at_prefix(self):
+        """Should jump to the first user sorting at or after prefix!"""
+        connection = FakeConnection(120000, 73012, 10)
+        page = self.ad(connection).list_users(count=10, prefix='Pin').unwrap()
+
+        self.assertEqual(connection.controls[1].greater_than_or_equal, 'Pin')
+        self.assertEqual(page.offset, 73012)
+
+    def test_invalid_window(self):
+        """Should refuse an empty window!"""
+        self.assertIsInstance(self.ad(FakeConnection(0, 1, 0)).list_users(count=0), ADErrorResult)
+
+
+if __name__ == '__main__':
+    unittest.main()